@@ -0,0 +1,139 @@
+"""
+Benchmark: contract event index (utils/chain_indexer.py) against a dev chain.
+
+Builds a DevChain with N listings, purchases, cancellations and projects,
+mining a few transactions per block and reorging the tip every so often.
+The indexer polls it as the API worker would, and afterwards every indexed
+listing and project is checked against the contract state. Then one page
+of active listings is timed two ways: walking `listings(i)` one call at a
+time, as the dashboards do, with --rpc-ms of latency per call, and as one
+query on the index.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_chain_indexer.py
+    python benchmarks/bench_chain_indexer.py --listings 5000 --rpc-ms 30 --reorg-every 20
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BACKEND_DIR))
+
+from utils.chain_indexer import ChainIndexer, DevChain, _tokens
+
+WEI = 10 ** 18
+PROJECT_TYPES = ["biochar", "compost", "agroforestry", "no-burn"]
+
+
+def account(i):
+    return "0x" + format(0xFA000 + i, "040x")
+
+
+def drive(chain, indexer, args, rng):
+    """Random marketplace traffic, a poll after every block and a reorg now and then"""
+    listings = projects = 0
+    blocks = 0
+    while listings < args.listings:
+        for _ in range(args.txs_per_block):
+            roll = rng.random()
+            if roll < 0.4 or listings == 0:
+                chain.create_listing(account(rng.randrange(args.accounts)), rng.randint(1, 500) * WEI)
+                listings += 1
+            elif roll < 0.75:
+                chain.buy(account(rng.randrange(args.accounts)), rng.randrange(listings), rng.randint(1, 200) * WEI)
+            elif roll < 0.8:
+                listing_id = rng.randrange(listings)
+                seller = chain._listings[listing_id][0] if listing_id < len(chain._listings) else account(0)
+                chain.cancel_listing(seller, listing_id)
+            elif roll < 0.92 or projects == 0:
+                chain.create_project(account(rng.randrange(args.accounts)), rng.choice(PROJECT_TYPES), f"Qm{rng.getrandbits(64):016x}")
+                projects += 1
+            else:
+                chain.verify_and_mint(rng.randrange(projects), rng.randint(1, 50) * WEI)
+        chain.mine()
+        blocks += 1
+        if args.reorg_every and blocks % args.reorg_every == 0:
+            chain.reorg(rng.randint(1, args.max_reorg))
+            chain.mine(2)
+        indexer.sync_once()
+    chain.mine(indexer.confirmations)
+    indexer.sync_once()
+
+
+def verify(chain, indexer):
+    mismatches = 0
+    for listing_id, (seller, total, remaining, active) in enumerate(chain._listings):
+        rows = indexer._db.execute("SELECT * FROM listings WHERE id = ?", (listing_id,)).fetchall()
+        if not rows or (rows[0]["seller"], int(rows[0]["total_wei"]), int(rows[0]["remaining_wei"]),
+                        rows[0]["status"] == "active") != (seller, total, remaining, active):
+            mismatches += 1
+    for project_id, (farmer, project_type, off_chain_hash, status) in enumerate(chain._projects):
+        rows = indexer._db.execute("SELECT * FROM projects WHERE id = ?", (project_id,)).fetchall()
+        if not rows or (rows[0]["farmer"], rows[0]["project_type"], rows[0]["off_chain_hash"], rows[0]["status"]) \
+                != (farmer, project_type, off_chain_hash, ("Pending", "Verified")[status]):
+            mismatches += 1
+    return mismatches
+
+
+def walk_listings(chain, page_size):
+    """What the buyer dashboard does today: every listing, one call each, newest active first"""
+    count = chain.listings_count()
+    active = []
+    for i in range(count):
+        seller, total, remaining, is_active = chain.listing(i)
+        if is_active:
+            active.append({"id": i, "seller": seller, "remaining": _tokens(remaining)})
+    return sorted(active, key=lambda row: -row["id"])[:page_size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index a synthetic dev chain and compare listing reads.")
+    parser.add_argument("--listings", type=int, default=1000)
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--txs-per-block", type=int, default=8)
+    parser.add_argument("--reorg-every", type=int, default=25, help="Blocks between reorgs (0 = none)")
+    parser.add_argument("--max-reorg", type=int, default=4)
+    parser.add_argument("--rpc-ms", type=float, default=10, help="Simulated latency per contract call")
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    chain = DevChain()
+    with tempfile.TemporaryDirectory() as root:
+        indexer = ChainIndexer(chain, db_path=str(Path(root) / "chain_index.sqlite3"), confirmations=2, block_range=500)
+        started = time.perf_counter()
+        drive(chain, indexer, args, rng)
+        elapsed = time.perf_counter() - started
+        stats = indexer.stats()
+        print(f"Chain: {stats['indexed_block']} blocks, {len(chain._listings)} listings, {len(chain._projects)} projects")
+        print(f"Indexed {stats['events']} events in {elapsed:.1f}s with {stats['reorgs']} reorgs"
+              f" ({stats['rolled_back_events']} events rolled back)")
+        mismatches = verify(chain, indexer)
+        print(f"Index vs contract state: {'consistent' if not mismatches else f'{mismatches} MISMATCHES'}")
+
+        chain.latency = args.rpc_ms / 1000
+        chain.calls = 0
+        started = time.perf_counter()
+        walked = walk_listings(chain, args.page)
+        walk_time = time.perf_counter() - started
+        walk_calls = chain.calls
+        started = time.perf_counter()
+        page = indexer.listings(status="active", limit=args.page)
+        query_time = time.perf_counter() - started
+        same = [row["id"] for row in walked] == [row["id"] for row in page["items"]]
+
+        print(f"Page of {args.page} active listings:")
+        print(f"  contract walk ({walk_calls} calls at {args.rpc_ms:g}ms): {walk_time * 1000:10.1f}ms")
+        print(f"  index query                        : {query_time * 1000:10.2f}ms")
+        print(f"  same listings: {same}")
+        return 0 if not mismatches and same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
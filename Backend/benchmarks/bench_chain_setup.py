@@ -0,0 +1,116 @@
+"""
+Benchmark: per-request chain setup, rebuilt every call vs compiled registry.
+
+"before" rebuilds the prompt template and chain the way chat_waste,
+_generate_analysis and KrishiSaarthiAdvisor._initialize_chain used to on
+every request/session; "after" fetches the precompiled chain from the
+registry. Both then format the prompt with the request's variables, so the
+difference is pure setup overhead. No Ollama calls are made.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_chain_setup.py --iterations 2000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BACKEND_DIR / "services" / "WasteToValue" / "src"))
+sys.path.append(str(BACKEND_DIR / "services" / "Business Advisor"))
+
+from langchain_core.messages import SystemMessage
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, MessagesPlaceholder
+
+from prompts import WASTE_CHAT_SYSTEM_PROMPT, WASTE_TO_VALUE_SYSTEM_PROMPT, GUARDRAIL_PROMPT
+from waste_service import WasteToValueEngine
+import krishi_chatbot
+from krishi_chatbot import FarmerProfile, SYSTEM_PROMPTS, prompt_language
+
+CONTEXT_STR = '{"crop": "Banana", "options": [{"title": "Banana fibre paper"}]}'
+
+
+def waste_chat_before(engine, language):
+    prompt = ChatPromptTemplate.from_messages([("system", WASTE_CHAT_SYSTEM_PROMPT), ("human", "{question}")])
+    chain = prompt.partial(language=language) | engine.chat_llm | StrOutputParser()
+    return chain.first.format_messages(context_str=CONTEXT_STR, question="Which machine do I need?")
+
+
+def waste_chat_after(engine, language):
+    chain = engine.chains.get("chat", language)
+    return chain.first.format_messages(context_str=CONTEXT_STR, question="Which machine do I need?")
+
+
+def waste_analysis_before(engine, language):
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", WASTE_TO_VALUE_SYSTEM_PROMPT + "\n" + GUARDRAIL_PROMPT),
+        ("human", "{input}"),
+    ])
+    chain = prompt | engine.json_llm | JsonOutputParser()
+    return chain.first.format_messages(input="Banana", language=language)
+
+
+def waste_analysis_after(engine, language):
+    chain = engine.chains.get("analysis", language)
+    return chain.first.format_messages(input="Banana")
+
+
+def advisor_session_before(profile):
+    prompt = ChatPromptTemplate.from_messages([
+        SystemMessage(content=SYSTEM_PROMPTS[prompt_language(profile.language)]),
+        SystemMessage(content=profile.to_context()),
+        MessagesPlaceholder(variable_name="chat_history"),
+        HumanMessagePromptTemplate.from_template("{input}"),
+    ])
+    chain = prompt | krishi_chatbot._advisor_llm()
+    return chain.first.format_messages(chat_history=[], input="Which business suits me?")
+
+
+def advisor_session_after(profile):
+    chain = krishi_chatbot._chains.get("chat", prompt_language(profile.language))
+    return chain.first.format_messages(
+        profile=[SystemMessage(content=profile.to_context())], chat_history=[], input="Which business suits me?"
+    )
+
+
+def measure(fn, iterations, *args):
+    fn(*args)  # Warm-up (first registry build, imports)
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - started) * 1e6)
+    return statistics.mean(samples), statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-request chain setup overhead.")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--language", default="Hindi")
+    args = parser.parse_args()
+
+    engine = WasteToValueEngine()
+    krishi_chatbot.precompile_chains()
+    profile = FarmerProfile(
+        name="Ramesh", land_size=2.5, capital=200000, market_access="moderate", skills=["farming"],
+        risk_level="medium", time_availability="part-time", language=args.language.lower(), crops_grown=["Wheat"],
+    )
+
+    cases = [
+        ("waste chat", waste_chat_before, waste_chat_after, (engine, args.language)),
+        ("waste analysis", waste_analysis_before, waste_analysis_after, (engine, args.language)),
+        ("advisor session", advisor_session_before, advisor_session_after, (profile,)),
+    ]
+    print("case            | before mean/median (us) | after mean/median (us) | speed-up")
+    for name, before, after, fn_args in cases:
+        b_mean, b_median = measure(before, args.iterations, *fn_args)
+        a_mean, a_median = measure(after, args.iterations, *fn_args)
+        print(f"{name:<15} | {b_mean:10.1f} / {b_median:10.1f} | {a_mean:9.1f} / {a_median:9.1f} | "
+              f"{b_mean / a_mean:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: JSON extraction from LLM output, regex cleanup vs utils/llm_json.
+
+"before" is the pipeline _write_llm_reasons used to run (strip fences,
+regex-search the array, drop trailing commas, json.loads); "after" is the
+single-pass tolerant extractor. The offline corpus takes one well-formed
+answer and damages it the ways models do, including truncation at many
+points and an unclosed output that makes the regex backtrack.
+
+With --live, the waste planning call is also run N times in plain "json"
+mode and with the JSON schema as Ollama's `format`, and the share of
+outputs each parser fails on is reported.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_json_extract.py
+    python benchmarks/bench_json_extract.py --live 20 --language Hindi
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BACKEND_DIR))
+sys.path.append(str(BACKEND_DIR / "services" / "WasteToValue" / "src"))
+
+from utils.llm_json import JSONExtractError, extract_json
+
+SAMPLE = json.dumps([
+    {"id": "1", "reason": "Gerbera suits your 2 acres and ₹20 lakh budget; you already irrigate."},
+    {"id": "5", "reason": "Dairy gives daily income and uses your fodder land."},
+    {"id": "7", "reason": "Mushrooms need little land and return cash within 3 months."},
+], indent=2, ensure_ascii=False)
+
+
+def regex_extract(text: str):
+    """The cleanup _write_llm_reasons used before utils/llm_json"""
+    cleaned = re.sub(r'```json\s*|\s*```', '', text.strip())
+    match = re.search(r'\[\s*\{.*\}\s*\]', cleaned, re.DOTALL)
+    if match:
+        cleaned = match.group(0)
+    cleaned = re.sub(r',(\s*[}\]])', r'\1', cleaned)
+    return json.loads(cleaned)
+
+
+def corpus():
+    yield "clean", SAMPLE
+    yield "fenced", f"```json\n{SAMPLE}\n```"
+    yield "chatter", f"Sure! Here are the reasons:\n{SAMPLE}\nLet me know if you need more."
+    yield "trailing commas", SAMPLE.replace('"\n  }', '",\n  }').replace("}\n]", "},\n]")
+    yield "raw newline in string", SAMPLE.replace("daily income and", "daily income\nand")
+    for cut in range(len(SAMPLE) // 4, len(SAMPLE) - 1, max(1, len(SAMPLE) // 40)):
+        yield f"truncated@{cut}", SAMPLE[:cut]
+    # Every "[" is a regex start that scans to the end and backtracks: quadratic
+    yield "unclosed, no commas", '[{"id": "1"} ' * 3000
+
+
+def run(parse, text):
+    started = time.perf_counter()
+    try:
+        value = parse(text)
+        ok = isinstance(value, list) and len(value) > 0
+    except (ValueError, JSONExtractError):
+        ok = False
+    return ok, time.perf_counter() - started
+
+
+def offline():
+    rows = []
+    for name, text in corpus():
+        before = run(regex_extract, text)
+        after = run(extract_json, text)
+        rows.append((name, before, after))
+        if not name.startswith("truncated@"):
+            print(f"{name:<24} | before {'ok  ' if before[0] else 'FAIL'} {before[1] * 1000:8.2f}ms"
+                  f" | after {'ok  ' if after[0] else 'FAIL'} {after[1] * 1000:8.2f}ms")
+    truncated = [r for r in rows if r[0].startswith("truncated@")]
+    print(f"{'truncated (' + str(len(truncated)) + ' cuts)':<24} | before {sum(r[1][0] for r in truncated):3d} ok"
+          f"          | after {sum(r[2][0] for r in truncated):3d} ok")
+    print(f"\nRecovered: {sum(r[1][0] for r in rows)}/{len(rows)} -> {sum(r[2][0] for r in rows)}/{len(rows)}")
+    print(f"Total parse time: {sum(r[1][1] for r in rows) * 1000:.1f}ms -> {sum(r[2][1] for r in rows) * 1000:.1f}ms")
+
+
+def live(samples, language):
+    from langchain_core.prompts import ChatPromptTemplate
+    from prompts import WASTE_PLAN_PROMPT, PLAN_SCHEMA
+    from utils.llm_clients import get_chat_model
+
+    prompt = ChatPromptTemplate.from_messages([("system", WASTE_PLAN_PROMPT), ("human", "{input}")])
+    crops = ["Banana", "Rice", "Mango", "Sugarcane", "Dung"]
+    print(f"\nLive: {samples} planning calls per format ({language})")
+    for label, fmt in (("json", "json"), ("schema", PLAN_SCHEMA)):
+        llm = get_chat_model(temperature=0.2, format=fmt, num_predict=512)
+        strict_fail = tolerant_fail = 0
+        started = time.perf_counter()
+        for i in range(samples):
+            messages = prompt.format_messages(input=crops[i % len(crops)], language=language)
+            text = llm.invoke(messages).content
+            try:
+                json.loads(text)
+            except ValueError:
+                strict_fail += 1
+            try:
+                plan = extract_json(text, expect="{")
+                if len(plan.get("titles", [])) < 3:
+                    tolerant_fail += 1
+            except JSONExtractError:
+                tolerant_fail += 1
+        elapsed = time.perf_counter() - started
+        print(f"format={label:<6} | strict parse failures {strict_fail}/{samples}"
+              f" | tolerant parse/shape failures {tolerant_fail}/{samples} | {elapsed / samples:.2f}s per call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare regex JSON cleanup with the tolerant extractor.")
+    parser.add_argument("--live", type=int, default=0, metavar="N", help="Also run N live planning calls per format")
+    parser.add_argument("--language", default="English")
+    args = parser.parse_args()
+    offline()
+    if args.live:
+        live(args.live, args.language)
+
+
+if __name__ == "__main__":
+    main()
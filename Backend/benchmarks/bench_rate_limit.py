@@ -0,0 +1,80 @@
+"""
+Benchmark: cost of a rate limit check (utils/rate_limiter.py).
+
+Times RateLimiter.check() for a population of users from several threads,
+as gthread workers would call it, and reports the per-check latency
+percentiles and how many requests were refused. With --redis the shared
+Redis store is measured too (needs the `redis` package and a server).
+
+Usage (from the Backend directory):
+    python benchmarks/bench_rate_limit.py
+    python benchmarks/bench_rate_limit.py --users 50000 --threads 16 --redis redis://127.0.0.1:6379/0
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BACKEND_DIR))
+
+from utils.rate_limiter import GROUP_LIMITS, MemoryBucketStore, RateLimiter, RedisBucketStore
+
+
+def run(limiter, users, checks, threads, seed):
+    groups = list(GROUP_LIMITS)
+    timings = [[] for _ in range(threads)]
+    refused = [0] * threads
+
+    def worker(n):
+        rng = random.Random(seed + n)
+        for _ in range(checks // threads):
+            # A few heavy users make most requests, like a client stuck in a retry loop
+            uid = f"u{int(rng.paretovariate(1.2)) % users}"
+            group = rng.choice(groups)
+            started = time.perf_counter()
+            decision = limiter.check(group, uid)
+            timings[n].append(time.perf_counter() - started)
+            refused[n] += not decision.allowed
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    flat = sorted(t for per_thread in timings for t in per_thread)
+    return flat, sum(refused), elapsed
+
+
+def report(name, flat, refused, elapsed):
+    quantiles = statistics.quantiles(flat, n=100)
+    print(f"{name:<7} | {len(flat):>9,} checks | {len(flat) / elapsed:>10,.0f}/s | "
+          f"p50 {quantiles[49] * 1e6:6.1f}us | p99 {quantiles[98] * 1e6:7.1f}us | "
+          f"max {flat[-1] * 1e6:8.1f}us | refused {refused / len(flat):.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-check latency of the rate limiter.")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--checks", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--redis", help="Also measure the Redis store at this URL")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    report("memory", *run(RateLimiter(MemoryBucketStore()), args.users, args.checks, args.threads, args.seed))
+    if args.redis:
+        limiter = RateLimiter(RedisBucketStore(args.redis))
+        report("redis", *run(limiter, args.users, args.checks // 10, args.threads, args.seed))
+        if limiter.errors:
+            print(f"redis errors: {limiter.errors} ({limiter.last_error})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: a fixed advisor + waste-to-value scenario, recorded once and then
+replayed without a model (utils/llm_replay.py).
+
+`record` runs the scenario against Ollama and saves every LLM call as a
+fixture. `replay` runs the identical scenario from the fixtures. With
+--speed 1 the model's recorded timing is reproduced exactly, so comparing
+replay runs before and after a change measures our own code only. With
+--speed 0 the model takes no time at all, and what remains is pure
+application overhead.
+
+Each run starts from an empty response cache (a temporary KRISHI_CACHE_DIR),
+so the same calls are made every time.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_replay.py record
+    python benchmarks/bench_replay.py replay --speed 0
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+ADVISOR_TURNS = [
+    "Which of these businesses should I start first?",
+    "How much money do I need in the first year?",
+    "What are the biggest risks for me?",
+]
+WASTE_QUESTIONS = [
+    "What machine do I need for the first option?",
+    "Which option is best for a small farmer?",
+]
+
+
+def timed_stream(chunks):
+    """(seconds to first chunk, total seconds) for a generator of text chunks"""
+    started = time.perf_counter()
+    first = None
+    for _ in chunks:
+        if first is None:
+            first = time.perf_counter() - started
+    total = time.perf_counter() - started
+    return first if first is not None else total, total
+
+
+def run_scenario(args):
+    sys.path.append(str(BACKEND_DIR))
+    sys.path.append(str(BACKEND_DIR / "services" / "WasteToValue" / "src"))
+    sys.path.append(str(BACKEND_DIR / "services" / "Business Advisor"))
+    from utils.llm_replay import all_stats as replay_stats
+    from waste_service import WasteToValueEngine
+    from krishi_chatbot import FarmerProfile, KrishiSaarthiAdvisor
+
+    rows = []
+    engine = WasteToValueEngine()
+    for crop in args.crops:
+        started = time.perf_counter()
+        analysis = engine.analyze_waste(crop, args.language)
+        rows.append((f"waste analyze {crop}", None, time.perf_counter() - started))
+        if analysis.get("error"):
+            print(f"Skipping chat for {crop}: {analysis['error']}")
+            continue
+        for question in WASTE_QUESTIONS:
+            ttft, total = timed_stream(engine.stream_chat_waste(analysis, question, args.language))
+            rows.append((f"waste chat {crop}: {question[:28]}", ttft, total))
+
+    profile = FarmerProfile(
+        name="Ramesh", land_size=2.5, capital=200000, market_access="moderate", skills=["farming", "dairy"],
+        risk_level="medium", time_availability="part-time", language=args.language.lower(), crops_grown=["Wheat"],
+    )
+    started = time.perf_counter()
+    advisor = KrishiSaarthiAdvisor(profile)
+    rows.append(("advisor init", None, time.perf_counter() - started))
+    for turn in ADVISOR_TURNS:
+        ttft, total = timed_stream(advisor.stream_chat(turn))
+        rows.append((f"advisor: {turn[:36]}", ttft, total))
+
+    print(f"{'step':<48} | {'ttft':>8} | {'total':>8}")
+    for name, ttft, total in rows:
+        print(f"{name:<48} | {'' if ttft is None else f'{ttft:7.3f}s':>8} | {total:7.3f}s")
+    print(f"\nScenario total: {sum(r[2] for r in rows):.3f}s"
+          f" (median step {statistics.median(r[2] for r in rows):.3f}s)")
+    stats = replay_stats()
+    print(f"Fixtures: {stats['recorded']} recorded, {stats['replayed']} replayed, {stats['missing']} missing"
+          f" ({stats['fixture_dir']})")
+    if stats["missing"]:
+        print("Some calls had no fixture; re-run `record` after changing prompts or parameters.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay a fixed advisor + waste scenario.")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed-up; 0 replays without delays")
+    parser.add_argument("--crops", nargs="+", default=["Banana"])
+    parser.add_argument("--language", default="English")
+    parser.add_argument("--fixtures", help="Fixture directory (default: LLM_FIXTURE_DIR)")
+    args = parser.parse_args()
+
+    # Read at import time by utils/, so set before the services are imported
+    os.environ["LLM_RECORD_MODE"] = args.mode
+    os.environ["LLM_REPLAY_SPEED"] = str(args.speed)
+    os.environ["ADVISOR_PRIME_PREFIX"] = "0"  # A background call would race the first turn
+    if args.fixtures:
+        os.environ["LLM_FIXTURE_DIR"] = args.fixtures
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["KRISHI_CACHE_DIR"] = cache_dir
+        run_scenario(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: startup cost of each worker role (utils/worker_roles.py).
+
+Each role is started in a fresh interpreter that imports app.py with
+KRISHI_ROLE set, the way a gunicorn worker builds its app. Reported per
+role: import + app construction time, resident memory afterwards, the
+number of loaded modules, and which of the heavy libraries were imported.
+`flask only` is the floor every role pays.
+
+Service warm-up is included (the detector loads its model, the waste role
+builds its engine), since a worker pays it before serving. Ollama does not
+need to be running: LLM calls are not made at startup.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_roles.py
+    python benchmarks/bench_roles.py --roles detector advisor --repeat 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+HEAVY = ("tensorflow", "pandas", "langchain_core", "langchain_ollama", "firebase_admin", "numpy")
+
+# Runs in the child; prints one JSON line as its last output
+PROBE = r"""
+import json, resource, sys, time
+started = time.perf_counter()
+if sys.argv[1] == "flask only":
+    import flask
+else:
+    import app
+elapsed = time.perf_counter() - started
+rss_kb = None
+try:
+    with open("/proc/self/status") as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+except OSError:
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss_kb //= 1024
+heavy = [m for m in json.loads(sys.argv[2]) if m in sys.modules]
+print(json.dumps({"seconds": elapsed, "rss_mb": rss_kb / 1024, "modules": len(sys.modules), "heavy": heavy}))
+"""
+
+
+def probe(role):
+    env = {**os.environ, "KRISHI_ROLE": role if role != "flask only" else "all"}
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE, role, json.dumps(HEAVY)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        tail = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+        raise RuntimeError(f"{role}: {tail}")
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and RSS of each worker role.")
+    parser.add_argument("--roles", nargs="+", default=["flask only", "detector", "advisor", "waste", "chain", "all"])
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per role; the median is reported")
+    args = parser.parse_args()
+
+    print(f"{'role':<12} | {'startup':>8} | {'rss':>9} | {'modules':>7} | heavy libraries")
+    for role in args.roles:
+        try:
+            runs = [probe(role) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{role:<12} | failed: {e}")
+            continue
+        seconds = statistics.median(r["seconds"] for r in runs)
+        rss = statistics.median(r["rss_mb"] for r in runs)
+        print(f"{role:<12} | {seconds:7.2f}s | {rss:6.0f} MB | {runs[0]['modules']:7d} | {', '.join(runs[0]['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: outbreak queries on the scan event log (utils/scan_log.py).
+
+Loads N synthetic scans spread over the last D days into a temporary log,
+through the same batched writer the API uses, then times the weekly
+outbreak query answered from the hourly rollups. For comparison it times
+the same counts computed by a full scan of the event columns.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_scan_log.py
+    python benchmarks/bench_scan_log.py --events 5000000 --days 30
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BACKEND_DIR))
+
+from utils.scan_log import SCAN_LOG_BATCH, ScanEventLog, _day
+
+STATES = {
+    "Maharashtra": ["Pune", "Nashik", "Nagpur", "Satara", "Solapur", "Kolhapur"],
+    "Uttar Pradesh": ["Lucknow", "Agra", "Varanasi", "Meerut", "Bareilly"],
+    "Karnataka": ["Belagavi", "Mysuru", "Dharwad", "Hassan"],
+    "Punjab": ["Ludhiana", "Amritsar", "Patiala", "Bathinda"],
+}
+DISEASES = [
+    ("Tomato", "Late blight"), ("Tomato", "Early blight"), ("Tomato", "Leaf Mold"),
+    ("Potato", "Late blight"), ("Potato", "Early blight"), ("Corn (maize)", "Common rust"),
+    ("Grape", "Black rot"), ("Apple", "Apple scab"), ("Tomato", "Healthy leaf (no disease detected)"),
+]
+
+
+def load(log, events, days, users, seed):
+    rng = np.random.default_rng(seed)
+    regions = [f"{state} / {district}" for state, districts in STATES.items() for district in districts]
+    user_regions = {f"u{i}": regions[i % len(regions)] for i in range(users)}
+    log._region_resolver = user_regions.get
+
+    now = time.time()
+    ts = np.sort(now - rng.random(events) * days * 86400)
+    kinds = rng.integers(0, len(DISEASES), events)
+    uids = rng.integers(0, users, events)
+    confidence = rng.uniform(0.3, 1.0, events)
+    started = time.perf_counter()
+    for start in range(0, events, SCAN_LOG_BATCH):
+        end = min(start + SCAN_LOG_BATCH, events)
+        log.write_batch([
+            (float(ts[i]), *DISEASES[kinds[i]], float(confidence[i]),
+             "high" if confidence[i] > 0.8 else "medium" if confidence[i] > 0.5 else "low", f"u{uids[i]}")
+            for i in range(start, end)
+        ])
+    return time.perf_counter() - started
+
+
+def full_scan(log, days):
+    """The same weekly district counts, from the event columns"""
+    since = time.time() - days * 86400
+    counts = Counter()
+    for offset in range(int(days) + 2):
+        columns = log.read_day(_day(int((since + offset * 86400) // 3600)))
+        if not len(columns["ts"]):
+            continue
+        mask = (columns["ts"] >= since) & np.array(["healthy" not in d.lower() for d in columns["disease"]], dtype=bool)
+        keys = zip(columns["region"][mask], columns["crop"][mask], columns["disease"][mask])
+        counts.update(keys)
+    return counts
+
+
+def timed(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - started)
+    return result, statistics.median(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time outbreak queries on a synthetic scan log.")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        log = ScanEventLog(root=Path(root))
+        elapsed = load(log, args.events, args.days, args.users, args.seed)
+        print(f"Wrote {args.events:,} events in {elapsed:.1f}s ({args.events / elapsed:,.0f}/s)"
+              f" in batches of {SCAN_LOG_BATCH}")
+
+        log._rollup_files.clear()
+        _, cold = timed(lambda: log.outbreaks(days=7, bucket="day"), 1)
+        result, warm = timed(lambda: log.outbreaks(days=7, bucket="day"), args.repeat)
+        _, weekly_state = timed(lambda: log.outbreaks(days=args.days, bucket="week", level="state"), args.repeat)
+        scan, scan_time = timed(lambda: full_scan(log, 7), 1)
+
+        print(f"Last 7 days: {result['total']:,} scans, {len(result['rows'])} (day, district, disease) rows")
+        print(f"rollup query, cold files   : {cold * 1000:8.1f}ms")
+        print(f"rollup query, cached files : {warm * 1000:8.1f}ms")
+        print(f"rollup query, {args.days:g} days by state/week: {weekly_state * 1000:8.1f}ms")
+        print(f"full column scan           : {scan_time * 1000:8.1f}ms")
+        # The rollup window starts at the top of the hour, so it may hold a few more events than the scan
+        print(f"Totals: rollup {result['total']:,} vs scan {sum(scan.values()):,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: waste-chat prompt size and time-to-first-token, full JSON context
+vs compact rendering (context_render.render_context).
+
+"before" is the analysis pasted as json.dumps(indent=2), as chat_waste used
+to do; "after" is the compact, question-focused rendering. Prompt tokens are
+Ollama's prompt_eval_count. num_predict is 1, so the measured time is prompt
+evaluation plus the first token. Use --offline to only compare characters
+when Ollama isn't running.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_waste_chat_context.py --crops Banana Rice --language Hindi
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "services" / "WasteToValue" / "src"))
+
+from context_render import render_context
+from waste_service import WasteToValueEngine
+
+QUESTIONS = [
+    "What machine do I need for the first option?",
+    "How much money can I make from option 2?",
+    "Which option is best for a small farmer?",
+    "Where can I sell the product?",
+]
+
+
+def measure_prompt(engine, language, context_str, question):
+    """(prompt_eval_count, seconds to first token) for one chat prompt"""
+    messages = engine.chains.get("chat", language).first.format_messages(
+        context_str=context_str, question=question
+    )
+    started = time.perf_counter()
+    first_token, metadata = None, {}
+    options = {"num_ctx": engine.chat_llm.params["num_ctx"], "num_predict": 1}
+    for chunk in engine.chat_llm.stream(messages, options=options):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        metadata = chunk.response_metadata or metadata
+    return metadata.get("prompt_eval_count"), first_token
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-JSON and compact waste-chat context.")
+    parser.add_argument("--crops", nargs="+", default=["Banana", "Rice", "Sugarcane"])
+    parser.add_argument("--language", default="English")
+    parser.add_argument("--offline", action="store_true", help="Only compare prompt characters")
+    args = parser.parse_args()
+
+    engine = WasteToValueEngine()
+    rows = []
+    for crop in args.crops:
+        analysis = engine.analyze_waste(crop, args.language)
+        if analysis.get("error"):
+            print(f"Skipping {crop}: {analysis['error']}")
+            continue
+        for question in QUESTIONS:
+            before = json.dumps(analysis, indent=2)
+            after = render_context(analysis, question)
+            row = {"crop": crop, "question": question, "chars": (len(before), len(after))}
+            if not args.offline:
+                row["tokens"], row["ttft"] = zip(
+                    measure_prompt(engine, args.language, before, question),
+                    measure_prompt(engine, args.language, after, question),
+                )
+            rows.append(row)
+            print(f"{crop:<10} | {question[:40]:<40} | chars {row['chars'][0]:6d} -> {row['chars'][1]:6d}"
+                  + ("" if args.offline else
+                     f" | tokens {row['tokens'][0]} -> {row['tokens'][1]}"
+                     f" | ttft {row['ttft'][0]:.2f}s -> {row['ttft'][1]:.2f}s"))
+
+    if not rows:
+        return
+    char_cut = 1 - statistics.mean(r["chars"][1] / r["chars"][0] for r in rows)
+    print(f"\nMean context size reduction: {char_cut:.0%} of characters")
+    if not args.offline:
+        token_rows = [r for r in rows if all(r["tokens"])]
+        if token_rows:
+            token_cut = 1 - statistics.mean(r["tokens"][1] / r["tokens"][0] for r in token_rows)
+            print(f"Mean prompt token reduction: {token_cut:.0%}")
+        print(f"Median TTFT: {statistics.median(r['ttft'][0] for r in rows):.2f}s -> "
+              f"{statistics.median(r['ttft'][1] for r in rows):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: single-shot vs parallel waste analysis.
+
+Runs WasteToValueEngine.analyze_waste in each mode with the cache bypassed
+and reports wall-clock time and output validity per mode. Results are
+written to a temporary KRISHI_CACHE_DIR, not the real response cache.
+
+Usage (from the Backend directory, with Ollama running):
+    python benchmarks/bench_waste_modes.py --crops Banana Rice Sugarcane --rounds 2
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Read at import time by utils/, so set before the service is imported
+_CACHE_DIR = tempfile.TemporaryDirectory()
+os.environ["KRISHI_CACHE_DIR"] = _CACHE_DIR.name
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "services" / "WasteToValue" / "src"))
+
+from waste_service import WasteToValueEngine, ANALYSIS_MODES
+
+
+def is_valid(result: dict) -> bool:
+    """Same bar the frontend needs: 3 complete options and a usable conclusion"""
+    if result.get("error"):
+        return False
+    options = result.get("options", [])
+    if len(options) != 3:
+        return False
+    for opt in options:
+        if not opt.get("title"):
+            return False
+        sections = opt.get("fullDetails", {}).get("sections", [])
+        if any(section["content"] == ["N/A"] for section in sections):
+            return False
+    conclusion = result.get("conclusion", {})
+    return bool(conclusion.get("explanation")) and conclusion.get("highlight") in {o["title"] for o in options}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-shot and parallel waste analysis.")
+    parser.add_argument("--crops", nargs="+", default=["Banana", "Rice", "Sugarcane"])
+    parser.add_argument("--language", default="English")
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--modes", nargs="+", default=list(ANALYSIS_MODES), choices=ANALYSIS_MODES)
+    args = parser.parse_args()
+
+    engine = WasteToValueEngine()
+    timings = {mode: [] for mode in args.modes}
+    valid = {mode: 0 for mode in args.modes}
+
+    for round_index in range(args.rounds):
+        for crop_index, crop in enumerate(args.crops):
+            # Rotate which mode goes first so model warm-up doesn't favour either one
+            shift = (round_index * len(args.crops) + crop_index) % len(args.modes)
+            for mode in args.modes[shift:] + args.modes[:shift]:
+                started = time.perf_counter()
+                result = engine.analyze_waste(crop, args.language, use_cache=False, mode=mode)
+                elapsed = time.perf_counter() - started
+                ok = is_valid(result)
+                timings[mode].append(elapsed)
+                valid[mode] += ok
+                print(f"{mode:>8} | {crop:<12} | {elapsed:7.1f}s | {'valid' if ok else 'INVALID'}")
+
+    print("\nmode     |   runs | mean (s) | median (s) | valid")
+    for mode in args.modes:
+        runs = len(timings[mode])
+        print(f"{mode:<8} | {runs:6d} | {statistics.mean(timings[mode]):8.1f} | "
+              f"{statistics.median(timings[mode]):10.1f} | {valid[mode]}/{runs}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Production launch, one gunicorn per role (see utils/worker_roles.py):
+
+    KRISHI_ROLE=detector gunicorn -c gunicorn.conf.py --bind 0.0.0.0:5001
+    KRISHI_ROLE=advisor  gunicorn -c gunicorn.conf.py --bind 0.0.0.0:5002
+    KRISHI_ROLE=waste    gunicorn -c gunicorn.conf.py --bind 0.0.0.0:5003
+    KRISHI_ROLE=chain    gunicorn -c gunicorn.conf.py --bind 0.0.0.0:5004
+
+The reverse proxy routes /api/disease to the detector, /api/business-advisor
+to the advisor, /api/waste-to-value and /api/jobs to waste (the jobs
+routes are served by both LLM roles) and /api/chain to chain. KRISHI_ROLE=all serves everything
+from one pool.
+
+The role's libraries are imported once in the master before forking
+(`preimport`), but the app itself is built in each worker: services,
+models, SQLite connections and thread pools must not cross a fork, so
+preload_app stays off. KRISHI_WORKERS and KRISHI_THREADS override the
+role's worker and thread counts.
+"""
+
+import importlib
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from utils.worker_roles import resolve_roles, server_settings
+
+roles = resolve_roles()
+_settings = server_settings(roles)
+
+wsgi_app = "app:app"
+bind = os.getenv("KRISHI_BIND", "127.0.0.1:5000")
+worker_class = "gthread"
+workers = int(os.getenv("KRISHI_WORKERS", _settings["workers"]))
+threads = int(os.getenv("KRISHI_THREADS", _settings["threads"]))
+timeout = _settings["timeout"]
+graceful_timeout = 30
+keepalive = 5
+max_requests = _settings["max_requests"]
+max_requests_jitter = max_requests // 10
+preload_app = False
+proc_name = f"krishi-{'-'.join(roles)}"
+
+
+def on_starting(server):
+    started = time.perf_counter()
+    for module in _settings["preimport"]:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            print(f"[ROLE] Pre-import of {module} skipped: {e}")
+    print(f"[ROLE] {', '.join(roles)}: pre-imported {len(_settings['preimport'])} modules"
+          f" in {time.perf_counter() - started:.2f}s; {workers} workers x {threads} threads")
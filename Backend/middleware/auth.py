@@ -1,9 +1,13 @@
 
+import hmac
 import os
+import threading
+import time
 import firebase_admin
 from firebase_admin import credentials, auth
 from functools import wraps
 from flask import request, jsonify, current_app
+from utils.usage_ledger import set_usage_user
 
 def init_firebase():
     """Initialize Firebase Admin SDK"""
@@ -53,6 +57,7 @@ def require_auth(f):
             # Verifying token
             decoded_token = auth.verify_id_token(token)
             request.user = decoded_token 
+            set_usage_user(decoded_token.get('uid'))
             return f(*args, **kwargs)
         except auth.ExpiredIdTokenError:
             print("[AUTH] Error: Token expired")
@@ -65,3 +70,55 @@ def require_auth(f):
             return jsonify({'error': 'Authentication failed'}), 401
             
     return decorated_function
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+LOOPBACK_ADDRESSES = {'127.0.0.1', '::1'}
+
+def require_metrics_access(f):
+    """
+    Guards operational endpoints (/api/metrics), which expose backend URLs,
+    error strings and per-user counters. With METRICS_TOKEN set, requests
+    must send "Authorization: Bearer <METRICS_TOKEN>". Without it, only
+    direct requests from this host are answered (not ones relayed by a proxy).
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if METRICS_TOKEN:
+            scheme, _, supplied = request.headers.get('Authorization', '').partition(' ')
+            if scheme != 'Bearer' or not hmac.compare_digest(supplied.strip().encode(), METRICS_TOKEN.encode()):
+                return jsonify({'error': 'Metrics token is missing or invalid'}), 401
+        elif request.remote_addr not in LOOPBACK_ADDRESSES or request.headers.get('X-Forwarded-For'):
+            return jsonify({'error': 'Metrics are only served locally; set METRICS_TOKEN to allow remote scrapes'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+def current_uid():
+    """UID of the user authenticated by require_auth for this request"""
+    return (getattr(request, 'user', None) or {}).get('uid')
+
+_region_cache = {}
+_region_lock = threading.Lock()
+REGION_CACHE_TTL_SECONDS = float(os.getenv('REGION_CACHE_TTL_SECONDS', 3600))
+
+def get_user_region(uid):
+    """
+    'State / District' from users/{uid}.farmerProfile.location in Firestore,
+    or None. Cached per UID for REGION_CACHE_TTL_SECONDS; call off the request path.
+    """
+    now = time.time()
+    with _region_lock:
+        cached = _region_cache.get(uid)
+        if cached and cached[0] > now:
+            return cached[1]
+    if not firebase_admin._apps:
+        return None
+    from firebase_admin import firestore
+    snapshot = firestore.client().collection('users').document(uid).get()
+    location = ((snapshot.to_dict() or {}).get('farmerProfile') or {}).get('location') or {}
+    parts = [str(location[k]).strip().title() for k in ('state', 'district') if location.get(k)]
+    region = ' / '.join(parts) or None
+    with _region_lock:
+        if len(_region_cache) > 100000:
+            _region_cache.clear()
+        _region_cache[uid] = (now + REGION_CACHE_TTL_SECONDS, region)
+    return region
@@ -0,0 +1,44 @@
+import math
+from functools import wraps
+from flask import request, jsonify, make_response
+from middleware.auth import current_uid
+from utils.rate_limiter import GROUP_LIMITS, RATE_LIMIT_ENABLED, get_rate_limiter
+
+# Exposed to browsers through CORS (see app.py)
+RATE_LIMIT_HEADERS = ['RateLimit-Limit', 'RateLimit-Remaining', 'RateLimit-Reset', 'RateLimit-Policy', 'Retry-After']
+
+def rate_limit(group):
+    """
+    Decorator limiting each user to the token bucket of `group` (see
+    utils/rate_limiter.py). Goes below @require_auth, so the bucket is keyed
+    on the verified Firebase UID.
+    """
+    if group not in GROUP_LIMITS:
+        raise ValueError(f"Unknown rate limit group '{group}'")
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not RATE_LIMIT_ENABLED or request.method == 'OPTIONS':
+                return f(*args, **kwargs)
+
+            decision = get_rate_limiter().check(group, current_uid() or request.remote_addr or 'anonymous')
+            if decision.allowed:
+                response = make_response(f(*args, **kwargs))
+            else:
+                retry_after = math.ceil(decision.retry_after)
+                print(f"[RATE] {group} limit hit by {current_uid() or request.remote_addr}")
+                response = make_response(jsonify({
+                    'error': 'Too many requests, please try again shortly',
+                    'code': 'rate_limited',
+                    'retry_after': retry_after,
+                }), 429)
+                response.headers['Retry-After'] = str(retry_after)
+
+            response.headers['RateLimit-Limit'] = str(decision.limit)
+            response.headers['RateLimit-Remaining'] = str(decision.remaining)
+            response.headers['RateLimit-Reset'] = str(math.ceil(decision.reset))
+            response.headers['RateLimit-Policy'] = f"{decision.limit};w={decision.window:g}"
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,217 @@
+"""
+Business advisor routes (role `advisor`). Importing this module loads
+LangChain and the advisor service.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+from flask import Blueprint, Response, jsonify, request
+
+from middleware.auth import current_uid, require_auth
+from middleware.rate_limit import rate_limit
+from routes.jobs import get_job_manager
+
+BUSINESS_ADVISOR_DIR = Path(__file__).resolve().parent.parent / 'services' / 'Business Advisor'
+if str(BUSINESS_ADVISOR_DIR) not in sys.path:
+    sys.path.append(str(BUSINESS_ADVISOR_DIR))
+
+from krishi_chatbot import KrishiSaarthiAdvisor, FarmerProfile, precompile_chains as precompile_advisor_chains
+
+bp = Blueprint('advisor', __name__)
+advisor_sessions = {}
+
+def run_advisor_recommendations_job(params, handle):
+    advisor = advisor_sessions.get(params['session_id'])
+    if advisor is None:
+        # Session was lost in a restart; rebuild it from the stored profile
+        advisor = KrishiSaarthiAdvisor(FarmerProfile(**params['profile']))
+        advisor_sessions[params['session_id']] = advisor
+    if handle.cancelled:
+        return None  # Discarded anyway; skip the LLM call
+    return advisor.generate_recommendations(llm_reasons=True)
+
+def init_app(app):
+    try:
+        print(f"Compiled {precompile_advisor_chains()} advisor chains")
+    except Exception as e:
+        print(f"Warning: advisor chain precompile failed, chains will compile on first use: {e}")
+    get_job_manager().register('advisor.recommendations', run_advisor_recommendations_job)
+    app.register_blueprint(bp)
+
+# --- Business Advisor Routes ---
+@bp.route('/api/business-advisor/init', methods=['POST', 'OPTIONS'])
+@require_auth
+@rate_limit('analyze')
+def init_advisor():
+    try:
+        data = request.json
+        name = data.get('name', 'Farmer')
+        print(f"[ADVISOR] Init -> Farmer: {name}")
+        
+        profile = FarmerProfile(
+            name=name,
+            land_size=float(data.get('land_size', 5)),
+            capital=float(data.get('capital', 100000)),
+            market_access=data.get('market_access', 'moderate'),
+            skills=data.get('skills', []),
+            risk_level=data.get('risk_level', 'medium'),
+            time_availability=data.get('time_availability', 'full-time'),
+            experience_years=int(data.get('experience_years', 0)),
+            language=data.get('language', 'english').lower(),
+            selling_preference=data.get('selling_preference'),
+            recovery_timeline=data.get('recovery_timeline'),
+            loss_tolerance=data.get('loss_tolerance'),
+            risk_preference=data.get('risk_preference'),
+            age=data.get('age'),
+            role=data.get('role', 'farmer'),
+            state=data.get('state'),
+            district=data.get('district'),
+            village=data.get('village'),
+            soil_type=data.get('soil_type'),
+            water_availability=data.get('water_availability'),
+            crops_grown=data.get('crops_grown', []),
+            land_unit=data.get('land_unit', 'acres')
+        )
+        
+        import uuid
+        session_id = str(uuid.uuid4())
+        advisor = KrishiSaarthiAdvisor(profile)
+        advisor_sessions[session_id] = advisor
+        
+        try:
+            recommendations = advisor.generate_recommendations()
+        except Exception as rec_err:
+             recommendations = advisor._get_fallback_recommendations()
+        
+        print(f"[ADVISOR] Success -> Session: {session_id[:8]}... ({len(recommendations)} recs)")
+        
+        payload = {
+            'success': True,
+            'session_id': session_id,
+            'recommendations': recommendations,
+            'message': 'Business advisor initialized successfully'
+        }
+        if data.get('async'):
+            # Instant ranked recommendations now; LLM-written reasons arrive via the job
+            payload['job_id'] = get_job_manager().submit(
+                'advisor.recommendations',
+                {'session_id': session_id, 'profile': profile.model_dump()},
+                owner=current_uid(),
+            )
+        return jsonify(payload)
+    except Exception as e:
+        print(f"[ADVISOR] Init Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/business-advisor/chat', methods=['POST', 'OPTIONS'])
+@require_auth
+@rate_limit('chat')
+def chat_advisor_api():
+    try:
+        data = request.json
+        session_id = data.get('session_id')
+        message = data.get('message')
+        
+        if not session_id or session_id not in advisor_sessions:
+            return jsonify({'error': 'Invalid session_id'}), 404
+        if not message:
+            return jsonify({'error': 'message is required'}), 400
+            
+        advisor = advisor_sessions[session_id]
+        print(f"[ADVISOR] Chat -> Input: \"{message[:50]}...\"")
+        response = advisor.chat(message)
+        print(f"[ADVISOR] Success -> Output: \"{response[:50]}...\" ({len(response)} chars)")
+        
+        return jsonify({'success': True, 'response': response, 'usage': advisor.last_usage})
+    except Exception as e:
+        print(f"[ADVISOR] Chat Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/business-advisor/chat/stream', methods=['POST', 'OPTIONS'])
+@require_auth
+@rate_limit('chat')
+def chat_advisor_stream():
+    try:
+        data = request.json
+        session_id = data.get('session_id')
+        message = data.get('message')
+        
+        if not session_id or session_id not in advisor_sessions:
+            return jsonify({'error': 'Invalid session_id'}), 404
+        if not message:
+            return jsonify({'error': 'message is required'}), 400
+            
+        advisor = advisor_sessions[session_id]
+        print(f"[ADVISOR] Stream Chat -> Input: \"{message[:50]}...\"")
+        with open("debug.log", "a") as f:
+            f.write(f"Stream initiated for session {session_id}\n")
+        
+        def generate():
+            try:
+                for i, chunk in enumerate(advisor.stream_chat(message)):
+                    if i == 0:
+                        with open("debug.log", "a") as f:
+                            f.write(f"First chunk yielded for session {session_id}\n")
+                    yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+                if advisor.last_usage:
+                    yield f"data: {json.dumps({'usage': advisor.last_usage})}\n\n"
+                with open("debug.log", "a") as f:
+                    f.write(f"Stream completed for session {session_id}\n")
+            except Exception as e:
+                print(f"[ADVISOR] Generator Error: {e}")
+                with open("debug.log", "a") as f:
+                    f.write(f"Generator Error: {e}\n")
+                yield f"data: {json.dumps({'error': str(e)})}\n\n"
+        
+        response = Response(generate(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        response.headers['Connection'] = 'keep-alive'
+        return response
+    except Exception as e:
+        print(f"[ADVISOR] Stream Chat Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/business-advisor/integrated-advice', methods=['POST', 'OPTIONS'])
+@require_auth
+@rate_limit('chat')
+def integrated_advice():
+    try:
+        data = request.json
+        session_id = data.get('session_id')
+        disease_result = data.get('disease_result')
+        
+        if not session_id: 
+            return jsonify({'error': 'session_id is required'}), 400
+        if session_id not in advisor_sessions: 
+            return jsonify({'error': 'Invalid session_id'}), 404
+        if not disease_result: 
+            return jsonify({'error': 'disease_result is required'}), 400
+        
+        advisor = advisor_sessions[session_id]
+        crop = disease_result.get('crop', 'Unknown')
+        disease = disease_result.get('disease', 'Unknown')
+        severity = disease_result.get('severity', 'medium')
+        
+        context_message = f"I have detected {disease} disease in my {crop} crop with {severity} severity."
+        print(f"[ADVISOR] Integrated Advice -> Disease: {disease} on {crop}")
+        
+        response = advisor.chat(context_message)
+        print(f"[ADVISOR] Integrated Advice Success")
+        
+        return jsonify({
+            'success': True,
+            'response': response,
+            'disease_context': {'crop': crop, 'disease': disease, 'severity': severity}
+        })
+    except Exception as e:
+        print(f"[ADVISOR] Integrated Advice Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,70 @@
+"""
+Marketplace and green-credit routes (role `chain`). Answered from the local
+event index kept by utils/chain_indexer.py instead of per-item contract
+calls. Stdlib and `requests` only.
+"""
+
+import re
+
+from flask import Blueprint, jsonify, request
+
+from middleware.auth import require_auth
+from middleware.rate_limit import rate_limit
+from utils.chain_indexer import get_chain_indexer
+
+ADDRESS_PATTERN = re.compile(r'^0x[0-9a-fA-F]{40}$')
+
+bp = Blueprint('chain', __name__)
+
+def init_app(app):
+    # Starts the poller; one process per index file (the role runs a single worker)
+    if get_chain_indexer() is None:
+        print("[CHAIN] CHAIN_RPC_URL is not set; /api/chain routes will answer 503")
+    app.register_blueprint(bp)
+
+def _query(method, **filters):
+    indexer = get_chain_indexer()
+    if indexer is None:
+        return jsonify({'error': 'Chain indexer is not configured'}), 503
+    for name in ('seller', 'buyer', 'farmer'):
+        if filters.get(name) and not ADDRESS_PATTERN.match(filters[name]):
+            return jsonify({'error': f'{name} must be a 0x-prefixed address'}), 400
+    limit = request.args.get('limit', 50, type=int)
+    try:
+        page = getattr(indexer, method)(limit=limit, cursor=request.args.get('cursor'), **filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True, **page})
+
+@bp.route('/api/chain/listings', methods=['GET', 'OPTIONS'])
+@require_auth
+@rate_limit('read')
+def chain_listings():
+    return _query(
+        'listings', status=request.args.get('status'), seller=request.args.get('seller'),
+        min_remaining=request.args.get('min_remaining', type=float), sort=request.args.get('sort', 'newest'),
+    )
+
+@bp.route('/api/chain/purchases', methods=['GET', 'OPTIONS'])
+@require_auth
+@rate_limit('read')
+def chain_purchases():
+    return _query('purchases', buyer=request.args.get('buyer'), listing_id=request.args.get('listing_id', type=int))
+
+@bp.route('/api/chain/projects', methods=['GET', 'OPTIONS'])
+@require_auth
+@rate_limit('read')
+def chain_projects():
+    return _query(
+        'projects', farmer=request.args.get('farmer'), status=request.args.get('status'),
+        project_type=request.args.get('type'),
+    )
+
+@bp.route('/api/chain/status', methods=['GET', 'OPTIONS'])
+@require_auth
+@rate_limit('read')
+def chain_status():
+    indexer = get_chain_indexer()
+    if indexer is None:
+        return jsonify({'error': 'Chain indexer is not configured'}), 503
+    return jsonify({'success': True, **indexer.stats()})
@@ -0,0 +1,167 @@
+"""
+Disease detector routes (role `detector`). Importing this module loads
+TensorFlow and pandas.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+from flask import Blueprint, current_app, jsonify, request
+from werkzeug.utils import secure_filename
+
+from middleware.auth import current_uid, get_user_region, require_auth
+from middleware.rate_limit import rate_limit
+from utils.scan_log import BUCKETS, get_scan_log
+
+DISEASE_DETECTOR_DIR = Path(__file__).resolve().parent.parent / 'services' / 'Disease Detector'
+if str(DISEASE_DETECTOR_DIR) not in sys.path:
+    sys.path.append(str(DISEASE_DETECTOR_DIR))
+
+from detector import predict as detector_predict, init_model as detector_init
+
+MODEL_FILE = DISEASE_DETECTOR_DIR / 'plant_disease_model.h5'
+CSV_PATH = DISEASE_DETECTOR_DIR / 'crop_disease_data.csv'
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp'}
+
+bp = Blueprint('disease', __name__)
+
+disease_data = None
+def load_disease_data():
+    global disease_data
+    try:
+        if CSV_PATH.exists():
+            disease_data = pd.read_csv(str(CSV_PATH))
+            print("Disease data CSV loaded successfully")
+        else:
+            print(f"Warning: CSV file not found at {CSV_PATH}")
+    except Exception as e:
+        print(f"Error loading disease data: {e}")
+
+def init_app(app):
+    # Warm up the model on worker start
+    detector_init()
+    load_disease_data()
+    get_scan_log(region_resolver=get_user_region)
+    app.register_blueprint(bp)
+
+# --- Utilities ---
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def get_disease_info(crop_name, disease_name):
+    if disease_data is None: return None
+    try:
+        match = disease_data[
+            (disease_data['Crop Name'].str.lower() == crop_name.lower()) &
+            (disease_data['Crop Disease'].str.lower() == disease_name.lower())
+        ]
+        if not match.empty:
+            row = match.iloc[0]
+            return {
+                'crop': row['Crop Name'],
+                'disease': row['Crop Disease'],
+                'pathogen': row['Pathogen'],
+                'home_remedy': row['Home Remedy'],
+                'chemical_recommendation': row['Chemical Recommendation']
+            }
+    except Exception as e:
+        print(f"Error getting disease info: {e}")
+    return None
+
+def predict_disease(image_path):
+    try:
+        return detector_predict(image_path)
+    except Exception as e:
+        print(f"Error in prediction: {e}")
+        return {
+            'crop': 'Unknown',
+            'disease': f'Error during detection: {e}',
+            'confidence': 0.0,
+            'severity': 'low'
+        }
+
+# --- Disease Detector Routes ---
+@bp.route('/api/disease/detect', methods=['POST', 'OPTIONS'])
+@require_auth
+@rate_limit('detect')
+def detect_disease():
+    try:
+        if 'image' not in request.files:
+            return jsonify({'error': 'No image file provided'}), 400
+        file = request.files['image']
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+        if not allowed_file(file.filename):
+            return jsonify({'error': 'Invalid file type'}), 400
+
+        filename = secure_filename(file.filename)
+        image_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+        file.save(image_path)
+
+        print(f"[SCAN] Request received: {filename}")
+        result = predict_disease(image_path)
+        print(f"[SCAN] Result: {result.get('disease')} ({int(result.get('confidence',0)*100)}%)")
+
+        scan_log = get_scan_log()
+        if scan_log is not None and result['crop'] != 'Unknown':
+            scan_log.record(result['crop'], result['disease'], result['confidence'], result['severity'], current_uid())
+
+        disease_info = get_disease_info(result['crop'], result['disease'])
+
+        treatment = []
+        if disease_info:
+            if disease_info['home_remedy'] and disease_info['home_remedy'] != 'N/A':
+                treatment.append(disease_info['home_remedy'])
+            if disease_info['chemical_recommendation'] and disease_info['chemical_recommendation'] != 'N/A':
+                treatment.append(f"Chemical: {disease_info['chemical_recommendation']}")
+        else:
+            treatment = ['Remove affected leaves', 'Apply fungicide']
+
+        try: os.remove(image_path)
+        except: pass
+
+        return jsonify({
+            'success': True,
+            'result': {
+                'crop': result['crop'],
+                'disease': result['disease'],
+                'severity': result['severity'],
+                'confidence': result['confidence'],
+                'treatment': treatment,
+                'pathogen': disease_info['pathogen'] if disease_info else None
+            }
+        })
+    except Exception as e:
+        print(f"[SCAN] Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/disease/outbreaks', methods=['GET', 'OPTIONS'])
+@require_auth
+@rate_limit('read')
+def disease_outbreaks():
+    scan_log = get_scan_log()
+    if scan_log is None:
+        return jsonify({'error': 'Scan log is disabled'}), 503
+    try:
+        days = float(request.args.get('days', 7))
+    except ValueError:
+        return jsonify({'error': 'days must be a number'}), 400
+    bucket = request.args.get('bucket', 'day')
+    level = request.args.get('level', 'district')
+    if bucket not in BUCKETS:
+        return jsonify({'error': f'bucket must be one of {list(BUCKETS)}'}), 400
+    if level not in ('district', 'state'):
+        return jsonify({'error': "level must be 'district' or 'state'"}), 400
+    if not 0 < days <= 366:
+        return jsonify({'error': 'days must be between 0 and 366'}), 400
+
+    result = scan_log.outbreaks(
+        days=days, bucket=bucket, level=level,
+        crop=request.args.get('crop'), disease=request.args.get('disease'), state=request.args.get('state'),
+        include_healthy=request.args.get('include_healthy', '').lower() in ('1', 'true'),
+    )
+    return jsonify({'success': True, **result})
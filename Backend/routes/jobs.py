@@ -0,0 +1,79 @@
+"""
+Async job routes, registered with the advisor and waste roles. Job kinds
+are registered by the route modules that own them (routes/advisor.py,
+routes/waste.py); jobs live in SQLite, so any LLM worker can answer for
+any job.
+"""
+
+import json
+import os
+
+from flask import Blueprint, Response, jsonify, request
+
+from middleware.auth import current_uid, require_auth
+from middleware.rate_limit import rate_limit
+from utils.jobs import JobManager, TERMINAL_STATES, public_view
+
+bp = Blueprint('jobs', __name__)
+
+# Slow LLM generations can run as background jobs; clients poll or subscribe via SSE
+_job_manager = None
+def get_job_manager():
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(
+            max_workers=int(os.getenv('JOBS_MAX_WORKERS', 2)),
+            result_ttl_seconds=float(os.getenv('JOBS_RESULT_TTL_SECONDS', 3600)),
+        )
+    return _job_manager
+
+def init_app(app):
+    get_job_manager()
+    app.register_blueprint(bp)
+
+def get_owned_job(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None or (job['owner'] and job['owner'] != current_uid()):
+        return None
+    return job
+
+@bp.route('/api/jobs/<job_id>', methods=['GET', 'DELETE', 'OPTIONS'])
+@require_auth
+@rate_limit('read')
+def job_status(job_id):
+    job = get_owned_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if request.method == 'DELETE':
+        cancelled = get_job_manager().cancel(job_id)
+        print(f"[JOBS] Cancel -> Job: {job_id[:8]}... ({'cancelled' if cancelled else 'already finished'})")
+        job = get_job_manager().get(job_id) or job
+    return jsonify({'success': True, 'job': public_view(job)})
+
+@bp.route('/api/jobs/<job_id>/events', methods=['GET', 'OPTIONS'])
+@require_auth
+@rate_limit('read')
+def job_events(job_id):
+    if get_owned_job(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def generate():
+        since = 0.0
+        while True:
+            job = get_job_manager().wait(job_id, since, timeout=15)
+            if job is None:
+                yield f"data: {json.dumps({'error': 'Job expired'})}\n\n"
+                return
+            if job['updated_at'] > since:
+                since = job['updated_at']
+                yield f"data: {json.dumps({'job': public_view(job)})}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            if job['status'] in TERMINAL_STATES:
+                return
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['Connection'] = 'keep-alive'
+    return response
@@ -0,0 +1,244 @@
+"""
+Waste-to-Value routes (role `waste`). Importing this module loads
+LangChain and the waste service.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+from flask import Blueprint, Response, jsonify, request
+
+from middleware.auth import current_uid, require_auth
+from middleware.rate_limit import rate_limit
+from routes.jobs import get_job_manager
+
+WASTE_TO_VALUE_DIR = Path(__file__).resolve().parent.parent / 'services' / 'WasteToValue' / 'src'
+if str(WASTE_TO_VALUE_DIR) not in sys.path:
+    sys.path.append(str(WASTE_TO_VALUE_DIR))
+
+from waste_service import WasteToValueEngine, ANALYSIS_MODES, WASTE_BATCH_MAX_CROPS
+
+bp = Blueprint('waste', __name__)
+waste_engine = None
+
+def run_waste_analyze_job(params, handle):
+    if waste_engine is None:
+        raise RuntimeError('Waste-to-Value service is currently unavailable.')
+    # A cancel stops the generation if this job is running it (not if it joined another request's)
+    result = waste_engine.analyze_waste(params['crop'], params['language'], mode=params.get('mode', 'single'),
+                                        cancelled=lambda: handle.cancelled)
+    if result.get('error'):
+        raise RuntimeError(result['error'])
+    return result
+
+def init_app(app):
+    global waste_engine
+    try:
+        print("Initializing Waste-to-Value Engine...")
+        waste_engine = WasteToValueEngine()
+        print("Waste-to-Value Engine initialized successfully")
+    except Exception as e:
+        print(f"Warning: Waste-to-Value Engine failed to initialize: {e}")
+        print("   The /api/waste-to-value endpoints will return errors until Ollama is available.")
+        import traceback
+        traceback.print_exc()
+    get_job_manager().register('waste.analyze', run_waste_analyze_job)
+    app.register_blueprint(bp)
+
+# --- Waste To Value Routes ---
+def resolve_waste_context(data):
+    """
+    Chat context from `analysis_id` (preferred; stored server-side) or the
+    legacy inline `context`. Returns (context, error_response).
+    """
+    analysis_id = data.get('analysis_id')
+    if analysis_id:
+        context = waste_engine.get_analysis(analysis_id)
+        if context is None and not data.get('context'):
+            # 410 tells the client to resend the analysis inline
+            return None, (jsonify({'error': 'Unknown or expired analysis_id', 'code': 'analysis_expired'}), 410)
+        if context is not None:
+            return context, None
+    return data.get('context'), None
+
+@bp.route('/api/waste-to-value/analyze', methods=['POST', 'OPTIONS'])
+@require_auth
+@rate_limit('analyze')
+def analyze_waste():
+    try:
+        data = request.json
+        crop = data.get('crop')
+        language = data.get('language', 'English')
+        mode = data.get('mode', 'single')
+        print(f"[WASTE] Analyze -> Crop: {crop}, Lang: {language}, Mode: {mode}")
+        
+        if not crop:
+            return jsonify({'error': 'Crop name is required'}), 400
+        if mode not in ANALYSIS_MODES:
+            return jsonify({'error': f'mode must be one of {list(ANALYSIS_MODES)}'}), 400
+        
+        if waste_engine is None:
+            return jsonify({'error': 'Waste-to-Value service is currently unavailable.'}), 503
+        
+        if data.get('async'):
+            cached = waste_engine.get_analysis(waste_engine.cache_key(crop, language))
+            if cached is not None:
+                return jsonify({'success': True, 'result': cached})
+            job_id = get_job_manager().submit(
+                'waste.analyze', {'crop': crop, 'language': language, 'mode': mode}, owner=current_uid()
+            )
+            print(f"[WASTE] Queued -> Job: {job_id[:8]}...")
+            return jsonify({'success': True, 'job_id': job_id, 'status': 'queued'}), 202
+        
+        result = waste_engine.analyze_waste(crop, language, mode=mode)
+        print(f"[WASTE] Success -> Result: {result.get('conclusion', {}).get('title', 'N/A')}")
+        
+        return jsonify({'success': True, 'result': result})
+    except Exception as e:
+        print(f"[WASTE] Analyze Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/waste-to-value/analyze/stream', methods=['POST', 'OPTIONS'])
+@require_auth
+@rate_limit('analyze')
+def analyze_waste_stream():
+    try:
+        data = request.json
+        crop = data.get('crop')
+        language = data.get('language', 'English')
+        print(f"[WASTE] Stream Analyze -> Crop: {crop}, Lang: {language}")
+        
+        if not crop:
+            return jsonify({'error': 'Crop name is required'}), 400
+        
+        if waste_engine is None:
+            return jsonify({'error': 'Waste-to-Value service is currently unavailable.'}), 503
+        
+        def generate():
+            try:
+                # One event per option as soon as it is complete, then the conclusion
+                for event in waste_engine.stream_analysis(crop, language):
+                    yield f"data: {json.dumps(event)}\n\n"
+            except Exception as e:
+                print(f"[WASTE] Generator Error: {e}")
+                yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+        
+        response = Response(generate(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        response.headers['Connection'] = 'keep-alive'
+        return response
+    except Exception as e:
+        print(f"[WASTE] Stream Analyze Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/waste-to-value/analyze/batch', methods=['POST', 'OPTIONS'])
+@require_auth
+@rate_limit('batch')
+def analyze_waste_batch():
+    try:
+        data = request.json
+        crops = data.get('crops')
+        language = data.get('language', 'English')
+        mode = data.get('mode', 'single')
+        
+        if not isinstance(crops, list) or not crops or not all(isinstance(c, str) and c.strip() for c in crops):
+            return jsonify({'error': 'crops must be a non-empty list of crop names'}), 400
+        if len(crops) > WASTE_BATCH_MAX_CROPS:
+            return jsonify({'error': f'At most {WASTE_BATCH_MAX_CROPS} crops per batch'}), 400
+        if mode not in ANALYSIS_MODES:
+            return jsonify({'error': f'mode must be one of {list(ANALYSIS_MODES)}'}), 400
+        
+        if waste_engine is None:
+            return jsonify({'error': 'Waste-to-Value service is currently unavailable.'}), 503
+        
+        print(f"[WASTE] Batch Analyze -> {len(crops)} crops, Lang: {language}, Mode: {mode}")
+        
+        def generate():
+            try:
+                # One event per crop as soon as it is ready, then the aggregated results
+                for event in waste_engine.analyze_batch(crops, language, mode):
+                    if event['type'] == 'done':
+                        print(f"[WASTE] Batch Done -> {event['cached']} cached, {event['generated']} generated,"
+                              f" {event['failed']} failed in {event['elapsed_ms']}ms")
+                    yield f"data: {json.dumps(event)}\n\n"
+            except Exception as e:
+                print(f"[WASTE] Batch Generator Error: {e}")
+                yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+        
+        response = Response(generate(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        response.headers['Connection'] = 'keep-alive'
+        return response
+    except Exception as e:
+        print(f"[WASTE] Batch Analyze Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/waste-to-value/chat', methods=['POST', 'OPTIONS'])
+@require_auth
+@rate_limit('chat')
+def chat_waste_api():
+    try:
+        data = request.json
+        question = data.get('question')
+        language = data.get('language', 'English')
+        
+        if not question or not (data.get('analysis_id') or data.get('context')):
+            return jsonify({'error': 'analysis_id (or context) and question are required'}), 400
+        
+        print(f"[WASTE] Chat -> Question: \"{question[:50]}...\"")
+        
+        if waste_engine is None:
+            return jsonify({'error': 'Waste-to-Value service is currently unavailable.'}), 503
+        
+        context, error = resolve_waste_context(data)
+        if error:
+            return error
+        
+        response = waste_engine.chat_waste(context, question, language)
+        print(f"[WASTE] Success -> Response Length: {len(response)} chars")
+        
+        return jsonify({'success': True, 'response': response})
+    except Exception as e:
+        print(f"[WASTE] Chat Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/waste-to-value/chat/stream', methods=['POST', 'OPTIONS'])
+@require_auth
+@rate_limit('chat')
+def chat_waste_stream():
+    try:
+        data = request.json
+        question = data.get('question')
+        language = data.get('language', 'English')
+        
+        if not question or not (data.get('analysis_id') or data.get('context')):
+            return jsonify({'error': 'analysis_id (or context) and question are required'}), 400
+        
+        print(f"[WASTE] Stream Chat -> Question: \"{question[:50]}...\"")
+        
+        if waste_engine is None:
+            return jsonify({'error': 'Waste-to-Value service is currently unavailable.'}), 503
+        
+        context, error = resolve_waste_context(data)
+        if error:
+            return error
+        
+        def generate():
+            try:
+                for chunk in waste_engine.stream_chat_waste(context, question, language):
+                    yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+            except Exception as e:
+                print(f"[WASTE] Generator Error: {e}")
+                yield f"data: {json.dumps({'error': str(e)})}\n\n"
+        
+        response = Response(generate(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        response.headers['Connection'] = 'keep-alive'
+        return response
+    except Exception as e:
+        print(f"[WASTE] Stream Chat Error: {e}")
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,213 @@
+"""
+Deterministic business-match scorer.
+
+Encodes a FarmerProfile and the requirements of every business in
+BUSINESS_OPTIONS as feature vectors and ranks all options in one vectorized
+pass, so /api/business-advisor/init can answer in milliseconds without
+waiting on the LLM. Requirement figures follow the research notes shown in
+the frontend (Frontend/src/data/businessData.ts).
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# ============================================
+# BUSINESS REQUIREMENTS
+# ============================================
+
+# Skill tags a business benefits from; farmer skills are mapped onto these.
+SKILL_TAGS = ["farming", "horticulture", "dairy", "livestock", "poultry", "fishery", "compost", "business"]
+
+# Levels: 0 = low, 1 = medium, 2 = high
+BUSINESS_REQUIREMENTS: Dict[str, dict] = {
+    "1":  {"capital": 10_000_000, "land": 1.0,  "water": 2, "risk": 2, "market": 2, "full_time": True,
+           "skills": ["horticulture", "farming"],
+           "estimated_cost": "₹1 Cr – ₹1.15 Cr", "profit_potential": "226% ROI",
+           "requirements": ["1 Acre Land", "Greenhouse", "Drip Irrigation"]},
+    "2":  {"capital": 500_000, "land": 0.0, "water": 2, "risk": 1, "market": 2, "full_time": True,
+           "skills": ["business"],
+           "estimated_cost": "₹5L - ₹9L", "profit_potential": "Volume Based",
+           "requirements": ["Borewell Water", "RO Plant", "BIS License"]},
+    "3":  {"capital": 150_000, "land": 0.0, "water": 0, "risk": 0, "market": 2, "full_time": True,
+           "skills": ["business"],
+           "estimated_cost": "₹1.5L - ₹6L", "profit_potential": "₹5L - ₹10L Rev",
+           "requirements": ["Shop Space", "High Footfall Location"]},
+    "4":  {"capital": 200_000, "land": 0.0, "water": 1, "risk": 1, "market": 1, "full_time": False,
+           "skills": ["farming"],
+           "estimated_cost": "₹2L - ₹5L", "profit_potential": "₹25k - ₹60k/mo",
+           "requirements": ["300 sq.ft Tanks", "Clean Water", "Training"]},
+    "5":  {"capital": 1_000_000, "land": 1.0, "water": 2, "risk": 1, "market": 1, "full_time": True,
+           "skills": ["dairy", "livestock"],
+           "estimated_cost": "₹10L - ₹13L", "profit_potential": "₹20k - ₹40k/mo",
+           "requirements": ["Fodder Land", "Cattle Shed"]},
+    "6":  {"capital": 650_000, "land": 0.5, "water": 1, "risk": 1, "market": 1, "full_time": True,
+           "skills": ["dairy", "livestock"],
+           "estimated_cost": "₹6.5L - ₹9.5L", "profit_potential": "₹30k - ₹60k/mo",
+           "requirements": ["Goat Shed", "Fodder Supply"]},
+    "7":  {"capital": 180_000, "land": 0.0, "water": 1, "risk": 1, "market": 1, "full_time": False,
+           "skills": ["farming", "horticulture"],
+           "estimated_cost": "₹1.8L - ₹3L", "profit_potential": "₹15k - ₹35k/mo",
+           "requirements": ["Small Shed", "Humidity Control"]},
+    "8":  {"capital": 650_000, "land": 0.25, "water": 1, "risk": 2, "market": 1, "full_time": True,
+           "skills": ["poultry", "livestock"],
+           "estimated_cost": "₹6.5L - ₹8.5L", "profit_potential": "₹40k - ₹70k/cycle",
+           "requirements": ["Poultry Shed", "Daily Management"]},
+    "9":  {"capital": 80_000, "land": 0.25, "water": 1, "risk": 0, "market": 0, "full_time": False,
+           "skills": ["compost", "farming"],
+           "estimated_cost": "₹80k - ₹1.5L", "profit_potential": "₹8k - ₹20k/mo",
+           "requirements": ["Shaded Beds", "Cow Dung Supply"]},
+    "10": {"capital": 350_000, "land": 0.5, "water": 2, "risk": 1, "market": 1, "full_time": True,
+           "skills": ["horticulture", "farming"],
+           "estimated_cost": "₹3.5L - ₹6L", "profit_potential": "₹1.5L - ₹3L/yr",
+           "requirements": ["Shade Net", "Reliable Water"]},
+    "11": {"capital": 120_000, "land": 0.25, "water": 0, "risk": 0, "market": 0, "full_time": False,
+           "skills": ["compost", "dairy"],
+           "estimated_cost": "₹1.2L - ₹2.5L", "profit_potential": "₹15k - ₹35k/mo",
+           "requirements": ["Cow Dung Supply", "Storage Shed"]},
+    "12": {"capital": 150_000, "land": 0.0, "water": 0, "risk": 0, "market": 1, "full_time": False,
+           "skills": ["business", "dairy"],
+           "estimated_cost": "₹1.5L - ₹3L", "profit_potential": "₹20k - ₹50k/mo",
+           "requirements": ["Moulds & Dryer", "Cow Dung Supply"]},
+    "13": {"capital": 250_000, "land": 0.0, "water": 0, "risk": 0, "market": 1, "full_time": False,
+           "skills": ["business"],
+           "estimated_cost": "₹2.5L - ₹4L", "profit_potential": "₹25k - ₹60k/mo",
+           "requirements": ["Pressing Machine", "Leaf Supply"]},
+    "14": {"capital": 300_000, "land": 0.0, "water": 0, "risk": 1, "market": 2, "full_time": True,
+           "skills": ["business", "farming"],
+           "estimated_cost": "₹3L - ₹6L", "profit_potential": "₹20k - ₹50k/mo",
+           "requirements": ["Shop", "Dealer License"]},
+    "15": {"capital": 350_000, "land": 1.0, "water": 2, "risk": 1, "market": 1, "full_time": True,
+           "skills": ["fishery"],
+           "estimated_cost": "₹3.5L - ₹6L", "profit_potential": "₹1.2L - ₹2.5L/cycle",
+           "requirements": ["Pond (0.5–1 Acre)", "Year-round Water"]},
+}
+
+# Relative importance of each fit component (sums to 1)
+FEATURE_WEIGHTS = np.array([0.30, 0.15, 0.10, 0.20, 0.10, 0.10, 0.05], dtype=np.float32)
+FEATURE_NAMES = ["capital", "land", "water", "skills", "risk", "market", "time"]
+
+_IDS = list(BUSINESS_REQUIREMENTS)
+_REQ_CAPITAL = np.array([BUSINESS_REQUIREMENTS[i]["capital"] for i in _IDS], dtype=np.float64)
+_REQ_LAND = np.array([BUSINESS_REQUIREMENTS[i]["land"] for i in _IDS], dtype=np.float64)
+_REQ_WATER = np.array([BUSINESS_REQUIREMENTS[i]["water"] for i in _IDS], dtype=np.float32)
+_REQ_RISK = np.array([BUSINESS_REQUIREMENTS[i]["risk"] for i in _IDS], dtype=np.float32)
+_REQ_MARKET = np.array([BUSINESS_REQUIREMENTS[i]["market"] for i in _IDS], dtype=np.float32)
+_REQ_FULL_TIME = np.array([BUSINESS_REQUIREMENTS[i]["full_time"] for i in _IDS], dtype=bool)
+_REQ_SKILLS = np.array(
+    [[tag in BUSINESS_REQUIREMENTS[i]["skills"] for tag in SKILL_TAGS] for i in _IDS], dtype=np.float32
+)
+
+# ============================================
+# PROFILE ENCODING
+# ============================================
+
+_LAND_UNIT_TO_ACRES = {"acres": 1.0, "acre": 1.0, "hectares": 2.471, "hectare": 2.471,
+                       "bigha": 0.62, "guntha": 0.025}
+_LEVELS = {"low": 0, "poor": 0, "medium": 1, "moderate": 1, "high": 2, "good": 2}
+_SKILL_KEYWORDS = {
+    "farming": ["farm", "crop", "agri", "organic", "mushroom", "spirulina"],
+    "horticulture": ["horti", "greenhouse", "nursery", "flower", "garden"],
+    "dairy": ["dairy", "cow", "milk", "cattle", "buffalo"],
+    "livestock": ["goat", "livestock", "cattle", "animal", "sheep"],
+    "poultry": ["poultry", "chicken", "broiler", "layer"],
+    "fishery": ["fish", "aqua", "pond"],
+    "compost": ["compost", "vermi", "manure", "bio-input"],
+    "business": ["business", "shop", "trading", "factory", "retail", "sales", "marketing"],
+}
+
+
+def _water_level(water: Optional[str]) -> int:
+    if not water:
+        return 1
+    w = water.lower()
+    if "no water" in w or w in {"none", "low", "scarce"} or "rainfed" in w:
+        return 0
+    if any(k in w for k in ("borewell", "canal", "drip", "river", "high", "abundant", "well")):
+        return 2
+    return _LEVELS.get(w, 1)
+
+
+def encode_profile(profile) -> dict:
+    """Maps the free-form FarmerProfile fields onto the scorer's numeric features"""
+    skills_text = " ".join(profile.skills or []).lower()
+    skill_vec = np.array(
+        [any(k in skills_text for k in _SKILL_KEYWORDS[tag]) for tag in SKILL_TAGS], dtype=np.float32
+    )
+    return {
+        "capital": float(profile.capital),
+        "land": float(profile.land_size) * _LAND_UNIT_TO_ACRES.get((profile.land_unit or "acres").lower(), 1.0),
+        "water": _water_level(profile.water_availability),
+        "risk": _LEVELS.get((profile.risk_level or "medium").lower(), 1),
+        "market": _LEVELS.get((profile.market_access or "moderate").lower(), 1),
+        "full_time": "part" not in (profile.time_availability or "full-time").lower(),
+        "skills": skill_vec,
+    }
+
+
+# ============================================
+# SCORING
+# ============================================
+
+def fit_matrix(features: dict) -> np.ndarray:
+    """(n_options, n_features) matrix of per-requirement fits in [0, 1]"""
+    capital_fit = np.clip(features["capital"] / _REQ_CAPITAL, 0.0, 1.0)
+    land_fit = np.where(_REQ_LAND > 0, np.clip(features["land"] / np.maximum(_REQ_LAND, 1e-9), 0.0, 1.0), 1.0)
+    water_fit = 1.0 - np.clip(_REQ_WATER - features["water"], 0, 2) / 2.0
+    # No skills listed -> neutral 0.5 instead of punishing every option
+    if features["skills"].any():
+        skills_fit = (_REQ_SKILLS @ features["skills"]) / _REQ_SKILLS.sum(axis=1)
+    else:
+        skills_fit = np.full(len(_IDS), 0.5, dtype=np.float32)
+    risk_fit = 1.0 - np.clip(_REQ_RISK - features["risk"], 0, 2) / 2.0
+    market_fit = 1.0 - np.clip(_REQ_MARKET - features["market"], 0, 2) / 2.0
+    time_fit = np.where(_REQ_FULL_TIME & (not features["full_time"]), 0.5, 1.0)
+    return np.stack([capital_fit, land_fit, water_fit, skills_fit, risk_fit, market_fit, time_fit], axis=1)
+
+
+def _reason(fits: np.ndarray, req: dict, features: dict) -> str:
+    strengths = []
+    if fits[0] >= 1.0:
+        strengths.append(f"fits your ₹{features['capital']:,.0f} budget")
+    if req["land"] == 0:
+        strengths.append("needs almost no land")
+    elif fits[1] >= 1.0:
+        strengths.append(f"works on your {features['land']:g} acres")
+    if fits[3] > 0.5:
+        strengths.append("matches your skills")
+    if fits[4] >= 1.0 and req["risk"] == 0:
+        strengths.append("low risk")
+    if not req["full_time"]:
+        strengths.append("can be run part-time")
+    gaps = []
+    if fits[0] < 1.0:
+        gaps.append(f"needs about {req['estimated_cost']} investment")
+    if fits[2] < 1.0:
+        gaps.append("needs reliable water")
+    text = ", ".join(strengths[:3]).capitalize() if strengths else "Reasonable fit for your profile"
+    if gaps:
+        text += f"; note: {gaps[0]}"
+    return text + "."
+
+
+def rank_businesses(profile, titles: Dict[str, str], top_k: int = 3) -> List[dict]:
+    """Scores every business in one vectorized pass and returns the top_k as recommendation dicts"""
+    features = encode_profile(profile)
+    fits = fit_matrix(features)
+    scores = fits @ FEATURE_WEIGHTS
+    order = np.argsort(-scores, kind="stable")[:top_k]
+
+    recommendations = []
+    for idx in order:
+        business_id = _IDS[idx]
+        req = BUSINESS_REQUIREMENTS[business_id]
+        recommendations.append({
+            "id": business_id,
+            "title": titles.get(business_id, business_id),
+            "reason": _reason(fits[idx], req, features),
+            "match_score": int(round(float(scores[idx]) * 100)),
+            "estimated_cost": req["estimated_cost"],
+            "profit_potential": req["profit_potential"],
+            "requirements": list(req["requirements"]),
+        })
+    return recommendations
@@ -0,0 +1,181 @@
+"""
+Token-budgeted chat memory for the business advisor.
+
+Keeps the most recent turns verbatim and folds older turns into a compact
+running summary, generated in the background so it never delays a reply.
+`prompt_history()` returns a history that fits the token budget left over
+after the system prompt, profile context and the new user message. Token
+counts are a conservative estimate, not the model's tokenizer, so the
+budget should leave some headroom below num_ctx (see krishi_chatbot.py).
+"""
+
+import contextvars
+import math
+import threading
+from typing import List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+# Per-message overhead of the chat template (role header, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+MAX_SUMMARY_TOKENS = 300
+
+SUMMARY_PROMPT = """You maintain the memory of an agricultural business advisor's conversation with a farmer.
+Update the summary below with the new conversation turns. Keep every concrete fact, number,
+decision, preference and open question; drop greetings and repetition. Write at most 150 words,
+in the same language as the conversation.
+
+CURRENT SUMMARY:
+{summary}
+
+NEW TURNS:
+{turns}
+
+UPDATED SUMMARY:"""
+
+
+def count_tokens(text: str) -> int:
+    """
+    Cheap tokenizer-free estimate for Llama-family models. English averages
+    about 4 characters per token and Devanagari about 1.5, so counting 3
+    characters per token for ASCII and one token per other character
+    overestimates typical text. Unusual input (long numbers, rare
+    characters) can still tokenize worse, hence the prompt headroom.
+    """
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    other_chars = len(text) - ascii_chars
+    return math.ceil(ascii_chars / 3) + other_chars
+
+
+def message_tokens(message: BaseMessage) -> int:
+    return count_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if count_tokens(text) <= max_tokens:
+        return text
+    # Binary search on length; count_tokens is monotonic in prefix length
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+
+class ChatMemory:
+    """Recent turns verbatim + rolling summary of everything older"""
+
+    def __init__(self, llm=None, budget_tokens: int = 2800, keep_recent_turns: int = 4):
+        self.llm = llm
+        self.budget_tokens = budget_tokens
+        self.keep_recent_turns = keep_recent_turns
+        self.summary = ""
+        self.messages: List[BaseMessage] = []   # Verbatim window (Human/AI pairs)
+        self._pending: List[BaseMessage] = []   # Being folded into the summary
+        self._lock = threading.Lock()
+        self._summarizer: Optional[threading.Thread] = None
+        self._epoch = 0                         # Bumped by clear() to discard in-flight summaries
+
+    def add_turn(self, human: str, ai: str) -> None:
+        with self._lock:
+            self.messages.append(HumanMessage(content=human))
+            self.messages.append(AIMessage(content=ai))
+            if self._summarizer is None:
+                self._compact()
+
+    def _compact(self) -> None:
+        """
+        Moves old turns to _pending in batches rather than one per turn: the
+        history then only changes shape once every few turns, so Ollama's
+        cached prompt prefix stays valid for the turns in between. Caller
+        holds the lock.
+        """
+        window_tokens = sum(message_tokens(m) for m in self.messages)
+        if len(self.messages) <= 4 * self.keep_recent_turns and window_tokens <= self.budget_tokens // 2:
+            return
+        overflow = len(self.messages) - 2 * self.keep_recent_turns
+        if overflow <= 0:
+            overflow = 2  # Over the token limit with few turns: fold the oldest one
+        self._pending = self.messages[:overflow]
+        self.messages = self.messages[overflow:]
+        self._start_summarizer()
+
+    def _start_summarizer(self) -> None:
+        if self.llm is None:
+            # No LLM to summarise with: older turns are simply forgotten
+            self._pending = []
+            return
+        # Carries the caller's usage-ledger tags, so summaries count towards the chat that caused them
+        self._summarizer = threading.Thread(
+            target=contextvars.copy_context().run, args=(self._summarize,), name="advisor-summary", daemon=True
+        )
+        self._summarizer.start()
+
+    def _summarize(self) -> None:
+        with self._lock:
+            summary, pending, epoch = self.summary, list(self._pending), self._epoch
+        turns = "\n".join(
+            f"{'Farmer' if isinstance(m, HumanMessage) else 'Advisor'}: {m.content}" for m in pending
+        )
+        try:
+            response = self.llm.invoke(SUMMARY_PROMPT.format(summary=summary or "(empty)", turns=turns))
+            new_summary = truncate_to_tokens(response.content.strip(), MAX_SUMMARY_TOKENS)
+        except Exception as e:
+            print(f"Warning: chat summarisation failed, keeping previous summary: {e}")
+            new_summary = summary
+        with self._lock:
+            self._summarizer = None
+            if epoch != self._epoch:
+                return  # Memory was cleared while summarising
+            self.summary = new_summary
+            self._pending = []
+            # More turns may have piled up while we were summarising
+            self._compact()
+
+    def prompt_history(self, fixed_tokens: int) -> List[BaseMessage]:
+        """
+        History messages for the next prompt whose estimated size fits in
+        budget_tokens - fixed_tokens. Newest turns win; the summary comes first.
+        """
+        with self._lock:
+            available = self.budget_tokens - fixed_tokens
+            history: List[BaseMessage] = []
+            if self.summary:
+                summary_msg = SystemMessage(content=f"Summary of the earlier conversation:\n{self.summary}")
+                if message_tokens(summary_msg) <= available:
+                    history.append(summary_msg)
+                    available -= message_tokens(summary_msg)
+
+            # Turns still being summarised are included verbatim while they fit
+            recent: List[BaseMessage] = []
+            for message in reversed(self._pending + self.messages):
+                cost = message_tokens(message)
+                if cost > available:
+                    break
+                recent.append(message)
+                available -= cost
+            recent.reverse()
+            # Never start the window with a dangling AI reply
+            if recent and isinstance(recent[0], AIMessage):
+                recent = recent[1:]
+            return history + recent
+
+    def state(self) -> tuple:
+        """Summary plus every turn the next prompt may draw on, for cache keys"""
+        with self._lock:
+            turns = tuple((m.type, m.content) for m in self._pending + self.messages)
+            return self.summary, turns
+
+    def all_messages(self) -> List[BaseMessage]:
+        with self._lock:
+            return self._pending + self.messages
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self.summary = ""
+            self.messages = []
+            self._pending = []
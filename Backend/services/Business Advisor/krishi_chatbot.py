@@ -4,19 +4,38 @@ AI-powered business advisor for Indian farmers using LangChain + Ollama
 """
 
 import os
+import sys
+from pathlib import Path
 from typing import Optional, List
 import json
 import re
 import html
+import threading
+import uuid
 
 # --- LANGCHAIN IMPORTS (Refactored for correctness) ---
-from langchain_community.chat_models import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage
-from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableSerializable
 from pydantic import BaseModel, field_validator
 
+# Make Backend/ importable for shared utils when run standalone
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from utils.singleflight import SingleFlight
+from utils.semantic_cache import SemanticCache, context_id
+from utils.prompt_stats import PromptStats
+from utils.llm_clients import get_routed_chat_model, RoutedChatModel, DEFAULT_NUM_CTX, AFFINITY_KEY, ollama_breaker
+from utils.circuit_breaker import CircuitOpenError
+from utils.ollama_router import is_backend_error
+from utils.chain_registry import ChainRegistry
+from utils.llm_json import LLMJSONParser, JSONExtractError, json_format
+from utils.usage_ledger import tag_usage
+from business_scorer import rank_businesses
+from chat_memory import ChatMemory, count_tokens, truncate_to_tokens, MESSAGE_OVERHEAD_TOKENS
+
 # ============================================
 # BUSINESS OPTIONS (STRICT LIST)
 # ============================================
@@ -44,7 +63,53 @@ BUSINESS_OPTIONS = [
 # ============================================
 
 DEFAULT_OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
-DEFAULT_OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+
+ADVISOR_NUM_CTX = DEFAULT_NUM_CTX
+ADVISOR_NUM_PREDICT = 1200
+# Left unused below num_ctx in case count_tokens() underestimates a prompt
+ADVISOR_PROMPT_HEADROOM_TOKENS = ADVISOR_NUM_CTX // 10
+# Estimated prompt tokens available per turn (system rules + profile + history
+# + message); the rest of num_ctx is reserved for the reply and the headroom
+ADVISOR_PROMPT_BUDGET_TOKENS = int(os.getenv(
+    "ADVISOR_PROMPT_BUDGET_TOKENS", ADVISOR_NUM_CTX - ADVISOR_NUM_PREDICT - ADVISOR_PROMPT_HEADROOM_TOKENS
+))
+# Turns kept verbatim; older ones are folded into a background summary
+ADVISOR_RECENT_TURNS = int(os.getenv("ADVISOR_RECENT_TURNS", 4))
+# Evaluate the system prompt + profile in the background when a session starts,
+# so the first chat turn only has to evaluate the question. Off by default: it
+# costs one extra prompt evaluation per /init, even for sessions that never chat.
+ADVISOR_PRIME_PREFIX = os.getenv("ADVISOR_PRIME_PREFIX", "0").lower() not in {"0", "false"}
+
+# Recommendations are ranked deterministically; set ADVISOR_LLM_REASONS=1 to have
+# the LLM rewrite the reason text afterwards (adds one generation to /init)
+ADVISOR_LLM_REASONS = os.getenv("ADVISOR_LLM_REASONS", "0").lower() in {"1", "true"}
+
+# Farmers with identical profiles asking at the same time share one generation
+_recommendation_flight = SingleFlight("advisor.recommendations")
+
+# Output shape of the reasons call, enforced by Ollama's structured output
+REASONS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "reasons": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"id": {"type": "string"}, "reason": {"type": "string"}},
+                "required": ["id", "reason"],
+            },
+        },
+    },
+    "required": ["reasons"],
+}
+_reasons_json = LLMJSONParser("advisor.reasons")
+
+# FAQ-style questions ("how much will I earn") asked by farmers with the same
+# profile reuse an earlier answer instead of a new generation
+_answer_cache = SemanticCache("advisor.chat")
+
+# Prompt-eval token counts per turn, to show how much of the prefix Ollama reused
+_prompt_stats = PromptStats("advisor.chat")
 
 force_cpu = os.getenv("OLLAMA_FORCE_CPU", "1").lower() not in {"0", "false"}
 if force_cpu and "OLLAMA_NUM_GPU" not in os.environ:
@@ -273,6 +338,65 @@ RULES jinhe aapko follow karna hai:
 Hinglish (Hindi-English mix) mein respond kariye."""
 }
 
+# Served instantly while Ollama is down or timing out, instead of a raw error
+UNAVAILABLE_MESSAGES = {
+    "english": "The advisor is temporarily unavailable. Please try again in a minute.",
+    "hindi": "सलाहकार अभी उपलब्ध नहीं है। कृपया एक मिनट बाद फिर से प्रयास करें।",
+    "hinglish": "Advisor abhi available nahi hai. Kripya ek minute baad phir try kariye.",
+}
+
+
+# ============================================
+# SHARED CHAINS
+# ============================================
+
+def _advisor_llm(**overrides) -> RoutedChatModel:
+    """The advisor's shared chat model, routed over OLLAMA_BASE_URLS (see utils/llm_clients.py)"""
+    params = dict(
+        model=DEFAULT_OLLAMA_MODEL,
+        temperature=0.6,  # Balanced for accurate yet natural responses (quality optimized)
+        num_ctx=ADVISOR_NUM_CTX,         # Prompt is kept within budget by ChatMemory
+        num_predict=ADVISOR_NUM_PREDICT, # Balanced response length for streaming
+    )
+    params.update(overrides)
+    return get_routed_chat_model(**params)
+
+
+def prompt_language(language: str) -> str:
+    """SYSTEM_PROMPTS key for a profile language (English for anything unknown)"""
+    key = language.lower()
+    return key if key in SYSTEM_PROMPTS else "english"
+
+
+def _build_chat_chain(language: str) -> RunnableSerializable:
+    # Ordered from most to least stable so Ollama can reuse the KV cache for
+    # the longest possible prefix:
+    # 1. System rules (identical for every session in this language)
+    # 2. Farmer context (identical for every turn of this session)
+    # 3. Chat history (summary, then append-only turns between compactions)
+    # 4. User input
+    # Nothing per-turn (timestamps, counters) may appear before the history.
+    # The profile is a messages placeholder so user-entered text is never
+    # parsed as template syntax.
+    prompt = ChatPromptTemplate.from_messages([
+        SystemMessage(content=SYSTEM_PROMPTS[language]),
+        MessagesPlaceholder(variable_name="profile"),
+        MessagesPlaceholder(variable_name="chat_history"),
+        HumanMessagePromptTemplate.from_template("{input}")
+    ])
+    # Prompt -> LLM (message kept whole for its prompt-eval metadata)
+    return prompt | _advisor_llm()
+
+
+# One compiled chain per language, shared by every session
+_chains = ChainRegistry("advisor")
+_chains.register("chat", _build_chat_chain)
+
+
+def precompile_chains() -> int:
+    """Compile every language's chain up front (call once at startup)"""
+    return _chains.precompile(["chat"], list(SYSTEM_PROMPTS))
+
 
 # ============================================
 # CHATBOT CLASS
@@ -283,22 +407,34 @@ class KrishiSaarthiAdvisor:
     
     def __init__(self, farmer_profile: FarmerProfile):
         self.profile = farmer_profile
-        self.llm: Optional[ChatOllama] = None
+        self.llm: Optional[RoutedChatModel] = None
         self.chain: Optional[RunnableSerializable] = None
-        self.chat_history: List[BaseMessage] = []
+        self._fixed_prompt_tokens = 0
+        self._prefix_messages: List[BaseMessage] = []
+        self.last_usage: Optional[dict] = None
+        # Keeps this session on one Ollama backend so its cached prefix is reused;
+        # also identifies the session in the usage ledger
+        self.session_key = uuid.uuid4().hex
+        self._route_config = {"metadata": {AFFINITY_KEY: self.session_key}}
         self._initialize_llm()
+        self.memory = ChatMemory(
+            llm=self.llm,
+            budget_tokens=ADVISOR_PROMPT_BUDGET_TOKENS,
+            keep_recent_turns=ADVISOR_RECENT_TURNS,
+        )
         self._initialize_chain()
+        if ADVISOR_PRIME_PREFIX and self.chain and not ollama_breaker.is_open():
+            threading.Thread(target=self._prime_prefix, name="advisor-prime", daemon=True).start()
+
+    @property
+    def chat_history(self) -> List[BaseMessage]:
+        """Turns still held verbatim (older ones live in memory.summary)"""
+        return self.memory.all_messages()
     
     def _initialize_llm(self):
-        """Initialize ChatOllama LLM"""
+        """Borrow the shared, routed chat model for the advisor's settings"""
         try:
-            self.llm = ChatOllama(
-                model=DEFAULT_OLLAMA_MODEL,
-                temperature=0.6,  # Balanced for accurate yet natural responses (quality optimized)
-                num_ctx=4096,     # Full context window for complete conversation memory
-                num_predict=1200, # Balanced response length for streaming
-                base_url=DEFAULT_OLLAMA_BASE_URL,
-            )
+            self.llm = _advisor_llm()
         except Exception as e:
             print(f"Error initializing ChatOllama: {e}")
             print(
@@ -308,31 +444,46 @@ class KrishiSaarthiAdvisor:
             # Cannot raise here or app crash, but let it proceed to fail gracefully later
     
     def _initialize_chain(self):
-        """Initialize Runnable chain with prompt"""
+        """Borrow the compiled chain for the profile's language; the profile is bound per call"""
         if not self.llm:
             return
 
-        # Get system prompt based on language
-        system_rules = SYSTEM_PROMPTS.get(
-            self.profile.language.lower(), 
-            SYSTEM_PROMPTS["english"]
-        )
-        
-        # Build prompt template
-        # 1. System rules
-        # 2. Farmer context (dynamic)
-        # 3. Chat history
-        # 4. User input
-        
-        prompt = ChatPromptTemplate.from_messages([
+        language = prompt_language(self.profile.language)
+        system_rules = SYSTEM_PROMPTS[language]
+        self._prefix_messages = [
             SystemMessage(content=system_rules),
             SystemMessage(content=self.profile.to_context()),
-            MessagesPlaceholder(variable_name="chat_history"),
-            HumanMessagePromptTemplate.from_template("{input}")
-        ])
+        ]
+        self.chain = _chains.get("chat", language)
         
-        # Chain: Prompt -> LLM -> String Output
-        self.chain = prompt | self.llm | StrOutputParser()
+        # Tokens every turn pays before history and the user message
+        self._fixed_prompt_tokens = (
+            count_tokens(system_rules) + count_tokens(self.profile.to_context()) + 2 * MESSAGE_OVERHEAD_TOKENS
+        )
+    
+    def _prime_prefix(self):
+        """Have Ollama evaluate (and cache) the session's fixed prefix ahead of the first turn"""
+        tag_usage("advisor.prime", self.profile.language, self.session_key)
+        try:
+            # Same num_ctx as self.llm, otherwise Ollama reloads the model
+            primer = _advisor_llm(num_predict=1)
+            primer.invoke(self._prefix_messages + [HumanMessage(content="Namaste")], self._route_config)
+        except Exception as e:
+            print(f"Warning: advisor prefix priming failed: {e}")
+    
+    def _prompt_inputs(self, clean_message: str):
+        """
+        Chain inputs whose estimated size fits ADVISOR_PROMPT_BUDGET_TOKENS,
+        plus that estimate in tokens
+        """
+        # An oversized message is trimmed rather than silently truncated by Ollama
+        max_input = ADVISOR_PROMPT_BUDGET_TOKENS - self._fixed_prompt_tokens - MESSAGE_OVERHEAD_TOKENS
+        clean_message = truncate_to_tokens(clean_message, max(max_input, 0))
+        fixed = self._fixed_prompt_tokens + count_tokens(clean_message) + MESSAGE_OVERHEAD_TOKENS
+        history = self.memory.prompt_history(fixed)
+        prompt_tokens = fixed + sum(count_tokens(m.content) + MESSAGE_OVERHEAD_TOKENS for m in history)
+        inputs = {"profile": self._prefix_messages[1:], "chat_history": history, "input": clean_message}
+        return inputs, prompt_tokens
     
     def chat(self, user_message: str) -> str:
         """Send message and get response (Synchronous)"""
@@ -343,19 +494,28 @@ class KrishiSaarthiAdvisor:
             # excessive sanitization can break multilingual inputs, so we focus on script tags
             clean_message = html.escape(user_message)
             
-            # Invoke chain with current history
-            response = self.chain.invoke({
-                "chat_history": self.chat_history,
-                "input": clean_message
-            })
+            tag_usage("advisor.chat", self.profile.language, self.session_key)
+            ctx = self._answer_context_id()
+            self.last_usage = None
+            response, embedding = _answer_cache.lookup(clean_message, ctx, self.profile.language)
+            if response is None:
+                # Invoke chain with budgeted history
+                if ollama_breaker.is_open():
+                    return self._unavailable_message()
+                inputs, prompt_tokens = self._prompt_inputs(clean_message)
+                message = self.chain.invoke(inputs, self._route_config)
+                response = message.content
+                self.last_usage = _prompt_stats.record(message.response_metadata, prompt_tokens)
+                _answer_cache.store(clean_message, ctx, response, self.profile.language, embedding)
             
             # Update history manually
-            self.chat_history.append(HumanMessage(content=clean_message))
-            self.chat_history.append(AIMessage(content=response))
+            self.memory.add_turn(clean_message, response)
             
             return response.strip()
         except Exception as e:
             print(f"Chat Error: {e}")
+            if isinstance(e, CircuitOpenError) or is_backend_error(e):
+                return self._unavailable_message()
             return f"Error: {str(e)}"
 
     def stream_chat(self, user_message: str):
@@ -364,29 +524,58 @@ class KrishiSaarthiAdvisor:
             yield "Error: AI not initialized. Check server logs."
             return
 
+        full_response = ""
         try:
             clean_message = html.escape(user_message)
-            full_response = ""
             
-            # Use the .stream() method of the chain
-            for chunk in self.chain.stream({
-                "chat_history": self.chat_history,
-                "input": clean_message
-            }):
-                full_response += chunk
-                yield chunk
+            tag_usage("advisor.chat", self.profile.language, self.session_key)
+            ctx = self._answer_context_id()
+            self.last_usage = None
+            cached, embedding = _answer_cache.lookup(clean_message, ctx, self.profile.language)
+            if cached is not None:
+                full_response = cached
+                yield cached
+            else:
+                if ollama_breaker.is_open():
+                    yield self._unavailable_message()
+                    return
+                # Use the .stream() method of the chain
+                inputs, prompt_tokens = self._prompt_inputs(clean_message)
+                metadata = {}
+                for chunk in self.chain.stream(inputs, self._route_config):
+                    # Ollama reports prompt_eval_count on the final chunk only
+                    metadata = chunk.response_metadata or metadata
+                    if chunk.content:
+                        full_response += chunk.content
+                        yield chunk.content
+                self.last_usage = _prompt_stats.record(metadata, prompt_tokens)
+                _answer_cache.store(clean_message, ctx, full_response, self.profile.language, embedding)
             
             # Update history after full response is generated
-            self.chat_history.append(HumanMessage(content=clean_message))
-            self.chat_history.append(AIMessage(content=full_response))
+            self.memory.add_turn(clean_message, full_response)
             
         except Exception as e:
             print(f"Stream Chat Error: {e}")
-            yield f"Error: {str(e)}"
+            if isinstance(e, CircuitOpenError) or is_backend_error(e):
+                # Separate paragraph in case part of an answer was already sent
+                yield ("\n\n" if full_response else "") + self._unavailable_message()
+            else:
+                yield f"Error: {str(e)}"
+
+    def _unavailable_message(self) -> str:
+        return UNAVAILABLE_MESSAGES[prompt_language(self.profile.language)]
     
+    def _answer_context_id(self) -> int:
+        """
+        Cached answers are only shared between identical profiles in the same
+        language with the same conversation so far (summary and turns), so a
+        follow-up such as "tell me more" never gets another conversation's answer
+        """
+        return context_id(self.profile.to_context(), self.profile.language, *self.memory.state())
+
     def get_chat_history(self) -> str:
         """Get conversation history as a formatted string (for debugging/display)"""
-        formatted = ""
+        formatted = f"Summary: {self.memory.summary}\n" if self.memory.summary else ""
         for msg in self.chat_history:
             role = "AI" if isinstance(msg, AIMessage) else "User"
             formatted += f"{role}: {msg.content}\n"
@@ -394,99 +583,69 @@ class KrishiSaarthiAdvisor:
     
     def clear_memory(self):
         """Clear conversation history"""
-        self.chat_history = []
+        self.memory.clear()
         print("Conversation memory cleared")
 
-    def generate_recommendations(self) -> List[dict]:
-        """Generate top 3 business recommendations based on profile"""
-        if not self.llm:
-             # Fallback immediately if LLM is down
-             return self._get_fallback_recommendations()
-
+    def generate_recommendations(self, llm_reasons: Optional[bool] = None) -> List[dict]:
+        """
+        Generate top 3 business recommendations based on profile.
+        Ranking is deterministic (business_scorer) and takes milliseconds; the
+        LLM is only used, optionally, to rewrite the `reason` prose.
+        """
+        titles = {b["id"]: b["title"] for b in BUSINESS_OPTIONS}
+        recommendations = rank_businesses(self.profile, titles, top_k=3)
+
+        if llm_reasons is None:
+            llm_reasons = ADVISOR_LLM_REASONS
+        if llm_reasons and self.llm:
+            self._write_llm_reasons(recommendations)
+        return recommendations
+
+    def _write_llm_reasons(self, recommendations: List[dict]):
+        """Replace the templated reasons with LLM prose; keeps the templates on any failure"""
+        picks = [{"id": r["id"], "title": r["title"], "reason": r["reason"]} for r in recommendations]
         prompt_text = f"""
         Analyze this farmer's profile:
         {self.profile.to_context()}
         
-        Available Business Options:
-        {json.dumps(BUSINESS_OPTIONS, indent=2)}
+        These 3 businesses were selected for the farmer:
+        {json.dumps(picks, indent=2, ensure_ascii=False)}
         
         Task:
-        Select exactly 3 business options from the list above that best match the farmer's land, capital, skills, and risk profile.
+        For each business, write a 1-2 sentence reason why it suits this farmer's land, capital, skills, and risk profile.
+        Respond in {self.profile.language}.
         
-        Return ONLY a JSON array with this format:
-        [
-            {{
-                "id": "business_id_1",
-                "title": "Title 1",
-                "reason": "Reason 1",
-                "match_score": 95,
-                "estimated_cost": "Cost 1",
-                "profit_potential": "Profit 1",
-                "requirements": ["Req 1", "Req 2"]
-            }},
-            {{
-                "id": "business_id_2",
-                "title": "Title 2",
-                "reason": "Reason 2",
-                "match_score": 90,
-                "estimated_cost": "Cost 2",
-                "profit_potential": "Profit 2",
-                "requirements": ["Req 1", "Req 2"]
-            }},
-            {{
-                "id": "business_id_3",
-                "title": "Title 3",
-                "reason": "Reason 3",
-                "match_score": 85,
-                "estimated_cost": "Cost 3",
-                "profit_potential": "Profit 3",
-                "requirements": ["Req 1", "Req 2"]
-            }}
-        ]
+        Return ONLY a JSON object with this format:
+        {{"reasons": [
+            {{"id": "business_id", "reason": "Reason"}}
+        ]}}
         
         Do not add any markdown formatting (like ```json). Just the raw JSON string.
         """
         
+        tag_usage("advisor.reasons", self.profile.language, self.session_key)
         try:
-            # Use LLM directly for one-off generation
-            response_msg = self.llm.invoke(prompt_text)
-            response = response_msg.content
-            
-            # Robust JSON extraction
-            cleaned_response = response.strip()
-            
-            # Remove markdown code fences
-            cleaned_response = re.sub(r'```json\s*|\s*```', '', cleaned_response)
-            
-            # Try to extract JSON array from text (in case LLM added explanation)
-            json_match = re.search(r'\[\s*\{.*\}\s*\]', cleaned_response, re.DOTALL)
-            if json_match:
-                cleaned_response = json_match.group(0)
-            
-            # Remove trailing commas before closing braces/brackets (common LLM error)
-            cleaned_response = re.sub(r',(\s*[}\]])', r'\1', cleaned_response)
-            
-            try:
-                recommendations = json.loads(cleaned_response)
-            except json.JSONDecodeError as json_err:
-                print(f"Warning: JSON parse error: {json_err}")
-                print(f"Raw response (first 500 chars): {response[:500]}")
-                print(f"Cleaned response (first 500 chars): {cleaned_response[:500]}")
-                raise  # Re-raise to trigger fallback
-            
-            # Ensure we strictly have 3 items and they match our ID list
-            valid_ids = {b['id'] for b in BUSINESS_OPTIONS}
-            valid_recs = [r for r in recommendations if r.get('id') in valid_ids]
-            
-            # Return top 3, or fallback if empty
-            if not valid_recs:
-                raise ValueError("No valid recommendations generated")
-            
-            return valid_recs[:3]
+            # Same num_ctx as the chat model, so Ollama doesn't reload the model
+            llm = _advisor_llm(format=json_format(REASONS_SCHEMA))
+            # The prompt is fully determined by the profile, so it doubles as the coalescing key
+            response = _recommendation_flight.do(
+                prompt_text, lambda: llm.invoke(prompt_text).content
+            )
             
+            # Fences, chatter, trailing commas and cut-off tails are repaired in one pass
+            parsed = _reasons_json.parse(response)
+            # Without structured output some models still answer with the bare array
+            items = parsed.get("reasons", []) if isinstance(parsed, dict) else parsed
+            if not isinstance(items, list):
+                raise JSONExtractError("Expected a list of reasons")
+            reasons = {str(r.get("id")): r.get("reason") for r in items if isinstance(r, dict)}
+            for rec in recommendations:
+                if reasons.get(rec["id"]):
+                    rec["reason"] = reasons[rec["id"]]
         except Exception as e:
-            print(f"Error generating recommendations: {e}")
-            return self._get_fallback_recommendations()
+            if isinstance(e, JSONExtractError):
+                _reasons_json.record_fallback()
+            print(f"Warning: LLM reasons failed, keeping templated reasons: {e}")
 
     def _get_fallback_recommendations(self):
         """Return hardcoded fallback recommendations"""
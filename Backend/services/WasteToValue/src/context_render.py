@@ -0,0 +1,110 @@
+"""
+Compact rendering of a waste analysis for the chat prompt.
+
+The analysis used to be pasted into the system prompt as indented,
+ASCII-escaped JSON (every Devanagari character became a 6-byte \\uXXXX
+escape). Here it is rendered as plain labelled lines, and when the question
+clearly targets some options, only those are rendered in full; the rest
+keep their title and one-line subtitle so comparisons still work.
+"""
+
+import json
+import re
+from typing import List, Set
+
+# \w alone splits Devanagari words at vowel signs, so include the whole block
+_WORD_RE = re.compile(r"[\w\u0900-\u097F]{3,}")
+# "option 2", "opt2", "#2", "विकल्प 2"
+_OPTION_REF_RE = re.compile(r"(?:\boption\s*|\bopt\s*|#|विकल्प\s*)([1-9])\b", re.IGNORECASE)
+# "second option", "3rd one", "पहला विकल्प", "दुसरा पर्याय". A bare ordinal ("what should I do
+# first?", "the second highest profit") is not a reference to an option.
+_ORDINALS = {
+    "first": 1, "1st": 1, "second": 2, "2nd": 2, "third": 3, "3rd": 3,
+    "पहल": 1, "पहिल": 1, "दूसर": 2, "दुसर": 2, "तीसर": 3, "तिसर": 3,
+}
+_ORDINAL_REF_RE = re.compile(
+    r"\b(first|second|third|1st|2nd|3rd)\s+(?:option|one|idea|pathway|choice)s?\b"
+    r"|(पहल|पहिल|दूसर|दुसर|तीसर|तिसर)[ाेी]\s*(?:विकल्प|पर्याय)",
+    re.IGNORECASE,
+)
+_SKIP_CONTENT = {"n/a", ""}
+# Questions comparing options need all of them in full
+_COMPARE_WORDS = {
+    "which", "compare", "comparison", "best", "better", "cheapest", "least", "most",
+    "difference", "versus", "all", "कौन", "कौनसा", "सबसे", "तुलना", "कोणता", "सर्वात",
+}
+
+
+def _words(text: str) -> Set[str]:
+    return {w.lower() for w in _WORD_RE.findall(text)}
+
+
+def _option_text(option: dict) -> str:
+    details = option.get("fullDetails", {})
+    parts = [option.get("title", ""), option.get("subtitle", "")]
+    parts += details.get("basicIdea", [])
+    for section in details.get("sections", []):
+        parts += [str(c) for c in section.get("content", [])]
+    return " ".join(p for p in parts if p)
+
+
+def relevant_options(options: List[dict], question: str) -> Set[int]:
+    """
+    Indexes of the options the question is about; empty when it is general
+    (or ambiguous), in which case every option should be rendered in full.
+    """
+    explicit = {int(n) - 1 for n in _OPTION_REF_RE.findall(question)}
+    explicit |= {_ORDINALS[(word or stem).lower()] - 1 for word, stem in _ORDINAL_REF_RE.findall(question)}
+    explicit = {i for i in explicit if 0 <= i < len(options)}
+    if explicit:
+        return explicit
+
+    if _words(question) & _COMPARE_WORDS:
+        return set()
+
+    # Words shared by every option (the crop name, "waste", ...) say nothing about which one is meant
+    option_words = [_words(_option_text(o)) for o in options]
+    common = set.intersection(*option_words) if option_words else set()
+    question_words = _words(question) - common
+    scores = [len(question_words & (words - common)) for words in option_words]
+    if not scores or max(scores) == 0:
+        return set()
+    best = max(scores)
+    picked = {i for i, s in enumerate(scores) if s == best}
+    return set() if len(picked) == len(options) else picked
+
+
+def _render_option(index: int, option: dict, full: bool) -> List[str]:
+    lines = [f"Option {index + 1}: {option.get('title', '')} - {option.get('subtitle', '')}".rstrip(" -")]
+    if not full:
+        return lines
+    details = option.get("fullDetails", {})
+    basic = [b for b in details.get("basicIdea", []) if b]
+    if basic:
+        lines.append(f"  Idea: {'; '.join(basic)}")
+    for section in details.get("sections", []):
+        content = [str(c) for c in section.get("content", []) if str(c).strip().lower() not in _SKIP_CONTENT]
+        if content:
+            lines.append(f"  {section.get('title', '')}: {'; '.join(content)}")
+    return lines
+
+
+def render_context(context: dict, question: str = "") -> str:
+    """Token-minimal text form of an analysis result for the chat system prompt"""
+    options = context.get("options") if isinstance(context, dict) else None
+    if not isinstance(options, list) or not all(isinstance(o, dict) for o in options):
+        # Not the analysis schema; still avoid indentation and \\u escapes
+        return json.dumps(context, ensure_ascii=False, separators=(",", ":"))
+
+    lines = []
+    if context.get("crop"):
+        lines.append(f"Crop: {context['crop']}")
+    focus = relevant_options(options, question)
+    for i, option in enumerate(options):
+        lines += _render_option(i, option, full=not focus or i in focus)
+    conclusion = context.get("conclusion") or {}
+    recommended = conclusion.get("highlight")
+    explanation = conclusion.get("explanation") or conclusion.get("rationale")
+    if recommended or explanation:
+        lines.append(f"Recommended: {recommended or ''} - {explanation or ''}".rstrip(" -"))
+    return "\n".join(lines)
@@ -1,41 +1,202 @@
-try:
-    from langchain.memory import ConversationBufferMemory
-except ImportError:
-    ConversationBufferMemory = None
+"""
+Compact conversation memory for the Waste-to-Value assistant.
 
-class MemoryManager:
-    def __init__(self):
-        # Using ConversationBufferMemory to maintain context.
-        # As per requirements: "Store only: Last crop discussed, Last recommended primary pathway, Farmer preference signals"
-        if ConversationBufferMemory:
-            self.memory = ConversationBufferMemory(
-                memory_key="history",
-                return_messages=True
-            )
+Stores only what the assistant needs to carry between turns: the last crop
+discussed, the last recommended primary pathway, the farmer's preference
+signals and a short window of recent turns. Every record uses __slots__,
+recent turns live in a fixed-size ring buffer with each side clipped to
+MEMORY_TURN_BYTES of UTF-8, so a session's memory never grows. to_json()
+leaves out the oldest turns if needed to stay within MEMORY_JSON_MAX_BYTES.
+
+Keeps the load_memory_variables / save_context / clear interface of the
+LangChain memory classes it replaces, without importing langchain.
+"""
+
+import json
+import os
+import time
+from typing import Iterator, List, Optional, Tuple
+
+MEMORY_TURNS = int(os.getenv("WASTE_MEMORY_TURNS", 3))
+# UTF-8 bytes, so Devanagari text (3 bytes a character) is bounded the same way as English
+MEMORY_TURN_BYTES = int(os.getenv("WASTE_MEMORY_TURN_BYTES", 100))
+MEMORY_JSON_MAX_BYTES = 1024
+
+# Declared preference signals and the values each may take
+PREFERENCE_VALUES = {
+    "route": ("diy", "sell"),             # Process the waste themselves or sell it on
+    "budget": ("low", "medium", "high"),
+    "scale": ("small", "medium", "large"),
+}
+
+# Words in a farmer's message that set a preference signal
+_SIGNAL_WORDS = {
+    ("route", "diy"): ("diy", "myself", "make it", "khud", "खुद", "स्वतः"),
+    ("route", "sell"): ("sell", "buyer", "company", "bech", "बेच", "विक्री"),
+    ("budget", "low"): ("cheap", "low cost", "no money", "small budget", "सस्ता", "कम पैसे"),
+    ("budget", "high"): ("invest big", "large budget", "loan"),
+    ("scale", "small"): ("small farm", "one acre", "1 acre", "छोटा"),
+    ("scale", "large"): ("cooperative", "fpo", "large farm", "many farmers"),
+}
+
+
+def _clip(text: Optional[str]) -> str:
+    text = " ".join((text or "").split())
+    encoded = text.encode("utf-8")
+    if len(encoded) <= MEMORY_TURN_BYTES:
+        return text
+    # "…" is 3 bytes; a character cut in half is dropped
+    return encoded[:max(MEMORY_TURN_BYTES - 3, 0)].decode("utf-8", errors="ignore") + "…"
+
+
+class Turn:
+    __slots__ = ("question", "answer", "ts")
+
+    def __init__(self, question: str, answer: str, ts: Optional[int] = None):
+        self.question = _clip(question)
+        self.answer = _clip(answer)
+        self.ts = int(time.time()) if ts is None else ts
+
+
+class RingBuffer:
+    """Fixed-capacity FIFO; appending to a full buffer overwrites the oldest item"""
+
+    __slots__ = ("_items", "_start", "_size")
+
+    def __init__(self, capacity: int):
+        self._items: List[Optional[Turn]] = [None] * max(1, capacity)
+        self._start = 0
+        self._size = 0
+
+    def append(self, item: Turn) -> None:
+        capacity = len(self._items)
+        self._items[(self._start + self._size) % capacity] = item
+        if self._size < capacity:
+            self._size += 1
         else:
-            print("Warning: langchain.memory not found. Using simple fallback.")
-            self.memory = SimpleMemory()
+            self._start = (self._start + 1) % capacity
+
+    def __iter__(self) -> Iterator[Turn]:
+        capacity = len(self._items)
+        for i in range(self._size):
+            yield self._items[(self._start + i) % capacity]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        self._items = [None] * len(self._items)
+        self._start = 0
+        self._size = 0
 
-    def get_memory(self):
-        return self.memory
 
-    def clear_memory(self):
-        self.memory.clear()
+class PreferenceSignals:
+    __slots__ = tuple(PREFERENCE_VALUES)
 
-class SimpleMemory:
     def __init__(self):
-        self.history = {}
-    
-    def load_memory_variables(self, inputs):
-        return {"history": self.history.get("history", [])}
-    
-    def save_context(self, inputs, outputs):
-        # Mock saving context
-        if "history" not in self.history:
-            self.history["history"] = []
-        self.history["history"].append(f"Human: {inputs.get('input')}")
-        self.history["history"].append(f"AI: {outputs.get('output')}")
-    
-    def clear(self):
-        self.history = {}
+        for name in PREFERENCE_VALUES:
+            setattr(self, name, None)
+
+    def set(self, name: str, value: str) -> None:
+        if value not in PREFERENCE_VALUES.get(name, ()):
+            raise ValueError(f"Unknown preference {name}={value}")
+        setattr(self, name, value)
+
+    def observe(self, text: str) -> None:
+        """Picks up signals stated in a farmer's message; the latest statement wins"""
+        lowered = text.lower()
+        for (name, value), words in _SIGNAL_WORDS.items():
+            if any(word in lowered for word in words):
+                setattr(self, name, value)
+
+    def items(self) -> List[Tuple[str, str]]:
+        return [(name, getattr(self, name)) for name in PREFERENCE_VALUES if getattr(self, name)]
+
+
+class MemoryManager:
+    __slots__ = ("last_crop", "last_pathway", "preferences", "turns")
+
+    def __init__(self, max_turns: int = MEMORY_TURNS):
+        self.last_crop: Optional[str] = None
+        self.last_pathway: Optional[str] = None
+        self.preferences = PreferenceSignals()
+        self.turns = RingBuffer(max_turns)
+
+    # --- Recording ---
+
+    def remember_analysis(self, result: dict) -> None:
+        """Takes the crop and recommended pathway from an analysis result"""
+        if result.get("crop"):
+            self.last_crop = _clip(result["crop"])
+        highlight = (result.get("conclusion") or {}).get("highlight")
+        if highlight:
+            self.last_pathway = _clip(highlight)
+
+    def add_turn(self, question: str, answer: str) -> None:
+        self.preferences.observe(question)
+        self.turns.append(Turn(question, answer))
+
+    # --- LangChain memory interface ---
+
+    def get_memory(self) -> "MemoryManager":
+        return self
+
+    def load_memory_variables(self, inputs: Optional[dict] = None) -> dict:
+        """(role, text) pairs, which MessagesPlaceholder accepts as messages"""
+        history = []
+        for turn in self.turns:
+            history += [("human", turn.question), ("ai", turn.answer)]
+        return {"history": history}
+
+    def save_context(self, inputs: dict, outputs: dict) -> None:
+        self.add_turn(inputs.get("input", ""), outputs.get("output", ""))
+
+    def clear(self) -> None:
+        self.last_crop = None
+        self.last_pathway = None
+        self.preferences = PreferenceSignals()
+        self.turns.clear()
+
+    clear_memory = clear
+
+    # --- Prompt and storage forms ---
+
+    def context_line(self) -> str:
+        """One line for a prompt, e.g. 'Last crop: Banana | Recommended: Banana fibre paper | Prefers: route=diy'"""
+        parts = []
+        if self.last_crop:
+            parts.append(f"Last crop: {self.last_crop}")
+        if self.last_pathway:
+            parts.append(f"Recommended: {self.last_pathway}")
+        prefs = self.preferences.items()
+        if prefs:
+            parts.append("Prefers: " + ", ".join(f"{name}={value}" for name, value in prefs))
+        return " | ".join(parts)
+
+    def to_json(self) -> str:
+        """At most MEMORY_JSON_MAX_BYTES of UTF-8; the oldest turns are dropped first"""
+        turns = [[t.question, t.answer, t.ts] for t in self.turns]
+        while True:
+            data = json.dumps({
+                "c": self.last_crop,
+                "p": self.last_pathway,
+                "s": dict(self.preferences.items()),
+                "t": turns,
+            }, ensure_ascii=False, separators=(",", ":"))
+            # Crop and pathway are clipped too, so the record fits once the turns are gone
+            if not turns or len(data.encode("utf-8")) <= MEMORY_JSON_MAX_BYTES:
+                return data
+            turns = turns[1:]
 
+    @classmethod
+    def from_json(cls, data: str, max_turns: int = MEMORY_TURNS) -> "MemoryManager":
+        raw = json.loads(data)
+        memory = cls(max_turns)
+        memory.last_crop = raw.get("c")
+        memory.last_pathway = raw.get("p")
+        for name, value in (raw.get("s") or {}).items():
+            if value in PREFERENCE_VALUES.get(name, ()):
+                memory.preferences.set(name, value)
+        for question, answer, ts in raw.get("t") or []:
+            memory.turns.append(Turn(question, answer, ts))
+        return memory
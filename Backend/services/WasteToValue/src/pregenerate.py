@@ -0,0 +1,120 @@
+"""
+Offline warm-up job for the waste-to-value analysis cache.
+
+Enumerates every crop we know about (verified pathways in prompts.py, the
+disease CSV and the detector's CLASS_NAMES) x every supported language, and
+generates the missing analyses ahead of time so no farmer waits for the
+first generation.
+
+The cache itself is the checkpoint: each result is persisted as soon as it
+validates, so an interrupted run resumes where it stopped. Because cache
+keys include PROMPT_VERSION, bumping the prompt version makes the next run
+regenerate everything incrementally.
+
+Usage (from the Backend directory):
+    python services/WasteToValue/src/pregenerate.py --workers 2
+    python services/WasteToValue/src/pregenerate.py --languages English --dry-run
+"""
+
+import argparse
+import ast
+import csv
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import List
+
+from prompts import VERIFIED_PATHWAYS, PROMPT_VERSION
+from waste_service import WasteToValueEngine, SUPPORTED_LANGUAGES, normalize_crop
+
+DISEASE_DETECTOR_DIR = Path(__file__).resolve().parents[2] / "Disease Detector"
+CSV_PATH = DISEASE_DETECTOR_DIR / "crop_disease_data.csv"
+DETECTOR_PATH = DISEASE_DETECTOR_DIR / "detector.py"
+
+
+def _csv_crops() -> List[str]:
+    if not CSV_PATH.exists():
+        print(f"Warning: CSV file not found at {CSV_PATH}")
+        return []
+    with open(CSV_PATH, newline="", encoding="utf-8") as f:
+        return [row["Crop Name"] for row in csv.DictReader(f) if row.get("Crop Name")]
+
+
+def _class_name_crops() -> List[str]:
+    """Reads CLASS_NAMES from detector.py without importing TensorFlow"""
+    if not DETECTOR_PATH.exists():
+        print(f"Warning: detector not found at {DETECTOR_PATH}")
+        return []
+    tree = ast.parse(DETECTOR_PATH.read_text(encoding="utf-8"))
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(t, ast.Name) and t.id == "CLASS_NAMES" for t in node.targets
+        ):
+            labels = ast.literal_eval(node.value)
+            # 'Corn_(maize)___Common_rust_' -> 'Corn (maize)'
+            return [label.split("___", 1)[0].replace("_", " ").strip() for label in labels]
+    return []
+
+
+def known_crops() -> List[str]:
+    """All crops we have data for, de-duplicated by normalized name (first spelling wins)"""
+    crops = {}
+    for crop in list(VERIFIED_PATHWAYS) + _csv_crops() + _class_name_crops():
+        crops.setdefault(normalize_crop(crop), crop)
+    return list(crops.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate waste-to-value analyses into the cache.")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="Concurrent generations (keep <= OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--languages", nargs="+", default=SUPPORTED_LANGUAGES)
+    parser.add_argument("--crops", nargs="+", help="Only these crops (default: all known crops)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Regenerate even if a current-version entry is cached")
+    parser.add_argument("--dry-run", action="store_true", help="List pending work and exit")
+    args = parser.parse_args()
+
+    engine = WasteToValueEngine()
+    crops = args.crops or known_crops()
+    work = [(crop, lang) for crop in crops for lang in args.languages]
+    pending = work if args.refresh else [
+        (crop, lang) for crop, lang in work if not engine.cache.contains(engine.cache_key(crop, lang))
+    ]
+
+    print(f"[PREGEN] Prompt version {PROMPT_VERSION}: {len(crops)} crops x {len(args.languages)} languages")
+    print(f"[PREGEN] {len(work) - len(pending)} already cached, {len(pending)} to generate")
+    if args.dry_run:
+        for crop, lang in pending:
+            print(f"  {crop} ({lang})")
+        return 0
+    if not pending:
+        return 0
+
+    generated = failed = 0
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {
+            pool.submit(engine.warm, crop, lang, args.refresh): (crop, lang) for crop, lang in pending
+        }
+        for i, future in enumerate(as_completed(futures), 1):
+            crop, lang = futures[future]
+            try:
+                future.result()
+                generated += 1
+                status = "ok"
+            except Exception as e:
+                failed += 1
+                status = f"FAILED: {e}"
+            print(f"[PREGEN] ({i}/{len(pending)}) {crop} [{lang}] {status}")
+
+    elapsed = time.time() - started
+    print(f"[PREGEN] Done in {elapsed:.0f}s: {generated} generated, {failed} failed")
+    if failed:
+        print("[PREGEN] Re-run the same command to retry failed entries.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
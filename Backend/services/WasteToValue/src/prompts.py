@@ -1,3 +1,20 @@
+# Bump whenever any waste-analysis prompt below changes so cached analyses are regenerated
+PROMPT_VERSION = "2"
+
+# Crop-specific pathways the model must ground its options in. Also the seed
+# list for the offline cache warm-up job (pregenerate.py).
+VERIFIED_PATHWAYS = {
+    "Banana": ["Paper", "Fertilizer", "Feed", "Bio-plastics"],
+    "Rice": ["Bio-char", "Silica", "Particle board"],
+    "Mango": ["Pectin", "Seed oil", "Bio-gas", "Feed"],
+    "Sugarcane": ["Cutlery", "Ethanol", "Power", "Mushroom substrate"],
+    "Dung": ["Bio-gas", "Vermicompost", "Manure", "CBG"],
+}
+
+_PATHWAY_LINES = "\n".join(
+    f"   - {crop}: {', '.join(pathways)}." for crop, pathways in VERIFIED_PATHWAYS.items()
+)
+
 WASTE_TO_VALUE_SYSTEM_PROMPT = """
 You are an Agricultural Waste-to-Value Decision Intelligence Engine.
 Your goal is to analyze a crop name and return valid JSON data for 3 profitable waste management options in the specified language.
@@ -16,11 +33,6 @@ Input: <Crop Name>
 Output JSON Structure:
 {{
   "crop": "Crop Name",
-  "conclusion": {{
-    "title": "Final Recommendation",
-    "highlight": "TITLE_OF_BEST_OPTION_MATCHING_LIST_BELOW",
-    "explanation": "PARAGRAPH_EXPLANATION_WITH_ACTION_PLAN"
-  }},
   "options": [
     {{
       "id": "opt1",
@@ -37,7 +49,12 @@ Output JSON Structure:
       "Equipment Needed": ["..."],
       "Action Urgency": ["..."]
     }}
-  ]
+  ],
+  "conclusion": {{
+    "title": "Final Recommendation",
+    "highlight": "TITLE_OF_BEST_OPTION_MATCHING_LIST_ABOVE",
+    "explanation": "PARAGRAPH_EXPLANATION_WITH_ACTION_PLAN"
+  }}
 }}
 
 RULES:
@@ -46,11 +63,7 @@ RULES:
 3. **FLAT JSON**: Use the flat structure above. No nested "fullDetails".
 4. **TRANSLATE**: Content must be in {language} except key names.
 5. **KNOWLEDGE**: Use these verified pathways:
-   - Banana: Paper, Fertilizer, Feed, Bio-plastics.
-   - Rice: Bio-char, Silica, Particle board.
-   - Mango: Pectin, Seed oil, Bio-gas, Feed.
-   - Sugarcane: Cutlery, Ethanol, Power, Mushroom substrate.
-   - Dung: Bio-gas, Vermicompost, Manure, CBG.
+""" + _PATHWAY_LINES + """
 6. **CURRENCY**: Use ₹ for all price estimates.
 7. **DATA TYPES**: All values MUST be JSON arrays of strings.
 8. **CRITICAL: CONCLUSION MATCH**: You MUST set the "highlight" field to be EXACTLY the same string as the "title" of one of your 3 generated options.
@@ -61,4 +74,141 @@ GUARDRAIL_PROMPT = """
 Return ONLY valid JSON. Ensure exactly 3 options are present.
 """
 
+# --- PARALLEL ANALYSIS MODE (plan -> options in parallel -> conclusion) ---
+
+WASTE_PLAN_PROMPT = """
+You are an Agricultural Waste-to-Value Decision Intelligence Engine.
+Pick the 3 most profitable, proven waste-to-value pathways for the crop given by the user.
+
+LANGUAGE: {language}
+
+Use these verified pathways where they apply:
+""" + _PATHWAY_LINES + """
+
+Return ONLY a JSON object, with titles written in {language}:
+{{
+  "crop": "Crop Name",
+  "titles": ["Option Title 1", "Option Title 2", "Option Title 3"]
+}}
+"""
+
+WASTE_OPTION_PROMPT = """
+You are an Agricultural Waste-to-Value Decision Intelligence Engine.
+Describe ONE waste-to-value option for the crop below in the specified language.
+
+CROP: {crop}
+OPTION ID: {option_id}
+OPTION TITLE: {title}
+LANGUAGE: {language}
+
+Return ONLY a JSON object with exactly these keys (keys stay in English, values in {language}):
+{{
+  "id": "{option_id}",
+  "title": "{title}",
+  "subtitle": "1-line description",
+  "basicIdea": ["Point 1", "Point 2"],
+  "Plant Part": ["..."],
+  "Pathway Type": ["..."],
+  "Technical Basis": ["..."],
+  "Manufacturing Option (DIY)": ["..."],
+  "3rd-Party Selling Option": ["..."],
+  "Average Recovery Value": ["₹..."],
+  "Value Recovery Percentage": ["...%"],
+  "Equipment Needed": ["..."],
+  "Action Urgency": ["..."]
+}}
+
+RULES:
+1. Use proven agri-waste techniques only.
+2. Use ₹ for all price estimates.
+3. All values MUST be JSON arrays of strings, except "id", "title" and "subtitle".
+"""
+
+WASTE_CONCLUSION_PROMPT = """
+You are an Agricultural Waste-to-Value Decision Intelligence Engine.
+A farmer growing {crop} has these 3 waste-to-value options:
+{options_summary}
+
+Choose the best one and return ONLY a JSON object in {language}:
+{{
+  "title": "Final Recommendation",
+  "highlight": "EXACT_TITLE_OF_BEST_OPTION",
+  "explanation": "PARAGRAPH_EXPLANATION_WITH_ACTION_PLAN"
+}}
+
+The "highlight" MUST be exactly one of the option titles above. The "explanation" MUST cover
+(a) the waste's specific value and (b) the step-by-step action plan for the farmer.
+"""
+
+# --- OUTPUT SCHEMAS (Ollama structured `format`, see utils/llm_json.py) ---
+
+# Per-option detail keys, in the order the prompts list them
+OPTION_SECTIONS = [
+    "Plant Part", "Pathway Type", "Technical Basis",
+    "Manufacturing Option (DIY)", "3rd-Party Selling Option",
+    "Average Recovery Value", "Value Recovery Percentage",
+    "Equipment Needed", "Action Urgency",
+]
+
+_STRING = {"type": "string"}
+_STRING_LIST = {"type": "array", "items": _STRING}
+
+OPTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": _STRING,
+        "title": _STRING,
+        "subtitle": _STRING,
+        "basicIdea": _STRING_LIST,
+        **{section: _STRING_LIST for section in OPTION_SECTIONS},
+    },
+    "required": ["id", "title", "subtitle", "basicIdea"] + OPTION_SECTIONS,
+}
+
+CONCLUSION_SCHEMA = {
+    "type": "object",
+    "properties": {"title": _STRING, "highlight": _STRING, "explanation": _STRING},
+    "required": ["title", "highlight", "explanation"],
+}
+
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "crop": _STRING,
+        "options": {"type": "array", "items": OPTION_SCHEMA, "minItems": 3, "maxItems": 3},
+        "conclusion": CONCLUSION_SCHEMA,
+    },
+    "required": ["crop", "options", "conclusion"],
+}
+
+PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "crop": _STRING,
+        "titles": {"type": "array", "items": _STRING, "minItems": 3, "maxItems": 3},
+    },
+    "required": ["crop", "titles"],
+}
+
+# Follow-up chat about an analysis; {context_str} is the analysis JSON
+WASTE_CHAT_SYSTEM_PROMPT = """You are a helpful agricultural expert assistant.
+The user has just received an analysis for converting specific crop waste into value.
+
+CONTEXT (The analysis results):
+{context_str}
+
+YOUR GOAL:
+Answer the user's question specifically based on the options provided in the context.
+Respond in the specified LANGUAGE: {language}.
+
+FORMATTING RULES:
+- Use **Bold** for key numbers, machine names, and prices.
+- Use bullet points (•) for lists to make them readable.
+- **ALWAYS use double newlines** between paragraphs.
+- Keep responses concise but well-structured.
+- Be encouraging and practical (Indian context).
+
+Do not hallucinate new options not in the context unless asked for alternatives.
+"""
+
 # --- SYSTEM-GENERATED PROMPTS FOR OTHER SERVICES ---
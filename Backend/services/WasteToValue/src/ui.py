@@ -1,369 +1,550 @@
-import streamlit as st
-import sys
-import os
+"""
+Streamlit console for internal demos and QA of the Waste-to-Value engine and
+the Business Advisor.
+
+Two backends, picked in the sidebar:
+- In-process: imports the services. The WasteToValueEngine and the advisor
+  module (with its compiled chains) are built once per Streamlit process via
+  st.cache_resource and shared by every browser session and rerun.
+- Flask API: talks to a running backend (KRISHI_UI_API_URL, default
+  http://localhost:5000) with a Firebase ID token (KRISHI_UI_API_TOKEN) and
+  imports no service at all.
+
+Replies are rendered as they stream (stream_analysis, stream_chat_waste and
+stream_chat, or the matching SSE endpoints).
+
+Run from the Backend directory:
+    streamlit run services/WasteToValue/src/ui.py
+"""
+
+import html
 import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import requests
+import streamlit as st
+
+SRC_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SRC_DIR.parents[2]
+BUSINESS_ADVISOR_DIR = BACKEND_DIR / "services" / "Business Advisor"
+
+WASTE_LANGUAGES = ["English", "Hindi", "Marathi"]
+ADVISOR_LANGUAGES = ["english", "hindi", "hinglish"]
+GREETING = "Hello! Based on my profile, what do you suggest?"
+# Seconds between redraws of a streaming reply; every redraw is a websocket message
+STREAM_REDRAW_INTERVAL = 0.05
+
+CARD_CSS = """
+<style>
+.rec-card {
+    border: 1px solid #e0e0e0;
+    border-radius: 12px;
+    overflow: hidden;
+    box-shadow: 0 4px 6px rgba(0,0,0,0.05);
+    background: white;
+    margin-bottom: 15px;
+    height: 100%;
+}
+.rec-header {
+    background-color: #27ae60;
+    color: white;
+    padding: 15px;
+    position: relative;
+}
+.match-badge {
+    background-color: rgba(255,255,255,0.25);
+    padding: 4px 10px;
+    border-radius: 15px;
+    font-size: 0.85em;
+    font-weight: 600;
+    display: inline-block;
+    margin-bottom: 8px;
+}
+.rec-title {
+    font-size: 1.1em;
+    font-weight: 700;
+    line-height: 1.3;
+    margin: 0;
+    text-transform: uppercase;
+}
+.rec-body {
+    padding: 15px;
+    color: #444;
+    font-size: 0.95em;
+}
+.stats-container {
+    display: flex;
+    justify-content: space-between;
+    background-color: #f8f9fa;
+    border-radius: 8px;
+    padding: 10px;
+    margin: 15px 0;
+}
+.stat-box {
+    text-align: left;
+}
+.stat-label {
+    font-size: 0.75em;
+    color: #888;
+    text-transform: uppercase;
+    margin-bottom: 2px;
+    font-weight: 600;
+}
+.stat-value {
+    font-size: 0.9em;
+    font-weight: 700;
+    color: #333;
+}
+.req-label {
+    font-size: 0.75em;
+    color: #888;
+    text-transform: uppercase;
+    font-weight: 600;
+    margin-bottom: 5px;
+}
+.tag {
+    display: inline-block;
+    background-color: #edf2f7;
+    color: #4a5568;
+    padding: 4px 10px;
+    border-radius: 6px;
+    font-size: 0.8em;
+    margin-right: 5px;
+    margin-bottom: 5px;
+}
+</style>
+"""
+
+
+# --- Process-wide resources ---
+
+@st.cache_resource(show_spinner="Starting the Waste-to-Value engine...")
+def get_waste_engine():
+    for path in (BACKEND_DIR, SRC_DIR):
+        if str(path) not in sys.path:
+            sys.path.append(str(path))
+    from waste_service import WasteToValueEngine
+    return WasteToValueEngine()
+
+
+@st.cache_resource(show_spinner="Loading the Business Advisor...")
+def get_advisor_module():
+    """krishi_chatbot with its chains compiled; advisors themselves are per browser session"""
+    for path in (BACKEND_DIR, BUSINESS_ADVISOR_DIR):
+        if str(path) not in sys.path:
+            sys.path.append(str(path))
+    import krishi_chatbot
+    krishi_chatbot.precompile_chains()
+    return krishi_chatbot
+
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """One keep-alive connection pool for every session talking to the API"""
+    return requests.Session()
+
+
+# --- Backends ---
+
+class LocalBackend:
+    """Calls the services in this process"""
+
+    def stream_analysis(self, crop: str, language: str):
+        yield from get_waste_engine().stream_analysis(crop, language)
+
+    def stream_waste_chat(self, analysis: dict, question: str, language: str):
+        yield from get_waste_engine().stream_chat_waste(analysis, question, language)
 
-# Ensure src is in path so we can import from app, memory_manager, etc.
-# Also add parent directory to path to import BusinessAdvisor
-current_dir = os.path.dirname(os.path.abspath(__file__))
-sys.path.append(current_dir)
-sys.path.append(os.path.abspath(os.path.join(current_dir, "../../")))
+    def start_advisor(self, profile: dict):
+        """(session handle, recommendations)"""
+        module = get_advisor_module()
+        advisor = module.KrishiSaarthiAdvisor(module.FarmerProfile(**profile))
+        return advisor, advisor.generate_recommendations()
 
-from app import get_decision_chain
-from langchain_core.messages import HumanMessage, AIMessage
+    def stream_advisor_chat(self, advisor, message: str):
+        yield from advisor.stream_chat(message)
 
-# Import Business Advisor modules
-try:
-    from BusinessAdvisor.krishi_chatbot import KrishiSaarthiAdvisor, FarmerProfile, BUSINESS_OPTIONS
-except ImportError as e:
-    st.error(f"Error importing Business Advisor: {e}. Please ensure directory structure is correct.")
 
-def render_waste_to_value():
+class _AnalysisExpired(Exception):
+    """The API no longer holds the analysis a chat refers to (HTTP 410)"""
+
+
+class APIBackend:
+    """Calls a running Flask backend over HTTP; the same events arrive as SSE"""
+
+    def __init__(self, base_url: str, token: str):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+    def _post(self, path: str, payload: dict, stream: bool = False) -> requests.Response:
+        return get_http_session().post(
+            f"{self.base_url}{path}", json=payload, headers=self.headers, stream=stream, timeout=(5, 600)
+        )
+
+    @staticmethod
+    def _raise_for_error(response: requests.Response):
+        if response.status_code != 200:
+            try:
+                message = response.json().get("error")
+            except ValueError:
+                message = response.text[:200]
+            raise RuntimeError(f"API {response.status_code}: {message}")
+
+    def _events(self, path: str, payload: dict):
+        with self._post(path, payload, stream=True) as response:
+            self._raise_for_error(response)
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith("data: "):
+                    yield json.loads(line[len("data: "):])
+
+    def stream_analysis(self, crop: str, language: str):
+        yield from self._events("/api/waste-to-value/analyze/stream", {"crop": crop, "language": language})
+
+    def stream_waste_chat(self, analysis: dict, question: str, language: str):
+        payload = {"analysis_id": analysis.get("analysis_id"), "question": question, "language": language}
+        try:
+            yield from self._waste_chat_chunks(payload)
+        except _AnalysisExpired:
+            # Raised before any chunk: the server no longer has it, so send the analysis inline
+            yield from self._waste_chat_chunks({**payload, "context": analysis})
+
+    def _waste_chat_chunks(self, payload: dict):
+        with self._post("/api/waste-to-value/chat/stream", payload, stream=True) as response:
+            if response.status_code == 410:
+                raise _AnalysisExpired()
+            self._raise_for_error(response)
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith("data: "):
+                    event = json.loads(line[len("data: "):])
+                    if event.get("error"):
+                        raise RuntimeError(event["error"])
+                    if event.get("chunk"):
+                        yield event["chunk"]
+
+    def start_advisor(self, profile: dict):
+        response = self._post("/api/business-advisor/init", profile)
+        self._raise_for_error(response)
+        data = response.json()
+        return data["session_id"], data["recommendations"]
+
+    def stream_advisor_chat(self, session_id: str, message: str):
+        for event in self._events("/api/business-advisor/chat/stream", {"session_id": session_id, "message": message}):
+            if event.get("error"):
+                raise RuntimeError(event["error"])
+            if event.get("chunk"):
+                yield event["chunk"]
+
+
+def get_backend():
+    if st.session_state.get("ui_backend") == "Flask API":
+        return APIBackend(st.session_state.ui_api_url, st.session_state.ui_api_token)
+    return LocalBackend()
+
+
+# --- Rendering helpers ---
+
+def render_stream(placeholder, chunks) -> str:
+    """Draws a reply as it streams, at most once per STREAM_REDRAW_INTERVAL; returns the full text"""
+    text, last_draw = "", 0.0
+    for chunk in chunks:
+        text += chunk
+        now = time.monotonic()
+        if now - last_draw >= STREAM_REDRAW_INTERVAL:
+            placeholder.markdown(text + "▌")
+            last_draw = now
+    placeholder.markdown(text)
+    return text
+
+
+def render_option(option: dict):
+    details = option.get("fullDetails") or {}
+    with st.expander(f"**{option.get('title', 'Option')}** — {option.get('subtitle') or ''}"):
+        for point in details.get("basicIdea", []):
+            st.markdown(f"- {point}")
+        for section in details.get("sections", []):
+            st.markdown(f"**{section['title']}**")
+            for point in section.get("content", []):
+                st.markdown(f"- {point}")
+
+
+def render_conclusion(conclusion: dict):
+    st.success(f"**{conclusion.get('title', 'Recommendation')}** — {conclusion.get('highlight', '')}")
+    if conclusion.get("rationale"):
+        st.markdown(conclusion["rationale"])
+
+
+def render_messages(messages: list):
+    for message in messages:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+
+def stream_reply(messages: list, chunks):
+    """Streams an assistant reply into the chat and appends it to `messages`"""
+    with st.chat_message("assistant"):
+        placeholder = st.empty()
+        placeholder.markdown("...")
+        try:
+            response = render_stream(placeholder, chunks)
+            messages.append({"role": "assistant", "content": response})
+        except Exception as e:
+            placeholder.error(f"Error: {e}")
+
+
+# --- Waste to Value ---
+
+def render_waste_to_value(language: str):
     st.header("Agricultural Waste-to-Value Decision Engine")
     st.markdown("""
-    **Expert System for Indian Farmers**  
+    **Expert System for Indian Farmers**
     *Converts crop name into ranked, actionable waste-to-value recommendations.*
     """)
 
-    # Initialize Session State for History
-    if "wtv_messages" not in st.session_state:
+    st.session_state.setdefault("wtv_messages", [])
+
+    with st.form("wtv_crop_form"):
+        crop = st.text_input("Crop Name", placeholder="e.g. Banana, Rice, Sugarcane")
+        analyze = st.form_submit_button("Analyze", type="primary")
+
+    if analyze and crop.strip():
+        st.session_state.wtv_analysis = None
         st.session_state.wtv_messages = []
-    
-    # Initialize history for chain
-    if "wtv_history" not in st.session_state:
-        st.session_state.wtv_history = []
+        container = st.container()
+        status = st.empty()
+        status.markdown("*Analyzing crop decomposition and market pathways...*")
+        try:
+            # Options render one by one as the model completes them
+            for event in get_backend().stream_analysis(crop.strip(), language):
+                if event["type"] == "option":
+                    with container:
+                        render_option(event["option"])
+                elif event["type"] == "conclusion":
+                    st.session_state.wtv_analysis = event["result"]
+                elif event["type"] == "error":
+                    raise RuntimeError(event["error"])
+            status.empty()
+        except Exception as e:
+            status.error(f"Error: {e}. (Ensure Ollama is running locally)")
+        analysis = st.session_state.get("wtv_analysis")
+        if analysis:
+            render_conclusion(analysis["conclusion"])
+    else:
+        analysis = st.session_state.get("wtv_analysis")
+        if analysis:
+            st.subheader(analysis.get("crop") or "Analysis")
+            for option in analysis["options"]:
+                render_option(option)
+            render_conclusion(analysis["conclusion"])
 
-    # Chat Interface
-    for message in st.session_state.wtv_messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+    if not analysis:
+        return
 
-    # React to user input
-    if prompt := st.chat_input("Enter Crop Name (e.g., Banana, Rice, Sugarcane)"):
-        # Display user message
+    st.divider()
+    render_messages(st.session_state.wtv_messages)
+    if question := st.chat_input("Ask about these options...", key="wtv_chat"):
         with st.chat_message("user"):
-            st.markdown(prompt)
-        st.session_state.wtv_messages.append({"role": "user", "content": prompt})
-
-        # Process with Engine
-        with st.chat_message("assistant"):
-            message_placeholder = st.empty()
-            message_placeholder.markdown("*Analyzing crop decomposition and market pathways...*")
-            
-            try:
-                chain = get_decision_chain()
-                
-                # Invoke
-                response = chain.invoke({"input": prompt, "history": st.session_state.wtv_history})
-                
-                # Update UI
-                message_placeholder.markdown(response)
-                
-                # Update History
-                st.session_state.wtv_messages.append({"role": "assistant", "content": response})
-                
-                st.session_state.wtv_history.append(HumanMessage(content=prompt))
-                st.session_state.wtv_history.append(AIMessage(content=response))
-                
-            except Exception as e:
-                message_placeholder.error(f"Error: {e}. (Ensure Ollama is running locally)")
+            st.markdown(question)
+        st.session_state.wtv_messages.append({"role": "user", "content": question})
+        stream_reply(st.session_state.wtv_messages, get_backend().stream_waste_chat(analysis, question, language))
+
+
+# --- Business Advisor ---
+
+MARKET_ACCESS = {
+    "Village only": "poor",
+    "Small town within 10 km": "moderate",
+    "City within 30 km": "good",
+    "Direct buyers already available": "good",
+}
+
+
+def render_profile_form():
+    with st.form("profile_form"):
+        # Resources
+        st.markdown("### Tell us about your resources")
+        col1, col2 = st.columns(2)
+        with col1:
+            name = st.text_input("Name", value="Farmer")
+            capital = st.number_input("Budget (₹)", min_value=0.0, step=1000.0, value=100000.0)
+            water_source = st.selectbox("Water Source", ["Rainfed", "Canal", "Borewell", "Drip Irrigation", "No Water Source"])
+        with col2:
+            language = st.selectbox("Language", ADVISOR_LANGUAGES)
+            land_size = st.number_input("Land (Acres)", min_value=0.0, step=0.1, value=5.0)
+            experience_years = st.number_input("Experience (Years)", min_value=0, step=1)
+
+        # Interests
+        st.markdown("### Interests")
+        interest_options = [
+            "Dairy Farming", "Poultry", "Greenhouse Farming", "Goat Farming",
+            "Shop Handling", "Factory Business", "Fishery", "Mushroom Cultivation",
+            "Organic Farming", "Agro-Tourism"
+        ]
+        interests = st.multiselect("Select your interests", interest_options)
+
+        # Market & Strategy
+        st.markdown("### Market & Strategy")
+        market_distance = st.radio("How close are you to a market or buyers?", list(MARKET_ACCESS))
+        time_availability = st.radio("How much time can you give?", ["full-time", "part-time"])
+        selling_preference = st.radio(
+            "Are you willing to sell directly to customers (B2C)?",
+            ["Yes, I can handle customers", "Maybe, with guidance", "No, I prefer bulk buyers only"],
+        )
+        recovery_timeline = st.radio(
+            "How long can you wait to recover your investment?",
+            ["Less than 1 year", "1-2 years", "2-3 years", "I can wait longer"],
+        )
+        loss_tolerance = st.radio(
+            "What is your attitude toward losses in the first year?",
+            ["I understand initial losses are possible", "Small losses acceptable", "I cannot afford losses"],
+        )
+        risk_preference = st.radio(
+            "If given two options, what would you choose?",
+            ["Safe income, lower profit", "Higher profit, higher risk"],
+        )
+
+        st.markdown("---")
+        st.info("**IMPORTANT NOTE**: All business ideas and data shown here are research-based and approximate. Actual costs and profits may vary by region, city, market demand, and season.")
+        acknowledgement = st.checkbox("I have read and understood the above points and acknowledge that the data shown is indicative.")
+        submitted = st.form_submit_button("Analyze", type="primary")
+
+    if not submitted:
+        return
+    if not acknowledgement:
+        st.error("Please acknowledge the important note to proceed.")
+        return
+    if not interests:
+        st.error("Please select at least one interest.")
+        return
+
+    # Same fields as POST /api/business-advisor/init
+    profile = {
+        "name": name,
+        "land_size": land_size,
+        "capital": capital,
+        "market_access": MARKET_ACCESS[market_distance],
+        "skills": interests,
+        "risk_level": "high" if risk_preference.startswith("Higher") else "low" if loss_tolerance.startswith("I cannot") else "medium",
+        "time_availability": time_availability,
+        "experience_years": int(experience_years),
+        "language": language,
+        "selling_preference": selling_preference,
+        "recovery_timeline": recovery_timeline,
+        "loss_tolerance": loss_tolerance,
+        "risk_preference": risk_preference,
+        "water_availability": water_source,
+    }
+    try:
+        with st.spinner("Ranking businesses for your profile..."):
+            session, recommendations = get_backend().start_advisor(profile)
+    except Exception as e:
+        st.error(f"Error creating profile: {e}")
+        return
+    st.session_state.advisor_profile = profile
+    st.session_state.advisor_session = session
+    st.session_state.advisor_recs = recommendations
+    st.session_state.ba_messages = []
+    st.session_state.ba_pending = GREETING
+    st.rerun()
+
+
+def render_recommendations(recommendations: list):
+    st.markdown(CARD_CSS, unsafe_allow_html=True)
+    st.subheader("Recommended Businesses")
+    cols = st.columns(max(1, len(recommendations)))
+    for idx, rec in enumerate(recommendations):
+        with cols[idx]:
+            title = rec.get('title', 'Unknown Business')
+            tags_html = "".join(f'<span class="tag">{html.escape(str(req))}</span>' for req in rec.get('requirements', []))
+            card_html = f"""
+            <div class="rec-card">
+                <div class="rec-header">
+                    <div class="match-badge">{rec.get('match_score', 'N/A')}% Match</div>
+                    <h3 class="rec-title">{html.escape(title)}</h3>
+                </div>
+                <div class="rec-body">
+                    <p style="margin-bottom: 15px; height: 60px; overflow: hidden;">{html.escape(rec.get('reason', 'No description available.'))}</p>
+                    <div class="stats-container">
+                        <div class="stat-box">
+                            <div class="stat-label">Investment</div>
+                            <div class="stat-value">{html.escape(str(rec.get('estimated_cost', 'N/A')))}</div>
+                        </div>
+                        <div class="stat-box">
+                            <div class="stat-label">Profit</div>
+                            <div class="stat-value">{html.escape(str(rec.get('profit_potential', 'N/A')))}</div>
+                        </div>
+                    </div>
+                    <div class="req-label">Requirements</div>
+                    <div style="margin-bottom: 15px; height: 50px; overflow: hidden;">{tags_html}</div>
+                </div>
+            </div>
+            """
+            st.markdown(card_html, unsafe_allow_html=True)
+
+            # Queue the question; it streams below in the chat instead of blocking this rerun
+            b_col1, b_col2 = st.columns(2)
+            if b_col1.button("Ask Chatbot", key=f"ask_{idx}"):
+                st.session_state.ba_pending = f"Tell me more about {title}"
+            if b_col2.button("Know More", key=f"more_{idx}"):
+                st.session_state.ba_pending = f"What are the detailed requirements and steps for {title}?"
+
 
 def render_business_advisor():
     st.header("KrishiSaarthi Business Advisor")
     st.markdown("*AI-powered business guidance for Indian farmers*")
 
-    # Check if profile exists
-    if "advisor_profile" not in st.session_state:
-        st.subheader("tell us about your resources")
-        
-        with st.form("profile_form"):
-            # Resources
-            st.markdown("### Tell us about your resources")
-            col1, col2 = st.columns(2)
-            with col1:
-                budget = st.number_input("Budget (₹)", min_value=0.0, step=1000.0, placeholder="e.g. 100000")
-                water_source = st.selectbox("Water Source", ["Rainfed", "Canal", "Borewell", "Drip Irrigation", "No Water Source"])
-            with col2:
-                land_size = st.number_input("Land (Acres)", min_value=0.0, step=0.1, placeholder="e.g. 5")
-                experience_years = st.number_input("Experience (Years)", min_value=0, step=1, placeholder="e.g. 5")
-            
-            # Interests
-            st.markdown("### Interests")
-            interest_options = [
-                "Dairy Farming", "Poultry", "Greenhouse Farming", "Goat Farming",
-                "Shop Handling", "Factory Business", "Fishery", "Mushroom Cultivation",
-                "Organic Farming", "Agro-Tourism"
-            ]
-            interests = st.multiselect("Select your interests", interest_options)
-            
-            # Market & Strategy
-            st.markdown("### Market & Strategy")
-            
-            st.markdown("**How close are you to a market or buyers?**")
-            market_distance = st.radio(
-                "Market Distance",
-                ["Village only", "Small town within 10 km", "City within 30 km", "Direct buyers already available"],
-                label_visibility="collapsed"
-            )
-            
-            st.markdown("**Are you willing to sell directly to customers (B2C)?**")
-            b2c_willingness = st.radio(
-                "B2C Willingness",
-                ["Yes, I can handle customers", "Maybe, with guidance", "No, I prefer bulk buyers only"],
-                label_visibility="collapsed"
-            )
-            
-            st.markdown("**If income fluctuates month to month, how comfortable are you?**")
-            income_fluctuation_tolerance = st.radio(
-                "Income Fluctuation",
-                ["Very comfortable", "Somewhat okay", "Not comfortable at all"],
-                label_visibility="collapsed"
-            )
-            
-            st.markdown("**How long can you wait to recover your investment?**")
-            investment_recovery_timeline = st.radio(
-                "Recovery Timeline",
-                ["Less than 1 year", "1-2 years", "2-3 years", "I can wait longer"],
-                label_visibility="collapsed"
-            )
-            
-            st.markdown("**What is your attitude toward losses in the first year?**")
-            loss_attitude = st.radio(
-                "Loss Attitude",
-                ["I understand initial losses are possible", "Small losses acceptable", "I cannot afford losses"],
-                label_visibility="collapsed"
-            )
-            
-            st.markdown("**If given two options, what would you choose?**")
-            risk_vs_profit = st.radio(
-                "Risk vs Profit",
-                ["Safe income, lower profit", "Higher profit, higher risk"],
-                label_visibility="collapsed"
-            )
-
-            st.markdown("---")
-            st.info("**IMPORTANT NOTE**: All business ideas and data shown here are research-based and approximate. Actual costs and profits may vary by region, city, market demand, and season.")
-            
-            acknowledgement = st.checkbox("I have read and understood the above points and acknowledge that the data shown is indicative.")
-            
-            submitted = st.form_submit_button("Analyze", type="primary")
-            
-            if submitted:
-                if not acknowledgement:
-                    st.error("Please acknowledge the important note to proceed.")
-                elif not interests:
-                     st.error("Please select at least one interest.")
-                else:
-                    try:
-                        profile = FarmerProfile(
-                            name="Farmer", # Defaulting name as it wasn't in the design, strictly following visual
-                            budget=budget,
-                            land_size=land_size,
-                            water_source=water_source,
-                            experience_years=int(experience_years),
-                            interests=interests,
-                            market_distance=market_distance,
-                            b2c_willingness=b2c_willingness,
-                            income_fluctuation_tolerance=income_fluctuation_tolerance,
-                            investment_recovery_timeline=investment_recovery_timeline,
-                            loss_attitude=loss_attitude,
-                            risk_vs_profit=risk_vs_profit
-                        )
-                        
-                        st.session_state.advisor_profile = profile
-                        # Initialize advisor
-                        st.session_state.advisor_bot = KrishiSaarthiAdvisor(profile)
-                        
-                        # Initial greeting
-                        greeting = st.session_state.advisor_bot.chat("Hello! Based on my profile, what do you suggest?")
-                        st.session_state.ba_messages = [{"role": "assistant", "content": greeting}]
-                        
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Error creating profile: {e}")
+    if "advisor_session" not in st.session_state:
+        render_profile_form()
+        return
 
-    else:
-        # Profile exists, show chat and options
-        
-        # Display Profile Summary (Collapsible)
-        with st.expander("View Profile"):
-            st.text(st.session_state.advisor_profile.to_context())
-            if st.button("Reset Profile"):
-                del st.session_state.advisor_profile
-                del st.session_state.advisor_bot
-                del st.session_state.ba_messages
-                st.rerun()
-                
-        # Recommendations Button
-        if st.button("Generate Business Recommendations"):
-            with st.spinner("Analyzing profile and generating top business ideas..."):
-                recs = st.session_state.advisor_bot.generate_recommendations()
-                
-                # Custom CSS for Cards
-                st.markdown("""
-                <style>
-                .rec-card {
-                    border: 1px solid #e0e0e0;
-                    border-radius: 12px;
-                    overflow: hidden;
-                    box-shadow: 0 4px 6px rgba(0,0,0,0.05);
-                    background: white;
-                    margin-bottom: 15px;
-                    height: 100%;
-                }
-                .rec-header {
-                    background-color: #27ae60;
-                    color: white;
-                    padding: 15px;
-                    position: relative;
-                }
-                .match-badge {
-                    background-color: rgba(255,255,255,0.25);
-                    padding: 4px 10px;
-                    border-radius: 15px;
-                    font-size: 0.85em;
-                    font-weight: 600;
-                    display: inline-block;
-                    margin-bottom: 8px;
-                }
-                .rec-title {
-                    font-size: 1.1em;
-                    font-weight: 700;
-                    line-height: 1.3;
-                    margin: 0;
-                    text-transform: uppercase;
-                }
-                .rec-body {
-                    padding: 15px;
-                    color: #444;
-                    font-size: 0.95em;
-                }
-                .stats-container {
-                    display: flex;
-                    justify-content: space-between;
-                    background-color: #f8f9fa;
-                    border-radius: 8px;
-                    padding: 10px;
-                    margin: 15px 0;
-                }
-                .stat-box {
-                    text-align: left;
-                }
-                .stat-label {
-                    font-size: 0.75em;
-                    color: #888;
-                    text-transform: uppercase;
-                    margin-bottom: 2px;
-                    font-weight: 600;
-                }
-                .stat-value {
-                    font-size: 0.9em;
-                    font-weight: 700;
-                    color: #333;
-                }
-                .req-label {
-                    font-size: 0.75em;
-                    color: #888;
-                    text-transform: uppercase;
-                    font-weight: 600;
-                    margin-bottom: 5px;
-                }
-                .tag {
-                    display: inline-block;
-                    background-color: #edf2f7;
-                    color: #4a5568;
-                    padding: 4px 10px;
-                    border-radius: 6px;
-                    font-size: 0.8em;
-                    margin-right: 5px;
-                    margin-bottom: 5px;
-                }
-                </style>
-                """, unsafe_allow_html=True)
-                
-                st.subheader("Recommended Businesses")
-                
-                cols = st.columns(3)
-                
-                for idx, rec in enumerate(recs):
-                    with cols[idx]:
-                        # Prepare HTML content
-                        match_score = rec.get('match_score', 'N/A')
-                        title = rec.get('title', 'Unknown Business')
-                        reason = rec.get('reason', 'No description available.')
-                        cost = rec.get('estimated_cost', 'N/A')
-                        profit = rec.get('profit_potential', 'N/A')
-                        requirements = rec.get('requirements', [])
-                        tags_html = "".join([f'<span class="tag">{req}</span>' for req in requirements])
-                        
-                        card_html = f"""
-                        <div class="rec-card">
-                            <div class="rec-header">
-                                <div class="match-badge">{match_score}% Match</div>
-                                <h3 class="rec-title">{title}</h3>
-                            </div>
-                            <div class="rec-body">
-                                <p style="margin-bottom: 15px; height: 60px; overflow: hidden;">{reason}</p>
-                                
-                                <div class="stats-container">
-                                    <div class="stat-box">
-                                        <div class="stat-label">Investment</div>
-                                        <div class="stat-value">{cost}</div>
-                                    </div>
-                                    <div class="stat-box">
-                                        <div class="stat-label">Profit</div>
-                                        <div class="stat-value">{profit}</div>
-                                    </div>
-                                </div>
-                                
-                                <div class="req-label">Requirements</div>
-                                <div style="margin-bottom: 15px; height: 50px; overflow: hidden;">
-                                    {tags_html}
-                                </div>
-                            </div>
-                        </div>
-                        """
-                        st.markdown(card_html, unsafe_allow_html=True)
-                        
-                        # Buttons inside the card column (below the HTML card)
-                        b_col1, b_col2 = st.columns(2)
-                        if b_col1.button("Ask Chatbot", key=f"ask_{idx}"):
-                            # Pre-fill chat input
-                            st.session_state.ba_messages.append({"role": "user", "content": f"Tell me more about {title}"})
-                            response = st.session_state.advisor_bot.chat(f"Tell me more about {title}")
-                            st.session_state.ba_messages.append({"role": "assistant", "content": response})
-                            st.rerun()
-                            
-                        if b_col2.button("Know More", key=f"more_{idx}"):
-                            st.session_state.ba_messages.append({"role": "user", "content": f"What are the detailed requirements for {title}?"})
-                            response = st.session_state.advisor_bot.chat(f"What are the detailed requirements and steps for {title}?")
-                            st.session_state.ba_messages.append({"role": "assistant", "content": response})
-                            st.rerun()
-
-        st.divider()
-
-        # Chat Interface
-        if "ba_messages" not in st.session_state:
-             st.session_state.ba_messages = []
-
-        for message in st.session_state.ba_messages:
-            with st.chat_message(message["role"]):
-                st.markdown(message["content"])
-
-        if prompt := st.chat_input("Ask about farming businesses..."):
+    with st.expander("View Profile"):
+        st.json(st.session_state.advisor_profile)
+        if st.button("Reset Profile"):
+            for key in ("advisor_profile", "advisor_session", "advisor_recs", "ba_messages", "ba_pending"):
+                st.session_state.pop(key, None)
+            st.rerun()
+
+    render_recommendations(st.session_state.advisor_recs)
+    st.divider()
+
+    messages = st.session_state.setdefault("ba_messages", [])
+    render_messages(messages)
+
+    prompt = st.chat_input("Ask about farming businesses...", key="ba_chat") or st.session_state.pop("ba_pending", None)
+    if prompt:
+        if prompt != GREETING:
             with st.chat_message("user"):
                 st.markdown(prompt)
-            st.session_state.ba_messages.append({"role": "user", "content": prompt})
+            messages.append({"role": "user", "content": prompt})
+        stream_reply(messages, get_backend().stream_advisor_chat(st.session_state.advisor_session, prompt))
 
-            with st.chat_message("assistant"):
-                message_placeholder = st.empty()
-                message_placeholder.markdown("...")
-                try:
-                    response = st.session_state.advisor_bot.chat(prompt)
-                    message_placeholder.markdown(response)
-                    st.session_state.ba_messages.append({"role": "assistant", "content": response})
-                except Exception as e:
-                   message_placeholder.error(f"Error: {e}")
+
+# --- App ---
+
+def render_sidebar() -> str:
+    st.sidebar.title("TechFiesta")
+    st.sidebar.info("Integrated Agricultural Decision Support System")
+
+    default_url = os.getenv("KRISHI_UI_API_URL", "")
+    backend = st.sidebar.radio("Backend", ["In-process", "Flask API"], index=1 if default_url else 0)
+    if st.session_state.get("ui_backend") not in (None, backend):
+        # Sessions and analyses belong to the backend that created them
+        st.session_state.clear()
+    st.session_state.ui_backend = backend
+    if backend == "Flask API":
+        st.session_state.ui_api_url = st.sidebar.text_input("API URL", value=default_url or "http://localhost:5000")
+        st.session_state.ui_api_token = st.sidebar.text_input(
+            "Firebase ID token", value=os.getenv("KRISHI_UI_API_TOKEN", ""), type="password"
+        )
+
+    language = st.sidebar.selectbox("Waste-to-Value language", WASTE_LANGUAGES)
+
+    if st.sidebar.button("Clear All Data"):
+        st.session_state.clear()
+        st.rerun()
+    return language
 
 
 def main():
@@ -374,26 +555,15 @@ def main():
         initial_sidebar_state="expanded"
     )
 
-    st.sidebar.title("TechFiesta")
-    st.sidebar.info("Integrated Agricultural Decision Support System")
-    
-    if st.sidebar.button("Clear All Data"):
-        st.session_state.clear()
-        st.rerun()
-
-    current_tab = st.sidebar.radio("Navigate", ["Waste to Value", "Business Advisor"])
-    
-    # Alternatively, use st.tabs if preferred over sidebar navigation for the main content
-    # The user asked for "two different sections", tabs act nicely as sections.
-    # Let's use st.tabs for the main view to make it very distinct.
-    
+    language = render_sidebar()
     tab1, tab2 = st.tabs(["Waste to Value", "Business Advisor"])
-    
+
     with tab1:
-        render_waste_to_value()
-        
+        render_waste_to_value(language)
+
     with tab2:
         render_business_advisor()
 
+
 if __name__ == "__main__":
     main()
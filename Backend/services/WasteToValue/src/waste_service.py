@@ -1,57 +1,268 @@
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama import ChatOllama
-from langchain_core.output_parsers import JsonOutputParser
-from prompts import WASTE_TO_VALUE_SYSTEM_PROMPT, GUARDRAIL_PROMPT
-import json
+from langchain_core.output_parsers import StrOutputParser
+from prompts import (
+    WASTE_TO_VALUE_SYSTEM_PROMPT, GUARDRAIL_PROMPT, PROMPT_VERSION,
+    WASTE_PLAN_PROMPT, WASTE_OPTION_PROMPT, WASTE_CONCLUSION_PROMPT,
+    WASTE_CHAT_SYSTEM_PROMPT, OPTION_SECTIONS,
+    ANALYSIS_SCHEMA, PLAN_SCHEMA, OPTION_SCHEMA, CONCLUSION_SCHEMA,
+)
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import contextvars
+import itertools
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
 
 import os
 
+# Make Backend/ importable for shared utils when run outside app.py
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from utils.singleflight import SingleFlight
+from utils.response_cache import ResponseCache, make_key
+from utils.json_stream import IncrementalJSONParser
+from utils.llm_json import LLMJSONParser, JSONExtractError, is_complete, json_format
+from utils.semantic_cache import SemanticCache, context_id
+from utils.llm_clients import get_routed_chat_model, ollama_breaker
+from utils.circuit_breaker import CircuitOpenError
+from utils.ollama_router import get_router
+from utils.chain_registry import ChainRegistry
+from utils.usage_ledger import tag_usage
+from context_render import render_context
+
+# Identical in-flight requests share a single generation
+_analyze_flight = SingleFlight("waste.analyze")
+_chat_flight = SingleFlight("waste.chat")
+
+# Tolerant JSON parsing per call site; counters show up in /api/metrics.
+# Outputs missing required schema keys are rejected and regenerated.
+_analysis_json = LLMJSONParser("waste.analysis", expect="{", schema=ANALYSIS_SCHEMA)
+_plan_json = LLMJSONParser("waste.plan", expect="{", schema=PLAN_SCHEMA)
+_option_json = LLMJSONParser("waste.option", expect="{", schema=OPTION_SCHEMA)
+_conclusion_json = LLMJSONParser("waste.conclusion", expect="{", schema=CONCLUSION_SCHEMA)
+
+# Regenerations allowed when an output can't be repaired into JSON
+WASTE_JSON_RETRIES = int(os.getenv("WASTE_JSON_RETRIES", 1))
+
+# Near-duplicate questions about the same analysis reuse an earlier answer
+_chat_answer_cache = SemanticCache("waste.chat")
+
+# Analyses are cached for 30 days by default; set to 0 to disable expiry
+WASTE_CACHE_TTL_SECONDS = float(os.getenv("WASTE_CACHE_TTL_SECONDS", 30 * 24 * 3600)) or None
+
+# Most crops one batch request may ask for
+WASTE_BATCH_MAX_CROPS = int(os.getenv("WASTE_BATCH_MAX_CROPS", 20))
+
+# How often a cancellable generation asks whether it was cancelled (a job status read)
+CANCEL_CHECK_SECONDS = 0.5
+
+# Languages the frontend can request analyses in
+SUPPORTED_LANGUAGES = ["English", "Hindi", "Marathi"]
+
+
+class _GenerationAbandoned(RuntimeError):
+    """
+    Raised when a generation stops because nobody wants it any more: a
+    streaming client disconnected or a job was cancelled. Single-flight
+    followers that still want the result generate it themselves.
+    """
+
+
+class _CancellableJSONCall:
+    """
+    Stands in for a JSON chain's invoke(): streams the generation so that a
+    cancelled job closes the Ollama request at the next chunk, instead of
+    running it to num_predict and discarding the result.
+    """
+
+    def __init__(self, prompt, llm, parser: LLMJSONParser, cancelled: Callable[[], bool]):
+        self.prompt = prompt
+        self.llm = llm
+        self.parser = parser
+        self.cancelled = cancelled
+
+    def invoke(self, inputs: dict):
+        parts = []
+        next_check = time.monotonic() + CANCEL_CHECK_SECONDS
+        chunks = self.llm.stream(self.prompt.format_messages(**inputs))
+        try:
+            for chunk in chunks:
+                parts.append(chunk.content)
+                if time.monotonic() >= next_check:
+                    if self.cancelled():
+                        raise _GenerationAbandoned("Analysis was cancelled")
+                    next_check = time.monotonic() + CANCEL_CHECK_SECONDS
+        finally:
+            chunks.close()
+        return self.parser.parse("".join(parts))
+
+
+# "single": one JSON generation for everything (default).
+# "parallel": plan titles, generate option bodies concurrently, then the conclusion.
+ANALYSIS_MODES = ("single", "parallel")
+
+# Also served instantly while the Ollama circuit breaker is open
+CHAT_UNAVAILABLE_MESSAGE = (
+    "I apologize, but I'm having trouble connecting to the knowledge base right now. Please try again."
+)
+
+
+def normalize_crop(crop_name: str) -> str:
+    """'  sugarcane ' and 'Sugarcane' should hit the same cache entry"""
+    return " ".join(crop_name.split()).lower()
+
+
 class WasteToValueEngine:
     def __init__(self):
         model_name = os.getenv("OLLAMA_MODEL", "llama3.2")
-        base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+        self.model_name = model_name
         
-        self.json_llm = ChatOllama(
+        # Shared clients, routed per call across the OLLAMA_BASE_URLS pool
+        self.json_llm = get_routed_chat_model(
             model=model_name,
             temperature=0.2,
-            format="json",
-            base_url=base_url,
+            format=json_format(ANALYSIS_SCHEMA),
             num_predict=3072
         )
         
         # LLM for chat (No JSON enforcement)
-        self.chat_llm = ChatOllama(
+        self.chat_llm = get_routed_chat_model(
             model=model_name,
             temperature=0.4,
-            base_url=base_url,
             num_predict=1200 # Balanced num_predict for streaming
         )
 
-    def analyze_waste(self, crop_name: str, language: str = "English") -> dict:
-        """
-        Analyzes the crop waste and returns structured JSON recommendations.
-        """
-        prompt = ChatPromptTemplate.from_messages([
+        # Short JSON calls in parallel mode: planning titles...
+        self.plan_llm = get_routed_chat_model(
+            model=model_name,
+            temperature=0.2,
+            format=json_format(PLAN_SCHEMA),
+            num_predict=512
+        )
+
+        # ...and writing the conclusion (same settings, its own output schema)
+        self.conclusion_llm = get_routed_chat_model(
+            model=model_name,
+            temperature=0.2,
+            format=json_format(CONCLUSION_SCHEMA),
+            num_predict=512
+        )
+
+        # Parallel-mode option bodies: least-loaded routing spreads them over the pool.
+        # OLLAMA_PARALLEL_BASE_URLS still pins them round-robin to specific backends
+        # (through the breaker, timeout and usage ledger like every other call).
+        option_params = dict(
+            model=model_name,
+            temperature=0.2,
+            format=json_format(OPTION_SCHEMA),
+            num_predict=1024 # One option is roughly a third of the single-shot output
+        )
+        parallel_urls = [u.strip() for u in os.getenv("OLLAMA_PARALLEL_BASE_URLS", "").split(",") if u.strip()]
+        if parallel_urls:
+            self.option_llms = [get_routed_chat_model(base_url=url, **option_params) for url in parallel_urls]
+            backend_count = len(parallel_urls)
+        else:
+            self.option_llms = [get_routed_chat_model(**option_params)]
+            backend_count = len(get_router().backends)
+        self._option_llm_cycle = itertools.cycle(range(len(self.option_llms)))
+        self._option_llm_lock = threading.Lock()
+        self._option_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv("WASTE_PARALLEL_WORKERS", 3 * backend_count)),
+            thread_name_prefix="waste-option",
+        )
+        # Cache misses from batch requests; shared by all batches, so the number of
+        # whole-analysis generations in flight stays bounded however many batches run
+        self._batch_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv("WASTE_BATCH_CONCURRENCY", 2 * backend_count)),
+            thread_name_prefix="waste-batch",
+        )
+
+        # Memory LRU + SQLite store; results from older prompt versions are dropped
+        self.cache = ResponseCache("waste.analyze", ttl_seconds=WASTE_CACHE_TTL_SECONDS)
+        self.cache.purge_stale(PROMPT_VERSION)
+
+        # Prompts and chains are compiled once per language; requests only bind variables
+        self.chains = ChainRegistry("waste")
+        self._register_chains()
+        self.chains.precompile(["analysis", "plan", "conclusion", "chat"], SUPPORTED_LANGUAGES)
+        for backend in range(len(self.option_llms)):
+            self.chains.precompile(["option"], SUPPORTED_LANGUAGES, backend=backend)
+
+    def _register_chains(self):
+        def json_chain(template: ChatPromptTemplate, llm, parser: LLMJSONParser):
+            return lambda language: template.partial(language=language) | llm | parser.parse
+
+        analysis_prompt = ChatPromptTemplate.from_messages([
             ("system", WASTE_TO_VALUE_SYSTEM_PROMPT + "\n" + GUARDRAIL_PROMPT),
             ("human", "{input}"),
         ])
-        chain = prompt | self.json_llm | JsonOutputParser() # Use json_llm for analysis
+        plan_prompt = ChatPromptTemplate.from_messages([("system", WASTE_PLAN_PROMPT), ("human", "{input}")])
+        option_prompt = ChatPromptTemplate.from_messages([("human", WASTE_OPTION_PROMPT)])
+        conclusion_prompt = ChatPromptTemplate.from_messages([("human", WASTE_CONCLUSION_PROMPT)])
+        chat_prompt = ChatPromptTemplate.from_messages([
+            ("system", WASTE_CHAT_SYSTEM_PROMPT),
+            ("human", "{question}"),
+        ])
+
+        # The bare analysis prompt is also needed by stream_analysis, which streams raw chunks
+        self.chains.register("analysis_prompt", lambda language: analysis_prompt.partial(language=language))
+        self.chains.register("analysis", json_chain(analysis_prompt, self.json_llm, _analysis_json))
+        self.chains.register("plan", json_chain(plan_prompt, self.plan_llm, _plan_json))
+        self.chains.register("conclusion", json_chain(conclusion_prompt, self.conclusion_llm, _conclusion_json))
+        self.chains.register(
+            "option",
+            lambda language, backend: (
+                option_prompt.partial(language=language) | self.option_llms[backend] | _option_json.parse
+            ),
+        )
+        self.chains.register(
+            "chat",
+            lambda language: chat_prompt.partial(language=language) | self.chat_llm | StrOutputParser(),
+        )
+
+    def cache_key(self, crop_name: str, language: str) -> str:
+        return make_key(normalize_crop(crop_name), language.strip().lower(), self.model_name, PROMPT_VERSION)
+
+    def analyze_waste(self, crop_name: str, language: str = "English", use_cache: bool = True,
+                      mode: str = "single", cancelled: Optional[Callable[[], bool]] = None) -> dict:
+        """
+        Analyzes the crop waste and returns structured JSON recommendations.
+        Served from cache when possible; concurrent misses for the same crop
+        and language share one generation. `mode` picks the generation
+        strategy (see ANALYSIS_MODES); both produce the same schema.
+        If this call runs the generation, `cancelled()` returning True stops
+        it at the next output chunk (single) or LLM call (parallel). A call
+        waiting on someone else's generation waits for it to finish.
+        """
+        if mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode '{mode}'. Use one of {ANALYSIS_MODES}")
+        key = self.cache_key(crop_name, language)
+        tag_usage("waste.analyze", language)
+        if use_cache:
+            cached = self.get_analysis(key)
+            if cached is not None:
+                return cached
 
         try:
-            response = chain.invoke({"input": crop_name, "language": language})
-            
-            # Accuracy Sanity Check
-            self._validate_results(response)
-            
-            
-            # Map to legacy schema for frontend compatibility
-            legacy_response = self._map_to_legacy_schema(response)
-            
-            return legacy_response
+            # Fail fast instead of joining or starting a generation that would wait on the breaker
+            if ollama_breaker.is_open():
+                raise CircuitOpenError("Ollama is unavailable (circuit open)")
+            try:
+                return _analyze_flight.do(key, self._generate_and_cache, crop_name, language, key, mode, cancelled)
+            except _GenerationAbandoned:
+                if cancelled is not None and cancelled():
+                    raise
+                # Joined a request whose client went away or whose job was cancelled; generate it here
+                return _analyze_flight.do(key, self._generate_and_cache, crop_name, language, key, mode, cancelled)
         except Exception as e:
             print(f"Error in WasteToValueEngine: {e}")
-            import traceback
-            traceback.print_exc()
+            if not isinstance(e, (CircuitOpenError, _GenerationAbandoned)):
+                import traceback
+                traceback.print_exc()
             # Fallback/Error response structure
             return {
                 "crop": crop_name,
@@ -63,35 +274,289 @@ class WasteToValueEngine:
                 "error": str(e)
             }
 
-    def _map_to_legacy_schema(self, response: dict) -> dict:
-        """Maps the flattened LLM output back to the nested legacy schema for the frontend"""
-        legacy_options = []
-        for opt in response.get("options", []):
-            section_titles = [
-                "Plant Part", "Pathway Type", "Technical Basis", 
-                "Manufacturing Option (DIY)", "3rd-Party Selling Option", 
-                "Average Recovery Value", "Value Recovery Percentage", 
-                "Equipment Needed", "Action Urgency"
-            ]
-            
-            sections = []
-            for title in section_titles:
-                sections.append({
-                    "title": title,
-                    "content": opt.get(title, ["N/A"])
-                })
-            
-            legacy_opt = {
-                "id": opt.get("id"),
+    def get_analysis(self, analysis_id: str):
+        """
+        A stored analysis by the `analysis_id` returned with it (its cache key),
+        or None if unknown or expired. Chat requests use this instead of
+        re-sending the whole analysis.
+        """
+        result = self.cache.get(analysis_id)
+        if result is not None:
+            result.setdefault("analysis_id", analysis_id)  # Entries cached before IDs existed
+        return result
+
+    def warm(self, crop_name: str, language: str, refresh: bool = False) -> bool:
+        """
+        Ensures a cached analysis exists for the crop/language pair.
+        Returns True if a new generation was run, False if it was already cached.
+        Raises on generation or validation failure (nothing is cached then).
+        """
+        key = self.cache_key(crop_name, language)
+        tag_usage("waste.pregenerate", language)
+        if not refresh and self.cache.contains(key):
+            return False
+        # Shares the flight with live requests so a user asking mid-warm-up waits on this run
+        _analyze_flight.do(key, self._generate_and_cache, crop_name, language, key)
+        return True
+
+    def _generate_and_cache(self, crop_name: str, language: str, key: str, mode: str = "single",
+                            cancelled: Optional[Callable[[], bool]] = None) -> dict:
+        if mode == "parallel":
+            result, repaired = self._generate_analysis_parallel(crop_name, language, cancelled)
+        else:
+            result, repaired = self._generate_analysis(crop_name, language, cancelled)
+        # Only validated results reach this point; failures are never cached
+        result["analysis_id"] = key
+        if repaired:
+            # Served once, but the next request regenerates rather than keeping a patched output
+            print(f"[WASTE] Not caching {key}: the model output needed JSON repairs")
+        else:
+            self.cache.set(key, result, version=PROMPT_VERSION)
+        return result
+
+    def _generate_analysis(self, crop_name: str, language: str,
+                           cancelled: Optional[Callable[[], bool]] = None) -> tuple:
+        """
+        Runs the LLM analysis; raises on failure so callers can fall back.
+        Returns (result, whether the output needed JSON repairs).
+        """
+        if cancelled is None:
+            chain = self.chains.get("analysis", language) # Uses json_llm for analysis
+        else:
+            chain = _CancellableJSONCall(
+                self.chains.get("analysis_prompt", language), self.json_llm, _analysis_json, cancelled
+            )
+
+        response, repaired = self._invoke_json(chain, {"input": crop_name}, _analysis_json, cancelled)
+        
+        # Accuracy Sanity Check
+        self._validate_results(response)
+        
+        # Map to legacy schema for frontend compatibility
+        return self._map_to_legacy_schema(response), repaired
+
+    @staticmethod
+    def _invoke_json(chain, inputs: dict, parser: LLMJSONParser,
+                     cancelled: Optional[Callable[[], bool]] = None) -> tuple:
+        """
+        chain.invoke, regenerating up to WASTE_JSON_RETRIES times if the output
+        isn't repairable JSON. Returns (value, whether it needed repairs).
+        """
+        for attempt in range(WASTE_JSON_RETRIES + 1):
+            if cancelled is not None and cancelled():
+                raise _GenerationAbandoned("Analysis was cancelled")
+            try:
+                value = chain.invoke(inputs)
+                return value, parser.last_repaired
+            except JSONExtractError:
+                if attempt == WASTE_JSON_RETRIES:
+                    parser.record_fallback()
+                    raise
+                parser.record_retry()
+
+    def _next_option_backend(self) -> int:
+        """Index into option_llms, round-robin"""
+        with self._option_llm_lock:
+            return next(self._option_llm_cycle)
+
+    def _generate_analysis_parallel(self, crop_name: str, language: str,
+                                    cancelled: Optional[Callable[[], bool]] = None) -> tuple:
+        """
+        Parallel mode: a short planning call picks three titles, the option
+        bodies are generated concurrently, and a short call writes the conclusion.
+        Returns (result, whether any of the outputs needed JSON repairs).
+        """
+        plan, plan_repaired = self._invoke_json(
+            self.chains.get("plan", language), {"input": crop_name}, _plan_json, cancelled
+        )
+        titles = [t for t in plan.get("titles", []) if isinstance(t, str) and t.strip()][:3]
+        if len(titles) < 3:
+            raise ValueError(f"Planning call returned {len(titles)} titles; expected 3.")
+        crop = plan.get("crop") or crop_name
+
+        def generate_option(index: int, title: str) -> dict:
+            chain = self.chains.get("option", language, backend=self._next_option_backend())
+            option, repaired = self._invoke_json(
+                chain, {"crop": crop, "option_id": f"opt{index}", "title": title}, _option_json, cancelled
+            )
+            # The model occasionally rewrites these; the plan is authoritative
+            option["id"] = f"opt{index}"
+            option["title"] = title
+            return option, repaired
+
+        # copy_context keeps the usage-ledger tags on the pool threads
+        futures = [
+            self._option_pool.submit(contextvars.copy_context().run, generate_option, i, t)
+            for i, t in enumerate(titles, 1)
+        ]
+        options, options_repaired = zip(*(f.result() for f in futures))
+        options = list(options)
+
+        options_summary = "\n".join(f"- {o['title']}: {o.get('subtitle', '')}" for o in options)
+        conclusion, conclusion_repaired = self._invoke_json(self.chains.get("conclusion", language), {
+            "crop": crop, "options_summary": options_summary
+        }, _conclusion_json, cancelled)
+
+        response = {"crop": crop, "options": options, "conclusion": conclusion}
+        self._validate_results(response)
+        repaired = plan_repaired or any(options_repaired) or conclusion_repaired
+        return self._map_to_legacy_schema(response), repaired
+
+    def stream_analysis(self, crop_name: str, language: str = "English"):
+        """
+        Streams the analysis as events so the first option renders within seconds:
+        one {"type": "option"} event per option as soon as it is complete, then a
+        final {"type": "conclusion"} event carrying the conclusion and full result.
+        A miss joins the same single-flight as analyze_waste: only the first
+        request generates, and the others replay its result as events.
+        """
+        key = self.cache_key(crop_name, language)
+        tag_usage("waste.analyze", language)
+        cached = self.get_analysis(key)
+        if cached is not None:
+            yield from self._replay_events(cached)
+            return
+        if ollama_breaker.is_open():
+            yield {"type": "error", "error": "Ollama is unavailable (circuit open)"}
+            return
+
+        leader, call = _analyze_flight.join(key)
+        if not leader:
+            try:
+                result = _analyze_flight.wait(call)
+            except _GenerationAbandoned:
+                # The leader's client went away mid-stream; generate without streaming instead
+                result = self.analyze_waste(crop_name, language)
+            except Exception as e:
+                result = {"error": str(e)}
+            if result.get("error"):
+                yield {"type": "error", "error": result["error"]}
+            else:
+                yield from self._replay_events(result)
+            return
+
+        result, error = None, None
+        parser = IncrementalJSONParser(watch=[("options", "*")])
+        messages = self.chains.get("analysis_prompt", language).format_messages(input=crop_name)
+        try:
+            for chunk in self.json_llm.stream(messages):
+                for _, opt in parser.feed(chunk.content):
+                    yield {"type": "option", "option": self._map_option_to_legacy(opt)}
+
+            # Options were already sent, so a bad tail can't be regenerated; repair it instead
+            try:
+                response = _analysis_json.parse(parser.buffer)
+            except JSONExtractError:
+                _analysis_json.record_fallback()
+                raise
+            self._validate_results(response)
+            result = self._map_to_legacy_schema(response)
+            result["analysis_id"] = key
+            if _analysis_json.last_repaired:
+                print(f"[WASTE] Not caching {key}: the model output needed JSON repairs")
+            else:
+                self.cache.set(key, result, version=PROMPT_VERSION)
+        except Exception as e:
+            error = e
+            print(f"Error in WasteToValueEngine stream: {e}")
+            yield {"type": "error", "error": str(e)}
+            return
+        finally:
+            # Also reached when the client disconnects (GeneratorExit at a yield)
+            if result is None and error is None:
+                error = _GenerationAbandoned("Streaming analysis was abandoned by its client")
+            _analyze_flight.resolve(key, call, result, error)
+
+        yield {"type": "conclusion", "conclusion": result["conclusion"], "result": result}
+
+    @staticmethod
+    def _replay_events(result: dict):
+        for opt in result["options"]:
+            yield {"type": "option", "option": opt}
+        yield {"type": "conclusion", "conclusion": result["conclusion"], "result": result}
+
+    def analyze_batch(self, crops: list, language: str = "English", mode: str = "single"):
+        """
+        Analyses for several crops, as events in completion order:
+        {"type": "crop"} per crop (cached ones first, then generations as they
+        finish on the batch pool), then one {"type": "done"} with every result.
+        Crops are de-duplicated by normalized name (first spelling wins).
+        """
+        if mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode '{mode}'. Use one of {ANALYSIS_MODES}")
+        unique = {}
+        for crop in crops:
+            unique.setdefault(normalize_crop(crop), crop)
+        if len(unique) > WASTE_BATCH_MAX_CROPS:
+            raise ValueError(f"At most {WASTE_BATCH_MAX_CROPS} crops per batch")
+
+        started = time.perf_counter()
+        results, errors = {}, {}
+        counts = {"cached": 0, "generated": 0, "failed": 0}
+
+        def crop_event(crop: str, result: dict, cached: bool) -> dict:
+            if result.get("error"):
+                errors[crop] = result["error"]
+                counts["failed"] += 1
+                return {"type": "crop", "crop": crop, "error": result["error"]}
+            results[crop] = result
+            counts["cached" if cached else "generated"] += 1
+            return {"type": "crop", "crop": crop, "cached": cached, "result": result}
+
+        misses = []
+        for crop in unique.values():
+            cached = self.get_analysis(self.cache_key(crop, language))
+            if cached is not None:
+                yield crop_event(crop, cached, cached=True)
+            else:
+                misses.append(crop)
+
+        # analyze_waste goes through the same single-flight as live requests
+        futures = {
+            self._batch_pool.submit(
+                contextvars.copy_context().run, self.analyze_waste, crop, language, True, mode
+            ): crop for crop in misses
+        }
+        for future in as_completed(futures):
+            crop = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"error": str(e)}
+            yield crop_event(crop, result, cached=False)
+
+        yield {
+            "type": "done",
+            "language": language,
+            "results": results,
+            "errors": errors,
+            **counts,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000),
+        }
+
+    def _map_option_to_legacy(self, opt: dict) -> dict:
+        """Maps one flattened LLM option to the nested legacy option schema"""
+        sections = []
+        for title in OPTION_SECTIONS:
+            sections.append({
+                "title": title,
+                "content": opt.get(title, ["N/A"])
+            })
+        
+        return {
+            "id": opt.get("id"),
+            "title": opt.get("title"),
+            "subtitle": opt.get("subtitle"),
+            "fullDetails": {
                 "title": opt.get("title"),
-                "subtitle": opt.get("subtitle"),
-                "fullDetails": {
-                    "title": opt.get("title"),
-                    "basicIdea": opt.get("basicIdea", []),
-                    "sections": sections
-                }
+                "basicIdea": opt.get("basicIdea", []),
+                "sections": sections
             }
-            legacy_options.append(legacy_opt)
+        }
+
+    def _map_to_legacy_schema(self, response: dict) -> dict:
+        """Maps the flattened LLM output back to the nested legacy schema for the frontend"""
+        legacy_options = [self._map_option_to_legacy(opt) for opt in response.get("options", [])]
         
         # Post-process conclusion highlight to ensure it matches one of the options
         conclusion = response.get("conclusion", {})
@@ -112,6 +577,12 @@ class WasteToValueEngine:
 
     def _validate_results(self, response: dict):
         """Internal sanity check for accuracy and technical depth"""
+        # Three complete options and a conclusion, as ANALYSIS_SCHEMA requires
+        if not is_complete(response, ANALYSIS_SCHEMA):
+            options = response.get("options") if isinstance(response.get("options"), list) else []
+            complete = sum(is_complete(opt, OPTION_SCHEMA) for opt in options)
+            conclusion = "with" if is_complete(response.get("conclusion"), CONCLUSION_SCHEMA) else "without"
+            raise JSONExtractError(f"Generated {complete} of 3 complete options, {conclusion} a conclusion")
         options = response.get("options", [])
         for opt in options:
             # Check for price realism
@@ -128,96 +599,66 @@ class WasteToValueEngine:
                 if "n/a" in content_str or "none" in content_str or "..." in content_str:
                     print(f"Warning: Weak technical basis for {opt.get('title')}")
         
-        if len(options) < 1:
-            raise ValueError("Generated 0 options; LLM failed to provide valid recommendations.")
 
     def chat_waste(self, context: dict, user_question: str, language: str = "English") -> str:
         """
         Answers user questions based on the detailed waste analysis context (Synchronous).
         """
-        chat_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a helpful agricultural expert assistant.
-            The user has just received an analysis for converting specific crop waste into value.
-            
-            CONTEXT (The analysis results):
-            {{context_str}}
-            
-            YOUR GOAL:
-            Answer the user's question specifically based on the options provided in the context.
-            Respond in the specified LANGUAGE: {language}.
-            
-            FORMATTING RULES:
-            - Use **Bold** for key numbers, machine names, and prices.
-            - Use bullet points (•) for lists to make them readable.
-            - **ALWAYS use double newlines** between paragraphs.
-            - Keep responses concise but well-structured.
-            - Be encouraging and practical (Indian context).
-            
-            Do not hallucinate new options not in the context unless asked for alternatives.
-            """),
-            ("human", "{question}"),
-        ])
-        
-        # We use a string output parser for chat, not JSON
-        from langchain_core.output_parsers import StrOutputParser
-        
-        # Use the non-JSON chat LLM
-        chat_chain = chat_prompt.partial(language=language) | self.chat_llm | StrOutputParser()
+        chat_chain = self.chains.get("chat", language)
         
         try:
-            # Convert context dict to a readable string
-            context_str = json.dumps(context, indent=2)
+            tag_usage("waste.chat", language, context.get("analysis_id") if isinstance(context, dict) else None)
+            ctx = context_id(context)
+            cached, embedding = _chat_answer_cache.lookup(user_question, ctx, language)
+            if cached is not None:
+                return cached
+            if ollama_breaker.is_open():
+                return CHAT_UNAVAILABLE_MESSAGE
+
+            # Compact text, full detail only for the options the question is about
+            context_str = render_context(context, user_question)
             
-            response = chat_chain.invoke({
+            # Same analysis + same question + same language -> one generation
+            flight_key = (ctx, user_question.strip(), language)
+            response = _chat_flight.do(flight_key, chat_chain.invoke, {
                 "context_str": context_str, 
                 "question": user_question
             })
             
-            
+            _chat_answer_cache.store(user_question, ctx, response, language, embedding)
             return response
         except Exception as e:
             print(f"Error in Waste Chat: {e}")
             import traceback
             traceback.print_exc()
-            return "I apologize, but I'm having trouble connecting to the knowledge base right now. Please try again."
+            return CHAT_UNAVAILABLE_MESSAGE
 
     def stream_chat_waste(self, context: dict, user_question: str, language: str = "English"):
         """
         Answers user questions based on the detailed waste analysis context (Streaming).
         """
-        chat_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a helpful agricultural expert assistant.
-            The user has just received an analysis for converting specific crop waste into value.
-            
-            CONTEXT (The analysis results):
-            {{context_str}}
-            
-            YOUR GOAL:
-            Answer the user's question specifically based on the options provided in the context.
-            Respond in the specified LANGUAGE: {language}.
-            
-            FORMATTING RULES:
-            - Use **Bold** for key numbers, machine names, and prices.
-            - Use bullet points (•) for lists to make them readable.
-            - **ALWAYS use double newlines** between paragraphs.
-            - Keep responses concise but well-structured.
-            - Be encouraging and practical (Indian context).
-            
-            Do not hallucinate new options not in the context unless asked for alternatives.
-            """),
-            ("human", "{question}"),
-        ])
-        
-        from langchain_core.output_parsers import StrOutputParser
-        chat_chain = chat_prompt.partial(language=language) | self.chat_llm | StrOutputParser()
+        chat_chain = self.chains.get("chat", language)
         
         try:
-            context_str = json.dumps(context, indent=2)
+            tag_usage("waste.chat", language, context.get("analysis_id") if isinstance(context, dict) else None)
+            ctx = context_id(context)
+            cached, embedding = _chat_answer_cache.lookup(user_question, ctx, language)
+            if cached is not None:
+                yield cached
+                return
+            if ollama_breaker.is_open():
+                yield CHAT_UNAVAILABLE_MESSAGE
+                return
+
+            context_str = render_context(context, user_question)
+            full_response = ""
             for chunk in chat_chain.stream({
                 "context_str": context_str, 
                 "question": user_question
             }):
+                full_response += chunk
                 yield chunk
+            _chat_answer_cache.store(user_question, ctx, full_response, language, embedding)
         except Exception as e:
             print(f"Error in Waste Stream Chat: {e}")
-            yield "I apologize, but I'm having trouble connecting to the knowledge base right now. Please try again."
+            yield CHAT_UNAVAILABLE_MESSAGE
@@ -0,0 +1,760 @@
+"""
+Local index of the SaarthiMarketplace and ProjectRegistry contract events.
+
+The buyer and green-credit dashboards used to read `listings(i)` and
+`projects(i)` one contract call at a time. The indexer instead follows the
+contracts' events and materialises them into SQLite, so a filtered,
+paginated page of listings or projects is one indexed query:
+
+    ListingCreated / ListingPurchased / ListingCancelled -> listings
+    ProjectCreated / ProjectVerified (the mint)           -> projects
+
+A background thread polls the node every CHAIN_POLL_SECONDS. It fetches
+logs for at most CHAIN_BLOCK_RANGE blocks per eth_getLogs call, up to
+CHAIN_CONFIRMATIONS blocks behind the head. Each range is applied in one
+transaction together with the checkpoint (the last indexed block), so a
+restart resumes where it stopped. ProjectCreated carries no project type
+or document hash, so those are read once with a `projects(id)` call.
+
+Reorgs: the hash of the last block of every range, and of every block
+that had events, is kept for the newest CHAIN_REORG_WINDOW blocks. Each
+poll compares the checkpoint's hash with the node's. On a mismatch, the
+indexer walks back to the newest stored block that still matches, deletes
+the events after it, rebuilds the listings and projects those events
+touched from their remaining events, and indexes forward again. A reorg
+deeper than the window reindexes from CHAIN_START_BLOCK.
+
+Logs are decoded here from their raw topics and data, and the node is
+spoken to over plain JSON-RPC (`requests`), so no web3 install is needed.
+DevChain is an in-memory stand-in for a local dev chain. It produces the
+same raw logs and `projects(id)` return data, and can reorg on demand;
+`benchmarks/bench_chain_indexer.py` drives the indexer against it.
+
+Usage (from the Backend directory), to catch up once without the API:
+    python utils/chain_indexer.py --rpc http://127.0.0.1:8545
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+if __package__ in (None, ""):
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from utils.response_cache import DEFAULT_CACHE_DIR
+
+# Defaults match Frontend/src/services/contracts.ts
+CHAIN_RPC_URL = os.getenv("CHAIN_RPC_URL", "")
+CHAIN_MARKETPLACE_ADDRESS = os.getenv("CHAIN_MARKETPLACE_ADDRESS", "0x8FAdBaD360CAbB5d7d6edd757029292C800752D3").lower()
+CHAIN_REGISTRY_ADDRESS = os.getenv("CHAIN_REGISTRY_ADDRESS", "0x2a1Df2663e9918E328bF8E9616345e3BA0ebcB53").lower()
+CHAIN_INDEX_PATH = os.getenv("CHAIN_INDEX_PATH", str(DEFAULT_CACHE_DIR / "chain_index.sqlite3"))
+CHAIN_START_BLOCK = int(os.getenv("CHAIN_START_BLOCK", 0))
+CHAIN_CONFIRMATIONS = int(os.getenv("CHAIN_CONFIRMATIONS", 2))
+CHAIN_POLL_SECONDS = float(os.getenv("CHAIN_POLL_SECONDS", 5))
+CHAIN_BLOCK_RANGE = int(os.getenv("CHAIN_BLOCK_RANGE", 2000))
+CHAIN_REORG_WINDOW = int(os.getenv("CHAIN_REORG_WINDOW", 128))
+CHAIN_RPC_TIMEOUT = float(os.getenv("CHAIN_RPC_TIMEOUT", 10))
+CHAIN_MAX_PAGE = int(os.getenv("CHAIN_MAX_PAGE", 200))
+
+# keccak256 of the canonical signatures; `uint` in the contracts is uint256
+EVENT_TOPICS = {
+    "0x9adf89188ff96bbe0e772b6a9345d935a240c2bd656be8db63db0d091e92cb9d": ("ListingCreated", "listing"),      # (uint256,address,uint256)
+    "0x2d59a19899f1b1165cfd3b030c8d0a2b924a1ca783b1f91efd7b6aebe9c87a60": ("ListingPurchased", "listing"),    # (uint256,address,uint256)
+    "0x411aee90354c51b1b04cd563fcab2617142a9d50da19232d888547c8a1b7fd8a": ("ListingCancelled", "listing"),    # (uint256)
+    "0x63c92f9505d420bff631cb9df33be952bdc11e2118da36a850b43e6bcc4ce4de": ("ProjectCreated", "project"),      # (uint256,address)
+    "0x6a1117c9e7ec4502662cc8b121775560ae4bae071c4c38eea03365ef8cc1ad52": ("ProjectVerified", "project"),     # (uint256,address,uint256)
+}
+TOPIC_BY_EVENT = {name: topic for topic, (name, _) in EVENT_TOPICS.items()}
+PROJECTS_SELECTOR = "0x107046bd"  # projects(uint256)
+PROJECT_STATUSES = ("Pending", "Verified")
+LISTING_STATUSES = ("active", "sold", "cancelled")
+LISTING_SORTS = ("newest", "oldest", "remaining")
+TOKEN_DECIMALS = 18
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    entity INTEGER NOT NULL,
+    account TEXT,
+    amount_wei TEXT,
+    details TEXT,
+    PRIMARY KEY (block, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_entity ON events (kind, entity, block, log_index);
+CREATE INDEX IF NOT EXISTS events_account ON events (name, account, block, log_index);
+CREATE TABLE IF NOT EXISTS listings (
+    id INTEGER PRIMARY KEY,
+    seller TEXT NOT NULL,
+    total_wei TEXT NOT NULL,
+    remaining_wei TEXT NOT NULL,
+    remaining REAL NOT NULL,
+    purchases INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_block INTEGER NOT NULL,
+    updated_block INTEGER NOT NULL,
+    tx TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS listings_status ON listings (status, id);
+CREATE INDEX IF NOT EXISTS listings_status_remaining ON listings (status, remaining, id);
+CREATE INDEX IF NOT EXISTS listings_seller ON listings (seller, id);
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    farmer TEXT NOT NULL,
+    project_type TEXT,
+    off_chain_hash TEXT,
+    status TEXT NOT NULL,
+    minted_wei TEXT,
+    minted REAL,
+    created_block INTEGER NOT NULL,
+    verified_block INTEGER,
+    tx TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS projects_farmer ON projects (farmer, id);
+CREATE INDEX IF NOT EXISTS projects_status ON projects (status, id);
+CREATE TABLE IF NOT EXISTS blocks (number INTEGER PRIMARY KEY, hash TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+# --- ABI helpers (every event field is a uint256 or an address) ---
+
+def _word(value: int) -> str:
+    return format(value, "064x")
+
+
+def _address(word: int) -> str:
+    return "0x" + format(word & ((1 << 160) - 1), "040x")
+
+
+def _words(data: str) -> List[int]:
+    data = data[2:] if data.startswith("0x") else data
+    return [int(data[i:i + 64], 16) for i in range(0, len(data), 64)]
+
+
+def _tokens(wei: int) -> float:
+    return wei / 10 ** TOKEN_DECIMALS
+
+
+def _encode_string(value: str) -> bytes:
+    raw = value.encode("utf-8")
+    return len(raw).to_bytes(32, "big") + raw.ljust((len(raw) + 31) // 32 * 32, b"\0")
+
+
+def encode_project(farmer: str, project_type: str, off_chain_hash: str, status: int) -> str:
+    """ABI-encoded return of projects(uint256): (address, string, string, uint8)"""
+    type_tail, hash_tail = _encode_string(project_type), _encode_string(off_chain_hash)
+    head = b"".join(v.to_bytes(32, "big") for v in (int(farmer, 16), 128, 128 + len(type_tail), status))
+    return "0x" + (head + type_tail + hash_tail).hex()
+
+
+def decode_project(data: str) -> Tuple[str, str, str, int]:
+    raw = bytes.fromhex(data[2:] if data.startswith("0x") else data)
+
+    def word(offset: int) -> int:
+        return int.from_bytes(raw[offset:offset + 32], "big")
+
+    def string(offset: int) -> str:
+        return raw[offset + 32:offset + 32 + word(offset)].decode("utf-8", "replace")
+
+    return _address(word(0)), string(word(32)), string(word(64)), word(96)
+
+
+def decode_log(log: dict) -> Optional[dict]:
+    """Event row for a raw JSON-RPC log, or None for an unknown topic"""
+    topics = [t.lower() for t in log["topics"]]
+    if not topics or topics[0] not in EVENT_TOPICS:
+        return None
+    name, kind = EVENT_TOPICS[topics[0]]
+    words = _words(log["data"])
+    account, amount = None, None
+    if len(topics) > 2:
+        # Listing events index the seller or buyer; the amount is in data
+        account, amount = _address(int(topics[2], 16)), words[0]
+    elif words:
+        # Project events carry the farmer (and the minted amount) in data
+        account = _address(words[0])
+        amount = words[1] if len(words) > 1 else None
+    return {
+        "block": int(log["blockNumber"], 16),
+        "block_hash": log["blockHash"],
+        "log_index": int(log["logIndex"], 16),
+        "tx": log["transactionHash"],
+        "name": name,
+        "kind": kind,
+        "entity": int(topics[1], 16),
+        "account": account,
+        "amount_wei": str(amount) if amount is not None else None,
+        "details": None,
+    }
+
+
+# --- Chain sources: head(), block_hash(n), get_logs(...), call(to, data) ---
+
+class JsonRpcChainSource:
+    """An Ethereum node over JSON-RPC"""
+
+    def __init__(self, url: str, timeout: float = CHAIN_RPC_TIMEOUT):
+        import requests
+
+        self.url = url
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._ids = itertools.count(1)
+
+    def _rpc(self, method: str, *params):
+        response = self._session.post(
+            self.url, json={"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": list(params)},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        body = response.json()
+        if body.get("error"):
+            raise RuntimeError(f"{method}: {body['error'].get('message', body['error'])}")
+        return body["result"]
+
+    def head(self) -> int:
+        return int(self._rpc("eth_blockNumber"), 16)
+
+    def block_hash(self, number: int) -> Optional[str]:
+        block = self._rpc("eth_getBlockByNumber", hex(number), False)
+        return block["hash"] if block else None
+
+    def get_logs(self, from_block: int, to_block: int, addresses: List[str], topics: List[str]) -> List[dict]:
+        return self._rpc("eth_getLogs", {
+            "fromBlock": hex(from_block), "toBlock": hex(to_block), "address": addresses, "topics": [topics],
+        })
+
+    def call(self, to: str, data: str) -> str:
+        return self._rpc("eth_call", {"to": to, "data": data}, "latest")
+
+
+class DevChain:
+    """
+    In-memory stand-in for a local dev chain running both contracts.
+
+    Transactions are queued with create_listing(), buy(), cancel_listing(),
+    create_project() and verify_and_mint(), and included by mine(). One that
+    would revert on-chain is dropped without events. reorg(depth) drops the
+    newest blocks and re-queues their transactions, so the next mine()
+    builds a competing branch with new block hashes. `latency` (seconds)
+    is added to every call, like a round-trip to a node.
+    """
+
+    def __init__(self, marketplace: str = CHAIN_MARKETPLACE_ADDRESS, registry: str = CHAIN_REGISTRY_ADDRESS,
+                 latency: float = 0.0):
+        self.marketplace = marketplace.lower()
+        self.registry = registry.lower()
+        self.latency = latency
+        self.calls = 0
+        self._blocks: List[dict] = [{"hash": self._hash("genesis", 0), "txs": [], "logs": []}]
+        self._pending: List[tuple] = []
+        self._branch = itertools.count(1)
+        self._listings: List[list] = []
+        self._projects: List[list] = []
+
+    @staticmethod
+    def _hash(*parts) -> str:
+        return "0x" + hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def _rpc(self) -> None:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    # Transactions
+
+    def create_listing(self, seller: str, amount_wei: int) -> None:
+        self._pending.append(("create_listing", seller.lower(), amount_wei))
+
+    def buy(self, buyer: str, listing_id: int, amount_wei: int) -> None:
+        self._pending.append(("buy", buyer.lower(), listing_id, amount_wei))
+
+    def cancel_listing(self, seller: str, listing_id: int) -> None:
+        self._pending.append(("cancel_listing", seller.lower(), listing_id))
+
+    def create_project(self, farmer: str, project_type: str, off_chain_hash: str) -> None:
+        self._pending.append(("create_project", farmer.lower(), project_type, off_chain_hash))
+
+    def verify_and_mint(self, project_id: int, amount_wei: int) -> None:
+        self._pending.append(("verify_and_mint", project_id, amount_wei))
+
+    # Blocks
+
+    def mine(self, blocks: int = 1) -> int:
+        """Includes every queued transaction in the next block, then mines empty ones"""
+        for i in range(blocks):
+            number = len(self._blocks)
+            block = {"hash": self._hash(self._blocks[-1]["hash"], number, next(self._branch)), "txs": [], "logs": []}
+            txs, self._pending = (self._pending, []) if i == 0 else ([], self._pending)
+            for tx in txs:
+                logs = self._execute(tx)
+                if logs is None:
+                    continue
+                tx_hash = self._hash(block["hash"], len(block["txs"]))
+                block["txs"].append(tx)
+                for address, topics, words in logs:
+                    block["logs"].append({
+                        "address": address,
+                        "topics": topics,
+                        "data": "0x" + "".join(_word(w) for w in words),
+                        "blockNumber": hex(number),
+                        "blockHash": block["hash"],
+                        "transactionHash": tx_hash,
+                        "logIndex": hex(len(block["logs"])),
+                    })
+            self._blocks.append(block)
+        return len(self._blocks) - 1
+
+    def reorg(self, depth: int) -> None:
+        """Drops the newest `depth` blocks; their transactions go back to the queue"""
+        depth = min(depth, len(self._blocks) - 1)
+        dropped = self._blocks[len(self._blocks) - depth:]
+        self._blocks = self._blocks[:len(self._blocks) - depth]
+        self._pending = [tx for block in dropped for tx in block["txs"]] + self._pending
+        self._listings, self._projects = [], []
+        for block in self._blocks:
+            for tx in block["txs"]:
+                self._execute(tx)
+
+    def _execute(self, tx: tuple) -> Optional[list]:
+        """Applies a transaction to the contract state; None when it reverts"""
+        op, args = tx[0], tx[1:]
+        if op == "create_listing":
+            seller, amount = args
+            if amount <= 0:
+                return None
+            self._listings.append([seller, amount, amount, True])
+            return [(self.marketplace, self._topics("ListingCreated", len(self._listings) - 1, seller), [amount])]
+        if op == "buy":
+            buyer, listing_id, amount = args
+            if listing_id >= len(self._listings):
+                return None
+            listing = self._listings[listing_id]
+            if not listing[3] or amount <= 0 or amount > listing[2]:
+                return None
+            listing[2] -= amount
+            listing[3] = listing[2] > 0
+            return [(self.marketplace, self._topics("ListingPurchased", listing_id, buyer), [amount])]
+        if op == "cancel_listing":
+            seller, listing_id = args
+            if listing_id >= len(self._listings) or self._listings[listing_id][0] != seller or not self._listings[listing_id][3]:
+                return None
+            self._listings[listing_id][3] = False
+            return [(self.marketplace, self._topics("ListingCancelled", listing_id), [])]
+        if op == "create_project":
+            farmer, project_type, off_chain_hash = args
+            self._projects.append([farmer, project_type, off_chain_hash, 0])
+            return [(self.registry, self._topics("ProjectCreated", len(self._projects) - 1), [int(farmer, 16)])]
+        if op == "verify_and_mint":
+            project_id, amount = args
+            if project_id >= len(self._projects) or self._projects[project_id][3] != 0:
+                return None
+            self._projects[project_id][3] = 1
+            farmer = self._projects[project_id][0]
+            return [(self.registry, self._topics("ProjectVerified", project_id), [int(farmer, 16), amount])]
+        raise ValueError(f"Unknown transaction {op}")
+
+    @staticmethod
+    def _topics(event: str, entity: int, account: Optional[str] = None) -> List[str]:
+        topics = [TOPIC_BY_EVENT[event], "0x" + _word(entity)]
+        if account is not None:
+            topics.append("0x" + _word(int(account, 16)))
+        return topics
+
+    # Contract views, the way the dashboards read them today
+
+    def listings_count(self) -> int:
+        self._rpc()
+        return len(self._listings)
+
+    def listing(self, listing_id: int) -> Tuple[str, int, int, bool]:
+        self._rpc()
+        return tuple(self._listings[listing_id])
+
+    def projects_count(self) -> int:
+        self._rpc()
+        return len(self._projects)
+
+    # ChainSource
+
+    def head(self) -> int:
+        self._rpc()
+        return len(self._blocks) - 1
+
+    def block_hash(self, number: int) -> Optional[str]:
+        self._rpc()
+        return self._blocks[number]["hash"] if 0 <= number < len(self._blocks) else None
+
+    def get_logs(self, from_block: int, to_block: int, addresses: List[str], topics: List[str]) -> List[dict]:
+        self._rpc()
+        addresses, topics = {a.lower() for a in addresses}, set(topics)
+        return [
+            dict(log) for block in self._blocks[from_block:to_block + 1] for log in block["logs"]
+            if log["address"] in addresses and log["topics"][0] in topics
+        ]
+
+    def call(self, to: str, data: str) -> str:
+        self._rpc()
+        if to.lower() != self.registry or not data.startswith(PROJECTS_SELECTOR):
+            raise RuntimeError("execution reverted")
+        project_id = int(data[len(PROJECTS_SELECTOR):], 16)
+        if project_id >= len(self._projects):
+            raise RuntimeError("execution reverted")
+        return encode_project(*self._projects[project_id])
+
+
+# --- Indexer ---
+
+class ChainIndexer:
+    def __init__(self, source, db_path: Optional[str] = None,
+                 marketplace: str = CHAIN_MARKETPLACE_ADDRESS, registry: str = CHAIN_REGISTRY_ADDRESS,
+                 start_block: int = CHAIN_START_BLOCK, confirmations: int = CHAIN_CONFIRMATIONS,
+                 block_range: int = CHAIN_BLOCK_RANGE, reorg_window: int = CHAIN_REORG_WINDOW):
+        if db_path is None:
+            Path(CHAIN_INDEX_PATH).parent.mkdir(parents=True, exist_ok=True)
+            db_path = CHAIN_INDEX_PATH
+        self.source = source
+        self.marketplace = marketplace.lower()
+        self.registry = registry.lower()
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.block_range = max(1, block_range)
+        self.reorg_window = reorg_window
+        self.head = None
+        self.polls = 0
+        self.errors = 0
+        self.last_error = None
+        self.reorgs = 0
+        self.rolled_back = 0
+        self.last_sync_seconds = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._check_identity()
+
+    def _check_identity(self) -> None:
+        """An index built for other contracts or another start block is dropped"""
+        identity = f"{self.marketplace}:{self.registry}:{self.start_block}"
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'identity'").fetchone()
+        if row is not None and row["value"] == identity:
+            return
+        if row is not None:
+            print(f"[CHAIN] Contracts or start block changed; reindexing from block {self.start_block}")
+        with self._db:
+            for table in ("events", "listings", "projects", "blocks", "meta"):
+                self._db.execute(f"DELETE FROM {table}")
+            self._db.execute("INSERT INTO meta (key, value) VALUES ('identity', ?)", (identity,))
+
+    def checkpoint(self) -> int:
+        """Last block whose events are in the index"""
+        with self._lock:
+            return self._checkpoint()
+
+    def _checkpoint(self) -> int:
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'last_block'").fetchone()
+        return int(row["value"]) if row is not None else self.start_block - 1
+
+    # Syncing
+
+    def sync_once(self) -> int:
+        """Indexes up to the confirmed head; returns the number of new events"""
+        started = time.perf_counter()
+        self.head = self.source.head()
+        last = self.checkpoint()
+        fork = self._find_fork(last)
+        if fork < last:
+            self._rollback(fork)
+            last = fork
+
+        target = self.head - self.confirmations
+        applied = 0
+        step = self.block_range
+        while last < target:
+            end = min(last + step, target)
+            end_hash = self.source.block_hash(end)
+            try:
+                logs = self.source.get_logs(last + 1, end, [self.marketplace, self.registry], list(EVENT_TOPICS))
+            except Exception:
+                if end == last + 1:
+                    raise
+                step = max(1, (end - last) // 2)  # Providers cap the logs per call
+                continue
+            if self.source.block_hash(end) != end_hash:
+                break  # Reorged while fetching; the next poll rolls back
+
+            events = sorted(filter(None, map(decode_log, logs)), key=lambda e: (e["block"], e["log_index"]))
+            for event in events:
+                if event["name"] == "ProjectCreated":
+                    _, project_type, off_chain_hash, _ = decode_project(
+                        self.source.call(self.registry, PROJECTS_SELECTOR + _word(event["entity"])))
+                    event["details"] = json.dumps({"project_type": project_type, "off_chain_hash": off_chain_hash})
+            hashes = {event["block"]: event["block_hash"] for event in events}
+            hashes[end] = end_hash
+
+            with self._lock, self._db:
+                for event in events:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO events (block, log_index, tx, name, kind, entity, account, amount_wei, details) "
+                        "VALUES (:block, :log_index, :tx, :name, :kind, :entity, :account, :amount_wei, :details)", event)
+                    self._apply(event)
+                self._db.executemany("INSERT OR REPLACE INTO blocks (number, hash) VALUES (?, ?)", hashes.items())
+                # The newest stored block is always kept, whatever the window
+                self._db.execute("DELETE FROM blocks WHERE number < ? AND number < (SELECT MAX(number) FROM blocks)",
+                                 (end - self.reorg_window,))
+                self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_block', ?)", (str(end),))
+            last = end
+            applied += len(events)
+        self.last_sync_seconds = time.perf_counter() - started
+        return applied
+
+    def _find_fork(self, last: int) -> int:
+        """Newest indexed block still on the node's chain (`last` when there was no reorg)"""
+        with self._lock:
+            rows = self._db.execute("SELECT number, hash FROM blocks WHERE number <= ? ORDER BY number DESC",
+                                    (last,)).fetchall()
+        if not rows:
+            return last
+        for row in rows:
+            if self.source.block_hash(row["number"]) == row["hash"]:
+                return row["number"]
+        print(f"[CHAIN] Reorg deeper than {self.reorg_window} blocks; reindexing from block {self.start_block}")
+        return self.start_block - 1
+
+    def _rollback(self, fork: int) -> None:
+        with self._lock, self._db:
+            touched = self._db.execute("SELECT DISTINCT kind, entity FROM events WHERE block > ?", (fork,)).fetchall()
+            removed = self._db.execute("DELETE FROM events WHERE block > ?", (fork,)).rowcount
+            for row in touched:
+                table = "listings" if row["kind"] == "listing" else "projects"
+                self._db.execute(f"DELETE FROM {table} WHERE id = ?", (row["entity"],))
+                for event in self._db.execute(
+                        "SELECT * FROM events WHERE kind = ? AND entity = ? ORDER BY block, log_index",
+                        (row["kind"], row["entity"])).fetchall():
+                    self._apply(event)
+            self._db.execute("DELETE FROM blocks WHERE number > ?", (fork,))
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_block', ?)", (str(fork),))
+        self.reorgs += 1
+        self.rolled_back += removed
+        print(f"[CHAIN] Reorg: rolled back {removed} events after block {fork}")
+
+    def _apply(self, event) -> None:
+        """Folds one event into listings/projects (inside the caller's transaction)"""
+        name, entity, block = event["name"], event["entity"], event["block"]
+        amount = int(event["amount_wei"]) if event["amount_wei"] is not None else 0
+        if name == "ListingCreated":
+            self._db.execute(
+                "INSERT OR REPLACE INTO listings (id, seller, total_wei, remaining_wei, remaining, purchases, status, "
+                "created_block, updated_block, tx) VALUES (?, ?, ?, ?, ?, 0, 'active', ?, ?, ?)",
+                (entity, event["account"], str(amount), str(amount), _tokens(amount), block, block, event["tx"]))
+        elif name == "ListingPurchased":
+            row = self._db.execute("SELECT remaining_wei FROM listings WHERE id = ?", (entity,)).fetchone()
+            if row is None:
+                return  # Created before CHAIN_START_BLOCK
+            remaining = max(0, int(row["remaining_wei"]) - amount)
+            self._db.execute(
+                "UPDATE listings SET remaining_wei = ?, remaining = ?, purchases = purchases + 1, "
+                "status = CASE WHEN ? THEN 'sold' ELSE status END, updated_block = ? WHERE id = ?",
+                (str(remaining), _tokens(remaining), remaining == 0, block, entity))
+        elif name == "ListingCancelled":
+            self._db.execute("UPDATE listings SET status = 'cancelled', updated_block = ? WHERE id = ?", (block, entity))
+        elif name == "ProjectCreated":
+            details = json.loads(event["details"] or "{}")
+            self._db.execute(
+                "INSERT OR REPLACE INTO projects (id, farmer, project_type, off_chain_hash, status, created_block, tx) "
+                "VALUES (?, ?, ?, ?, 'Pending', ?, ?)",
+                (entity, event["account"], details.get("project_type"), details.get("off_chain_hash"), block, event["tx"]))
+        elif name == "ProjectVerified":
+            self._db.execute(
+                "UPDATE projects SET status = 'Verified', minted_wei = ?, minted = ?, verified_block = ? WHERE id = ?",
+                (str(amount), _tokens(amount), block, entity))
+
+    # Background polling
+
+    def start(self, poll_seconds: float = CHAIN_POLL_SECONDS) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(poll_seconds,), name="chain-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self, poll_seconds: float) -> None:
+        while not self._stop.is_set():
+            try:
+                applied = self.sync_once()
+                self.polls += 1
+                if applied:
+                    print(f"[CHAIN] Indexed {applied} events up to block {self.checkpoint()}")
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"[CHAIN] Sync failed: {e}")
+            self._stop.wait(poll_seconds)
+
+    # Queries (keyset pagination: pass back `next_cursor` for the following page)
+
+    def _page(self, sql: str, args: list, order: str, limit: int, cursor_of) -> dict:
+        limit = max(1, min(int(limit), CHAIN_MAX_PAGE))
+        with self._lock:
+            rows = [dict(r) for r in self._db.execute(f"{sql} ORDER BY {order} LIMIT ?", args + [limit + 1])]
+            indexed_block = self._checkpoint()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return {"items": rows, "next_cursor": cursor_of(rows[-1]) if more else None, "indexed_block": indexed_block}
+
+    def listings(self, status: Optional[str] = None, seller: Optional[str] = None,
+                 min_remaining: Optional[float] = None, sort: str = "newest",
+                 limit: int = 50, cursor: Optional[str] = None) -> dict:
+        """Raises ValueError for an unknown status/sort or a malformed cursor"""
+        if status is not None and status not in LISTING_STATUSES:
+            raise ValueError(f"status must be one of {list(LISTING_STATUSES)}")
+        if sort not in LISTING_SORTS:
+            raise ValueError(f"sort must be one of {list(LISTING_SORTS)}")
+        where, args = [], []
+        if status is not None:
+            where.append("status = ?")
+            args.append(status)
+        if seller:
+            where.append("seller = ?")
+            args.append(seller.lower())
+        if min_remaining is not None:
+            where.append("remaining >= ?")
+            args.append(min_remaining)
+        if cursor:
+            try:
+                if sort == "remaining":
+                    remaining, last_id = cursor.split(":")
+                    where.append("(remaining < ? OR (remaining = ? AND id < ?))")
+                    args += [float(remaining), float(remaining), int(last_id)]
+                else:
+                    where.append("id < ?" if sort == "newest" else "id > ?")
+                    args.append(int(cursor))
+            except ValueError:
+                raise ValueError("Malformed cursor")
+        order = {"newest": "id DESC", "oldest": "id ASC", "remaining": "remaining DESC, id DESC"}[sort]
+        cursor_of = (lambda r: f"{r['remaining']!r}:{r['id']}") if sort == "remaining" else (lambda r: str(r["id"]))
+        sql = "SELECT * FROM listings" + (f" WHERE {' AND '.join(where)}" if where else "")
+        page = self._page(sql, args, order, limit, cursor_of)
+        for row in page["items"]:
+            row["active"] = row["status"] == "active"
+        return page
+
+    def projects(self, farmer: Optional[str] = None, status: Optional[str] = None,
+                 project_type: Optional[str] = None, limit: int = 50, cursor: Optional[str] = None) -> dict:
+        """Newest first; raises ValueError for an unknown status or a malformed cursor"""
+        if status is not None and status not in PROJECT_STATUSES:
+            raise ValueError(f"status must be one of {list(PROJECT_STATUSES)}")
+        where, args = [], []
+        for column, value in (("farmer", farmer.lower() if farmer else None), ("status", status),
+                              ("project_type", project_type)):
+            if value:
+                where.append(f"{column} = ?")
+                args.append(value)
+        if cursor:
+            try:
+                args.append(int(cursor))
+            except ValueError:
+                raise ValueError("Malformed cursor")
+            where.append("id < ?")
+        sql = "SELECT * FROM projects" + (f" WHERE {' AND '.join(where)}" if where else "")
+        return self._page(sql, args, "id DESC", limit, lambda r: str(r["id"]))
+
+    def purchases(self, buyer: Optional[str] = None, listing_id: Optional[int] = None,
+                  limit: int = 50, cursor: Optional[str] = None) -> dict:
+        """ListingPurchased events, newest first"""
+        where, args = ["name = 'ListingPurchased'"], []
+        if buyer:
+            where.append("account = ?")
+            args.append(buyer.lower())
+        if listing_id is not None:
+            where += ["kind = 'listing'", "entity = ?"]
+            args.append(listing_id)
+        if cursor:
+            try:
+                block, log_index = (int(v) for v in cursor.split(":"))
+            except ValueError:
+                raise ValueError("Malformed cursor")
+            where.append("(block < ? OR (block = ? AND log_index < ?))")
+            args += [block, block, log_index]
+        sql = ("SELECT block, log_index, tx, entity AS listing_id, account AS buyer, amount_wei FROM events"
+               f" WHERE {' AND '.join(where)}")
+        page = self._page(sql, args, "block DESC, log_index DESC", limit, lambda r: f"{r['block']}:{r['log_index']}")
+        for row in page["items"]:
+            row["amount"] = _tokens(int(row["amount_wei"]))
+        return page
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {table: self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                      for table in ("events", "listings", "projects")}
+            indexed_block = self._checkpoint()
+        return {
+            "enabled": True,
+            "indexed_block": indexed_block,
+            "head": self.head,
+            "lag_blocks": self.head - indexed_block if self.head is not None else None,
+            **counts,
+            "polls": self.polls,
+            "reorgs": self.reorgs,
+            "rolled_back_events": self.rolled_back,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_sync_ms": round(self.last_sync_seconds * 1000, 1) if self.last_sync_seconds is not None else None,
+        }
+
+
+_indexer: Optional[ChainIndexer] = None
+_indexer_lock = threading.Lock()
+
+
+def get_chain_indexer(start: bool = True) -> Optional[ChainIndexer]:
+    """Process-wide indexer polling CHAIN_RPC_URL, or None when it is not set"""
+    global _indexer
+    if not CHAIN_RPC_URL:
+        return None
+    with _indexer_lock:
+        if _indexer is None:
+            _indexer = ChainIndexer(JsonRpcChainSource(CHAIN_RPC_URL))
+        if start:
+            _indexer.start()
+        return _indexer
+
+
+def all_stats() -> dict:
+    indexer = _indexer
+    return indexer.stats() if indexer is not None else {"enabled": bool(CHAIN_RPC_URL)}
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Catch the contract event index up to the confirmed head once.")
+    parser.add_argument("--rpc", default=CHAIN_RPC_URL or None, required=not CHAIN_RPC_URL)
+    parser.add_argument("--db", default=CHAIN_INDEX_PATH)
+    args = parser.parse_args(argv)
+
+    Path(args.db).parent.mkdir(parents=True, exist_ok=True)
+    indexer = ChainIndexer(JsonRpcChainSource(args.rpc), db_path=args.db)
+    applied = indexer.sync_once()
+    print(f"Indexed {applied} new events")
+    print(json.dumps(indexer.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
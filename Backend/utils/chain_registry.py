@@ -0,0 +1,68 @@
+"""
+Compile-once registry for LangChain prompt/LLM chains.
+
+Building a ChatPromptTemplate parses every message template, and piping it
+into an LLM and parser allocates a new RunnableSequence; doing that on every
+request is pure overhead when only the variables change. Services register
+a builder per chain kind, and the registry compiles each (kind, language,
+params) combination once, normally at startup, and hands the same runnable
+to every request. Per-request variables are only bound at invoke time.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+_REGISTRIES: Dict[str, "ChainRegistry"] = {}
+_REGISTRIES_LOCK = threading.Lock()
+
+
+class ChainRegistry:
+    def __init__(self, name: str, max_chains: int = 256):
+        self.name = name
+        self.max_chains = max_chains
+        self._builders: Dict[str, Callable[..., Any]] = {}
+        self._chains: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+        with _REGISTRIES_LOCK:
+            _REGISTRIES[name] = self
+
+    def register(self, kind: str, builder: Callable[..., Any]) -> None:
+        """builder(language, **params) -> runnable; params must be hashable"""
+        self._builders[kind] = builder
+
+    def get(self, kind: str, language: Optional[str] = None, **params):
+        key = (kind, language, tuple(sorted(params.items())))
+        with self._lock:
+            chain = self._chains.get(key)
+            if chain is not None:
+                self.hits += 1
+                return chain
+            # Built under the lock so concurrent first requests compile once
+            chain = self._builders[kind](language, **params)
+            self.builds += 1
+            # Languages come from clients; don't let arbitrary values grow the registry
+            if len(self._chains) < self.max_chains:
+                self._chains[key] = chain
+            return chain
+
+    def precompile(self, kinds: Optional[Iterable[str]] = None,
+                   languages: Iterable[Optional[str]] = (None,), **params) -> int:
+        """Builds every kind x language combination up front; returns how many"""
+        count = 0
+        for kind in (kinds or list(self._builders)):
+            for language in languages:
+                self.get(kind, language, **params)
+                count += 1
+        return count
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"compiled": len(self._chains), "builds": self.builds, "hits": self.hits}
+
+
+def all_stats() -> dict:
+    with _REGISTRIES_LOCK:
+        registries = list(_REGISTRIES.values())
+    return {r.name: r.stats() for r in registries}
@@ -0,0 +1,118 @@
+"""
+Circuit breaker for calls to an unreliable dependency (Ollama).
+
+After `failure_threshold` consecutive failures the breaker opens: calls are
+rejected immediately with CircuitOpenError so callers can serve their
+fallback without waiting on timeouts. While open, a background thread runs
+`probe_fn` every `probe_interval` seconds; once it succeeds the breaker goes
+half-open and lets a single trial call through, which either closes it
+again or re-opens it.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+_BREAKERS: Dict[str, "CircuitBreaker"] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the dependency while the breaker is open"""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 3,
+                 probe_fn: Optional[Callable[[], bool]] = None, probe_interval: float = 5.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.probe_fn = probe_fn
+        self.probe_interval = probe_interval
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        with _BREAKERS_LOCK:
+            _BREAKERS[name] = self
+
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    def before_call(self) -> None:
+        """Raises CircuitOpenError unless the call may proceed"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"[BREAKER] {self.name} closed")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == OPEN:
+                return
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def release(self) -> None:
+        """A call ended without telling us anything (e.g. the client went away)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _open(self) -> None:
+        """Caller holds the lock"""
+        self.state = OPEN
+        self.opened_at = time.time()
+        self.trips += 1
+        print(f"[BREAKER] {self.name} opened after {self.consecutive_failures} consecutive failures")
+        threading.Thread(target=self._probe_loop, name=f"breaker-{self.name}", daemon=True).start()
+
+    def _probe_loop(self) -> None:
+        while True:
+            time.sleep(self.probe_interval)
+            try:
+                recovered = self.probe_fn() if self.probe_fn else True
+            except Exception:
+                recovered = False
+            with self._lock:
+                if self.state != OPEN:
+                    return
+                if recovered:
+                    # Let one real call decide whether it is actually back
+                    self.state = HALF_OPEN
+                    print(f"[BREAKER] {self.name} half-open, trying one request")
+                    return
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "opened_at": self.opened_at,
+                "trips": self.trips,
+                "rejected": self.rejected,
+            }
+
+
+def all_stats() -> dict:
+    with _BREAKERS_LOCK:
+        breakers = list(_BREAKERS.values())
+    return {b.name: b.stats() for b in breakers}
@@ -0,0 +1,242 @@
+"""
+Local asynchronous job subsystem for slow LLM generations.
+
+Jobs run on an in-process worker pool and are recorded in a durable SQLite
+table, so an HTTP request can return a job ID immediately while clients
+poll (GET /api/jobs/<id>) or subscribe over SSE for completion.
+
+- Cancellation is cooperative: queued jobs never start; running jobs stop
+  at the handler's next `handle.cancelled` check, and their result is
+  discarded either way.
+- Finished jobs keep their result for `result_ttl_seconds`, then are purged.
+- On startup, jobs left queued/running by a dead process are re-queued.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from utils.response_cache import DEFAULT_CACHE_DIR
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+TERMINAL_STATES = {SUCCEEDED, FAILED, CANCELLED}
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobHandle:
+    """Passed to job handlers so long-running work can stop early when cancelled"""
+
+    def __init__(self, manager: "JobManager", job_id: str):
+        self._manager = manager
+        self.job_id = job_id
+
+    @property
+    def cancelled(self) -> bool:
+        job = self._manager.get(self.job_id)
+        return job is None or job["status"] == CANCELLED
+
+
+class JobManager:
+    def __init__(self, db_path: Optional[str] = None, max_workers: int = 2,
+                 result_ttl_seconds: float = 3600):
+        if db_path is None:
+            DEFAULT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            db_path = str(DEFAULT_CACHE_DIR / "jobs.sqlite3")
+        self.result_ttl_seconds = result_ttl_seconds
+        self._handlers: Dict[str, Callable[[dict, JobHandle], Any]] = {}
+        self._futures: Dict[str, Any] = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                params TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                owner TEXT,
+                worker_pid INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                expires_at REAL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+        self._db.commit()
+
+        janitor = threading.Thread(target=self._janitor, name="job-janitor", daemon=True)
+        janitor.start()
+
+    def register(self, kind: str, handler: Callable[[dict, JobHandle], Any]) -> None:
+        """handler(params, handle) -> JSON-serializable result"""
+        self._handlers[kind] = handler
+
+    # --- Lifecycle ---
+
+    def submit(self, kind: str, params: dict, owner: Optional[str] = None) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, status, params, owner, worker_pid, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(params), owner, os.getpid(), now, now),
+            )
+            self._db.commit()
+            self._futures[job_id] = self._pool.submit(self._run, job_id)
+        return job_id
+
+    def _update(self, job_id: str, only_if: Optional[set] = None, **fields) -> bool:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        sql = f"UPDATE jobs SET {assignments} WHERE id = ?"
+        args = list(fields.values()) + [job_id]
+        if only_if:
+            sql += f" AND status IN ({', '.join('?' for _ in only_if)})"
+            args += list(only_if)
+        with self._lock:
+            cur = self._db.execute(sql, args)
+            self._db.commit()
+            self._changed.notify_all()
+            return cur.rowcount > 0
+
+    def _run(self, job_id: str) -> None:
+        try:
+            if not self._update(job_id, only_if={QUEUED}, status=RUNNING):
+                return  # Cancelled while queued
+            job = self.get(job_id)
+            handler = self._handlers[job["kind"]]
+            try:
+                result = handler(job["params"], JobHandle(self, job_id))
+            except Exception as e:
+                print(f"[JOBS] {job['kind']} {job_id[:8]} failed: {e}")
+                self._update(job_id, only_if={RUNNING}, status=FAILED, error=str(e),
+                             expires_at=time.time() + self.result_ttl_seconds)
+                return
+            # A cancel that raced with completion wins; the result is discarded
+            self._update(job_id, only_if={RUNNING}, status=SUCCEEDED, result=json.dumps(result),
+                         expires_at=time.time() + self.result_ttl_seconds)
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+
+    def cancel(self, job_id: str) -> bool:
+        """Returns True if the job was still queued/running and is now cancelled"""
+        cancelled = self._update(job_id, only_if={QUEUED, RUNNING}, status=CANCELLED,
+                                 expires_at=time.time() + self.result_ttl_seconds)
+        with self._lock:
+            future = self._futures.get(job_id)
+            if future is not None and future.cancel():
+                # Never started, so _run's cleanup won't happen
+                self._futures.pop(job_id, None)
+        return cancelled
+
+    def recover(self) -> int:
+        """Re-queue jobs orphaned by a dead process; call after registering handlers"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, kind, worker_pid FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+        recovered = 0
+        for row in rows:
+            if row["kind"] not in self._handlers:
+                continue
+            # A restarted container often reuses the old PID, so "alive" only
+            # counts for other processes
+            owner_pid = row["worker_pid"]
+            if owner_pid != os.getpid() and _pid_alive(owner_pid):
+                continue
+            # Conditional claim so only one worker process re-queues each job
+            with self._lock:
+                cur = self._db.execute(
+                    "UPDATE jobs SET status = ?, worker_pid = ?, updated_at = ? "
+                    "WHERE id = ? AND worker_pid IS ? AND status IN (?, ?)",
+                    (QUEUED, os.getpid(), time.time(), row["id"], row["worker_pid"], QUEUED, RUNNING),
+                )
+                self._db.commit()
+                if cur.rowcount:
+                    self._futures[row["id"]] = self._pool.submit(self._run, row["id"])
+                    recovered += 1
+        if recovered:
+            print(f"[JOBS] Recovered {recovered} interrupted job(s)")
+        return recovered
+
+    # --- Queries ---
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "params": json.loads(row["params"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "owner": row["owner"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def wait(self, job_id: str, since: float, timeout: float = 15.0) -> Optional[dict]:
+        """
+        Blocks until the job changes after `since` (its updated_at) or timeout.
+        Changes made by other worker processes are picked up by polling.
+        """
+        deadline = time.time() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["updated_at"] > since or job["status"] in TERMINAL_STATES:
+                return job
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return job
+            with self._changed:
+                self._changed.wait(min(remaining, 1.0))
+
+    def _janitor(self) -> None:
+        while True:
+            time.sleep(60)
+            try:
+                with self._lock:
+                    self._db.execute(
+                        "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+                    )
+                    self._db.commit()
+            except Exception as e:
+                print(f"[JOBS] Purge error: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+            return {"by_status": {r[0]: r[1] for r in rows}, "in_process": len(self._futures)}
+
+
+def public_view(job: dict) -> dict:
+    """Job fields safe to return to clients"""
+    return {k: job[k] for k in ("id", "kind", "status", "result", "error", "created_at", "updated_at")}
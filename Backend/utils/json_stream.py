@@ -0,0 +1,115 @@
+"""
+Incremental JSON parsing over streamed LLM output.
+
+`IncrementalJSONParser` is fed text chunks as they arrive and reports every
+object/array that has *finished* at a watched path, long before the whole
+document is complete. Paths are tuples of object keys and array indexes,
+e.g. ("options", 0); a "*" in a watch pattern matches any key or index.
+Fragments and the final document go through utils/llm_json.py, so trailing
+commas, fences and a truncated tail don't lose the whole generation.
+"""
+
+import json
+from typing import Any, Iterable, Iterator, List, Tuple
+
+from utils.llm_json import JSONExtractError, extract_json
+
+JSONPath = Tuple[Any, ...]
+
+
+class _Frame:
+    __slots__ = ("kind", "start", "path", "key", "index", "expect_key")
+
+    def __init__(self, kind: str, start: int, path: JSONPath):
+        self.kind = kind          # "{" or "["
+        self.start = start        # offset of the opening bracket in the buffer
+        self.path = path
+        self.key = None           # current key (objects)
+        self.index = 0            # current element index (arrays)
+        self.expect_key = kind == "{"
+
+
+class IncrementalJSONParser:
+    """Single-pass scanner that emits (path, value) for completed watched containers"""
+
+    def __init__(self, watch: Iterable[JSONPath]):
+        self.watch = [tuple(p) for p in watch]
+        self.buffer = ""
+        self._pos = 0
+        self._frames: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._started = False
+
+    def _matches(self, path: JSONPath) -> bool:
+        for pattern in self.watch:
+            if len(pattern) == len(path) and all(p == "*" or p == q for p, q in zip(pattern, path)):
+                return True
+        return False
+
+    def _child_path(self) -> JSONPath:
+        if not self._frames:
+            return ()
+        parent = self._frames[-1]
+        return parent.path + ((parent.key,) if parent.kind == "{" else (parent.index,))
+
+    def feed(self, chunk: str) -> Iterator[Tuple[JSONPath, Any]]:
+        """Consume a chunk; yields (path, value) for each watched container that just closed"""
+        self.buffer += chunk
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    top = self._frames[-1] if self._frames else None
+                    if top is not None and top.kind == "{" and top.expect_key:
+                        try:
+                            top.key = json.loads(buf[self._string_start:i + 1])
+                        except ValueError:
+                            top.key = buf[self._string_start + 1:i]
+            elif ch == '"' and self._started:
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                # Ignore any chatter before the first bracket
+                self._started = True
+                self._frames.append(_Frame(ch, i, self._child_path()))
+            elif not self._started:
+                pass
+            elif ch in "}]":
+                if self._frames:
+                    frame = self._frames.pop()
+                    if self._matches(frame.path):
+                        try:
+                            value = extract_json(buf[frame.start:i + 1])
+                        except JSONExtractError:
+                            value = None  # Malformed fragment; the final parse will report it
+                        if value is not None:
+                            self._pos = i + 1
+                            yield frame.path, value
+            elif ch == "," and self._frames:
+                top = self._frames[-1]
+                if top.kind == "[":
+                    top.index += 1
+                else:
+                    top.expect_key = True
+            elif ch == ":" and self._frames:
+                self._frames[-1].expect_key = False
+            i += 1
+        self._pos = i
+
+    @property
+    def complete(self) -> bool:
+        """True once the top-level value has been closed"""
+        return self._started and not self._frames and not self._in_string
+
+    def result(self) -> Any:
+        """Parse (and repair) the full document accumulated so far"""
+        return extract_json(self.buffer)
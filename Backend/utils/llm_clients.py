@@ -0,0 +1,239 @@
+"""
+Process-wide registry of Ollama chat clients.
+
+A ChatOllama holds only configuration plus an HTTP client, so sessions and
+engines asking for the same model and generation parameters borrow one
+shared instance instead of each building their own. Every client gets a
+bounded keep-alive connection pool, so concurrent requests reuse open
+connections to Ollama instead of reconnecting per call.
+
+All clients default to the same `num_ctx` and `keep_alive`: Ollama reloads a
+model whenever a request asks for a different context size, which would also
+throw away its cached prompt prefixes.
+
+`get_routed_chat_model` returns a drop-in chat model that sends each call to
+a backend chosen by utils/ollama_router.py (least loaded, session affinity,
+failover), using the shared per-backend clients above.
+
+Every call is bounded by a connect timeout, a first-token timeout (the HTTP
+read timeout, i.e. the longest silence allowed before/between chunks) and a
+total timeout. Calls go through the `ollama_breaker` circuit breaker, so once
+Ollama is down they fail instantly with CircuitOpenError and callers serve
+their fallback.
+
+Each routed call is also written to the usage ledger (utils/usage_ledger.py).
+
+With LLM_RECORD_MODE set, every shared client records its calls to fixtures
+or replays them (utils/llm_replay.py).
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from utils import llm_replay
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.ollama_router import get_router, is_backend_error, is_timeout
+from utils.usage_ledger import current_tags, record_call
+
+DEFAULT_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+DEFAULT_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+DEFAULT_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", 4096))
+# How long Ollama keeps the model (and with it the KV cache) loaded after a request
+DEFAULT_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Per-client HTTP pool; Ollama serves OLLAMA_NUM_PARALLEL requests at a time
+# per model, so a handful of connections per client is plenty
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", 16))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", 8))
+LLM_POOL_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", 120))
+
+# Seconds. First-token covers prompt evaluation (and a cold model load) on CPU
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 3))
+LLM_FIRST_TOKEN_TIMEOUT = float(os.getenv("LLM_FIRST_TOKEN_TIMEOUT", 120))
+LLM_TOTAL_TIMEOUT = float(os.getenv("LLM_TOTAL_TIMEOUT", 600))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 3))
+LLM_BREAKER_PROBE_INTERVAL = float(os.getenv("LLM_BREAKER_PROBE_INTERVAL", 5))
+
+_clients: Dict[Tuple[str, str, str], Any] = {}
+_routed: Dict[Tuple[str, Optional[str], str], "RoutedChatModel"] = {}
+_lock = threading.Lock()
+_borrows = 0
+
+
+class LLMTimeoutError(TimeoutError):
+    """A generation ran past LLM_TOTAL_TIMEOUT"""
+
+
+def client_kwargs() -> dict:
+    """httpx settings for every Ollama client (chat and embeddings)"""
+    import httpx
+    return {
+        "limits": httpx.Limits(
+            max_connections=LLM_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_POOL_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(
+            connect=LLM_CONNECT_TIMEOUT,
+            read=LLM_FIRST_TOKEN_TIMEOUT,
+            write=LLM_CONNECT_TIMEOUT,
+            pool=LLM_CONNECT_TIMEOUT,
+        ),
+    }
+
+
+def get_chat_model(model: str = None, base_url: str = None, **params):
+    """
+    Shared ChatOllama for (base_url, model, params). Callers must treat the
+    returned client as read-only; pass per-call overrides to invoke/stream.
+    """
+    global _borrows
+    model = model or DEFAULT_MODEL
+    base_url = base_url or DEFAULT_BASE_URL
+    params.setdefault("num_ctx", DEFAULT_NUM_CTX)
+    params.setdefault("keep_alive", DEFAULT_KEEP_ALIVE)
+    key = (base_url, model, json.dumps(params, sort_keys=True, default=str))
+
+    with _lock:
+        _borrows += 1
+        client = _clients.get(key)
+        if client is None:
+            def build():
+                from langchain_ollama import ChatOllama
+                return ChatOllama(
+                    model=model,
+                    base_url=base_url,
+                    client_kwargs=client_kwargs(),
+                    **params,
+                )
+            if llm_replay.enabled():
+                # The real client is only built if a call actually has to go to Ollama
+                client = llm_replay.RecordingChatModel(build, model, params)
+            else:
+                client = build()
+            _clients[key] = client
+            print(f"[LLM] New shared client: {model} @ {base_url} {key[2]}")
+        return client
+
+
+# Pass as config={"metadata": {AFFINITY_KEY: session_id}} to pin a session to a backend
+AFFINITY_KEY = "ollama_affinity"
+
+
+def _pool_recovered() -> bool:
+    router = get_router()
+    router.probe_all()
+    return any(b.healthy for b in router.backends)
+
+
+# Shared by every routed call: when the whole pool is failing, fail fast
+ollama_breaker = CircuitBreaker(
+    "ollama", failure_threshold=LLM_BREAKER_FAILURES,
+    probe_fn=_pool_recovered, probe_interval=LLM_BREAKER_PROBE_INTERVAL,
+)
+
+
+class RoutedChatModel(Runnable):
+    """
+    Chat model whose every call goes to a backend picked by the router.
+    Works anywhere a ChatOllama does in a chain (invoke/stream/batch).
+    With `base_url` every call goes to that backend instead, still under the
+    breaker, the total timeout and the usage ledger.
+    """
+
+    def __init__(self, model: str, params: dict, base_url: Optional[str] = None):
+        self.model = model
+        self.params = params
+        self.base_url = base_url
+        self.router = get_router()
+
+    def client_for(self, base_url: str):
+        return get_chat_model(model=self.model, base_url=base_url, **self.params)
+
+    @staticmethod
+    def _affinity(config: Optional[RunnableConfig]) -> Optional[str]:
+        return ((config or {}).get("metadata") or {}).get(AFFINITY_KEY)
+
+    def invoke(self, input, config: Optional[RunnableConfig] = None, **kwargs) -> AIMessage:
+        # Streamed underneath so the total timeout can be enforced between chunks
+        content, metadata = [], {}
+        for chunk in self.stream(input, config, **kwargs):
+            content.append(chunk.content)
+            metadata = chunk.response_metadata or metadata
+        return AIMessage(content="".join(content), response_metadata=metadata)
+
+    def stream(self, input, config: Optional[RunnableConfig] = None, **kwargs) -> Iterator:
+        started = time.monotonic()
+        tags = current_tags()
+        try:
+            ollama_breaker.before_call()
+        except CircuitOpenError:
+            record_call(self.model, None, 0.0, "fallback", tags)
+            raise
+        deadline = started + LLM_TOTAL_TIMEOUT
+        if self.base_url:
+            chunks = (chunk for chunk in self.client_for(self.base_url).stream(input, config, **kwargs))
+        else:
+            chunks = self.router.stream(
+                lambda url: self.client_for(url).stream(input, config, **kwargs), self._affinity(config)
+            )
+        outcome, usage_outcome, metadata = None, "cancelled", None
+        try:
+            for chunk in chunks:
+                # Ollama's token counts and durations arrive on the final chunk
+                metadata = chunk.response_metadata or metadata
+                yield chunk
+                if time.monotonic() > deadline:
+                    raise LLMTimeoutError(f"LLM call exceeded {LLM_TOTAL_TIMEOUT:.0f}s")
+            outcome = usage_outcome = "success"
+        except Exception as e:
+            # Only an unreachable or unresponsive Ollama counts against the breaker;
+            # any other error still means it answered
+            outcome = "failure" if is_backend_error(e) else "success"
+            # Callers answer failed calls with their fallback
+            usage_outcome = "timeout" if is_timeout(e) else "fallback"
+            raise
+        finally:
+            chunks.close()
+            if outcome == "success":
+                ollama_breaker.record_success()
+            elif outcome == "failure":
+                ollama_breaker.record_failure()
+            else:
+                ollama_breaker.release()  # Consumer stopped early
+            record_call(self.model, metadata, (time.monotonic() - started) * 1000, usage_outcome, tags)
+
+
+def get_routed_chat_model(model: str = None, base_url: Optional[str] = None, **params) -> RoutedChatModel:
+    """Shared routed chat model for (model, params) over OLLAMA_BASE_URLS, or pinned to `base_url`"""
+    global _borrows
+    model = model or DEFAULT_MODEL
+    params.setdefault("num_ctx", DEFAULT_NUM_CTX)
+    params.setdefault("keep_alive", DEFAULT_KEEP_ALIVE)
+    key = (model, base_url, json.dumps(params, sort_keys=True, default=str))
+    with _lock:
+        _borrows += 1
+        routed = _routed.get(key)
+        if routed is None:
+            routed = RoutedChatModel(model, params, base_url)
+            _routed[key] = routed
+        return routed
+
+
+def all_stats() -> dict:
+    with _lock:
+        return {
+            "clients": len(_clients),
+            "routed_models": len(_routed),
+            "borrows": _borrows,
+            "configs": [
+                {"base_url": base_url, "model": model, "params": json.loads(params)}
+                for base_url, model, params in _clients
+            ],
+        }
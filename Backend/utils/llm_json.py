@@ -0,0 +1,317 @@
+"""
+Tolerant JSON extraction from LLM output.
+
+Models wrap JSON in code fences or chatter, leave trailing commas, put raw
+newlines inside strings and get cut off by num_predict. `JSONExtractor`
+repairs all of these in a single linear pass (no regex backtracking) and can
+be fed streamed chunks as they arrive:
+
+- text before the first bracket and after the top-level value is ignored
+- trailing commas are dropped, raw control characters in strings escaped
+- a truncated tail is closed off, dropping the last incomplete element if
+  closing it as-is doesn't parse. Given a JSON schema, trailing array
+  elements still missing required keys are dropped too.
+
+`LLMJSONParser` wraps it with per-call-site counters (clean parses,
+repairs, failures, retries, fallbacks) that feed /api/metrics. Given a
+schema, it also rejects values missing required keys, so the caller
+regenerates instead of using them. `json_format` gives the Ollama `format` for a call: the JSON schema itself
+(constrained decoding) unless LLM_STRUCTURED_OUTPUT=0, in which case plain
+"json" mode.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "1") != "0"
+
+# Truncation repair re-parses the text once per attempt; a cap keeps it linear
+MAX_REPAIR_ATTEMPTS = 4
+
+_CLOSERS = {"{": "}", "[": "]"}
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+_REGISTRY: Dict[str, "LLMJSONParser"] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+class JSONExtractError(ValueError):
+    """No usable JSON value could be recovered from the text"""
+
+
+def json_format(schema: dict):
+    """Ollama `format` for a call expecting `schema`"""
+    return schema if LLM_STRUCTURED_OUTPUT else "json"
+
+
+def is_complete(value: Any, schema: Optional[dict]) -> bool:
+    """
+    True if `value` has the JSON type `schema` declares and every required
+    key and minimum item count, at every level. Only the subset of JSON
+    schema used for Ollama `format` is understood.
+    """
+    if not schema:
+        return True
+    kind = schema.get("type")
+    if kind == "object":
+        if not isinstance(value, dict) or any(k not in value for k in schema.get("required", ())):
+            return False
+        properties = schema.get("properties", {})
+        return all(is_complete(v, properties.get(k)) for k, v in value.items())
+    if kind == "array":
+        if not isinstance(value, list) or len(value) < schema.get("minItems", 0):
+            return False
+        return all(is_complete(v, schema.get("items")) for v in value)
+    if kind == "string":
+        return isinstance(value, str)
+    return True
+
+
+def _drop_incomplete(value: Any, schema: Optional[dict]) -> None:
+    """Drops trailing array elements `schema` rejects; truncation only damages the tail"""
+    if not schema:
+        return
+    if isinstance(value, dict):
+        properties = schema.get("properties", {})
+        for k, v in value.items():
+            _drop_incomplete(v, properties.get(k))
+    elif isinstance(value, list):
+        items = schema.get("items")
+        for v in value:
+            _drop_incomplete(v, items)
+        while value and not is_complete(value[-1], items):
+            value.pop()
+
+
+class _Frame:
+    __slots__ = ("kind", "open_len", "safe_len")
+
+    def __init__(self, kind: str, open_len: int):
+        self.kind = kind
+        self.open_len = open_len    # Output length right after the opening bracket
+        self.safe_len = open_len    # Output length after the last complete element
+
+
+class JSONExtractor:
+    """Single-pass repairing scanner; feed() chunks, then finish() for the value"""
+
+    def __init__(self, expect: Optional[str] = None, schema: Optional[dict] = None):
+        # "{" or "[" to skip chatter that happens to contain the other bracket
+        self.expect = expect
+        # Lets truncation repair drop a half-written last element that still parses
+        self.schema = schema
+        self.repaired = False
+        self._out: List[str] = []
+        self._len = 0  # Characters in _out; an escaped control character is two
+        self._frames: List[_Frame] = []
+        self._started = False
+        self._done = False
+        self._in_string = False
+        self._escape = False
+        self._pending_comma = False
+
+    @property
+    def done(self) -> bool:
+        """True once the top-level value has been closed; later text is ignored"""
+        return self._done
+
+    def feed(self, chunk: str) -> None:
+        out = self._out
+        for ch in chunk:
+            if self._done:
+                return
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                elif ch in _CONTROL_ESCAPES:
+                    out.append(_CONTROL_ESCAPES[ch])
+                    self._len += 2
+                    self.repaired = True
+                    continue
+                out.append(ch)
+                self._len += 1
+                continue
+
+            if not self._started:
+                if ch in _CLOSERS and (self.expect is None or ch == self.expect):
+                    self._started = True
+                    self._open(ch)
+                continue
+
+            if ch.isspace():
+                continue
+            if ch == ",":
+                if self._pending_comma:
+                    self.repaired = True
+                self._pending_comma = True
+                continue
+            if ch in "}]":
+                if self._pending_comma:
+                    self._pending_comma = False  # Trailing comma
+                    self.repaired = True
+                self._close()
+                continue
+
+            if self._pending_comma:
+                self._pending_comma = False
+                if self._frames:
+                    self._frames[-1].safe_len = self._len
+                out.append(",")
+                self._len += 1
+            if ch in _CLOSERS:
+                self._open(ch)
+            else:
+                if ch == '"':
+                    self._in_string = True
+                out.append(ch)
+                self._len += 1
+
+    def _open(self, ch: str) -> None:
+        self._out.append(ch)
+        self._len += 1
+        self._frames.append(_Frame(ch, self._len))
+
+    def _close(self) -> None:
+        if not self._frames:
+            return
+        frame = self._frames.pop()
+        self._out.append(_CLOSERS[frame.kind])
+        self._len += 1
+        if not self._frames:
+            self._done = True
+
+    def finish(self) -> Any:
+        """The parsed value; raises JSONExtractError if nothing usable was found"""
+        if not self._started:
+            raise JSONExtractError("No JSON object or array in the output")
+        text = "".join(self._out)
+        if self._done:
+            try:
+                return json.loads(text)
+            except (ValueError, RecursionError) as e:
+                raise JSONExtractError(f"Unparseable JSON: {e}") from e
+
+        # Truncated: first try closing everything where it stopped
+        self.repaired = True
+        tail = text
+        if self._in_string:
+            tail = (tail[:-1] if self._escape else tail) + '"'
+        try:
+            return self._prune(json.loads(tail + self._closers(len(self._frames))))
+        except (ValueError, RecursionError):
+            pass
+        # Then drop the incomplete element, innermost container first. A
+        # container with no complete element goes with it.
+        attempts = 1
+        for depth in range(len(self._frames) - 1, -1, -1):
+            frame = self._frames[depth]
+            if frame.safe_len == frame.open_len and depth > 0:
+                continue
+            if attempts >= MAX_REPAIR_ATTEMPTS:
+                break
+            attempts += 1
+            try:
+                return self._prune(json.loads(text[:frame.safe_len] + self._closers(depth + 1)))
+            except (ValueError, RecursionError):
+                continue
+        raise JSONExtractError("Truncated JSON could not be repaired")
+
+    def _prune(self, value: Any) -> Any:
+        _drop_incomplete(value, self.schema)
+        return value
+
+    def _closers(self, depth: int) -> str:
+        return "".join(_CLOSERS[f.kind] for f in reversed(self._frames[:depth]))
+
+
+def extract_json(text: str, expect: Optional[str] = None, schema: Optional[dict] = None) -> Any:
+    """Parse the first JSON value in LLM output, repairing what it can"""
+    extractor = JSONExtractor(expect, schema)
+    extractor.feed(text)
+    return extractor.finish()
+
+
+class LLMJSONParser:
+    """
+    Output parser for one call site: LLM message (or text) -> JSON value.
+    Usable as the last step of a chain, `prompt | llm | parser.parse`.
+    """
+
+    def __init__(self, name: str, expect: Optional[str] = None, schema: Optional[dict] = None):
+        self.name = name
+        self.expect = expect
+        self.schema = schema
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.clean = 0
+        self.repaired = 0
+        self.failed = 0
+        self.retries = 0
+        self.fallbacks = 0
+        with _REGISTRY_LOCK:
+            _REGISTRY[name] = self
+
+    def parse(self, message) -> Any:
+        text = getattr(message, "content", message)
+        extractor = JSONExtractor(self.expect, self.schema)
+        try:
+            extractor.feed(text)
+            value = extractor.finish()
+        except JSONExtractError:
+            with self._lock:
+                self.failed += 1
+            raise
+        if self.expect is not None and not isinstance(value, dict if self.expect == "{" else list):
+            with self._lock:
+                self.failed += 1
+            raise JSONExtractError(f"Expected a JSON {'object' if self.expect == '{' else 'array'}")
+        if not is_complete(value, self.schema):
+            with self._lock:
+                self.failed += 1
+            raise JSONExtractError("JSON is missing required keys or items")
+        self._local.repaired = extractor.repaired
+        with self._lock:
+            if extractor.repaired:
+                self.repaired += 1
+            else:
+                self.clean += 1
+        return value
+
+    @property
+    def last_repaired(self) -> bool:
+        """Whether this thread's last successful parse() needed repairs"""
+        return getattr(self._local, "repaired", False)
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def record_fallback(self) -> None:
+        with self._lock:
+            self.fallbacks += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            parses = self.clean + self.repaired + self.failed
+            return {
+                "parses": parses,
+                "clean": self.clean,
+                "repaired": self.repaired,
+                "failed": self.failed,
+                "retries": self.retries,
+                "fallbacks": self.fallbacks,
+                "failure_rate": round(self.failed / parses, 3) if parses else None,
+                "structured_output": LLM_STRUCTURED_OUTPUT,
+            }
+
+
+def all_stats() -> dict:
+    with _REGISTRY_LOCK:
+        parsers = list(_REGISTRY.values())
+    return {p.name: p.stats() for p in parsers}
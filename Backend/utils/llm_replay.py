@@ -0,0 +1,203 @@
+"""
+Record/replay of LLM calls, for reproducible performance and regression runs.
+
+With LLM_RECORD_MODE=record every chat call made through utils/llm_clients.py
+is passed through to Ollama and saved as a fixture: the prompt messages,
+model, generation parameters, every streamed chunk with the delay before it
+(the first delay is the time to first token) and Ollama's final metadata.
+Embedding calls from the semantic cache are saved the same way.
+
+With LLM_RECORD_MODE=replay no model is contacted at all: each call is
+answered from its fixture, chunk by chunk, sleeping the recorded delays
+divided by LLM_REPLAY_SPEED (1 = original timing, 10 = ten times faster,
+0 = no delays). Since the model side is then fixed, any latency change in a
+replayed run comes from our own code. A call with no fixture raises
+FixtureMissingError. LLM_RECORD_MODE=auto replays what it has and records
+the rest.
+
+Fixtures are keyed by model, parameters, call options and messages (not by
+backend URL) and live in LLM_FIXTURE_DIR, one JSON file per call.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.runnables import Runnable, RunnableConfig
+
+LLM_RECORD_MODE = os.getenv("LLM_RECORD_MODE", "off").lower()
+LLM_REPLAY_SPEED = float(os.getenv("LLM_REPLAY_SPEED", 1))
+LLM_FIXTURE_DIR = Path(os.getenv(
+    "LLM_FIXTURE_DIR", str(Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures" / "llm")
+))
+
+RECORD_MODES = ("off", "record", "replay", "auto")
+if LLM_RECORD_MODE not in RECORD_MODES:
+    raise ValueError(f"LLM_RECORD_MODE must be one of {RECORD_MODES}, got '{LLM_RECORD_MODE}'")
+
+_stats = {"recorded": 0, "replayed": 0, "missing": 0}
+_stats_lock = threading.Lock()
+
+
+class FixtureMissingError(LookupError):
+    """Replay mode and no fixture was recorded for this call"""
+
+
+def enabled() -> bool:
+    return LLM_RECORD_MODE != "off"
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _serialize_messages(input) -> List[dict]:
+    if isinstance(input, str):
+        return [{"role": "human", "content": input}]
+    if hasattr(input, "to_messages"):
+        input = input.to_messages()
+    return [{"role": m.type, "content": m.content} for m in input]
+
+
+def fixture_key(kind: str, **parts: Any) -> str:
+    payload = json.dumps({"kind": kind, **parts}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _path(kind: str, key: str) -> Path:
+    return LLM_FIXTURE_DIR / kind / f"{key}.json"
+
+
+def _load(kind: str, key: str) -> Optional[dict]:
+    path = _path(kind, key)
+    if not path.exists():
+        return None
+    with path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save(kind: str, key: str, fixture: dict) -> None:
+    path = _path(kind, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Written aside then renamed, so a concurrent replay never reads half a file
+    tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(fixture, f, ensure_ascii=False, indent=1, default=str)
+    os.replace(tmp, path)
+    _count("recorded")
+
+
+def _wait(delay_ms: float) -> None:
+    if LLM_REPLAY_SPEED > 0 and delay_ms > 0:
+        time.sleep(delay_ms / 1000 / LLM_REPLAY_SPEED)
+
+
+class RecordingChatModel(Runnable):
+    """
+    Stands in for a ChatOllama: records its calls or replays them.
+    `client_factory` builds the real client and is never called in replay mode.
+    """
+
+    def __init__(self, client_factory: Callable[[], Any], model: str, params: dict):
+        self.model = model
+        self.params = params
+        self._client_factory = client_factory
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def _real_client(self):
+        with self._client_lock:
+            if self._client is None:
+                self._client = self._client_factory()
+            return self._client
+
+    def invoke(self, input, config: Optional[RunnableConfig] = None, **kwargs) -> AIMessage:
+        content, metadata = [], {}
+        for chunk in self.stream(input, config, **kwargs):
+            content.append(chunk.content)
+            metadata = chunk.response_metadata or metadata
+        return AIMessage(content="".join(content), response_metadata=metadata)
+
+    def stream(self, input, config: Optional[RunnableConfig] = None, **kwargs) -> Iterator:
+        messages = _serialize_messages(input)
+        key = fixture_key("chat", model=self.model, params=self.params, kwargs=kwargs, messages=messages)
+        fixture = _load("chat", key) if LLM_RECORD_MODE in ("replay", "auto") else None
+        if fixture is not None:
+            _count("replayed")
+            yield from self._replay(fixture)
+            return
+        if LLM_RECORD_MODE == "replay":
+            _count("missing")
+            raise FixtureMissingError(f"No recorded LLM call {key} in {LLM_FIXTURE_DIR}")
+        yield from self._record(key, messages, input, config, kwargs)
+
+    @staticmethod
+    def _replay(fixture: dict) -> Iterator[AIMessageChunk]:
+        for chunk in fixture["chunks"]:
+            _wait(chunk["delay_ms"])
+            yield AIMessageChunk(content=chunk["content"], response_metadata=chunk.get("response_metadata") or {})
+
+    def _record(self, key: str, messages: List[dict], input, config, kwargs) -> Iterator:
+        chunks = []
+        started = last = time.perf_counter()
+        for chunk in self._real_client().stream(input, config, **kwargs):
+            now = time.perf_counter()
+            entry = {"content": chunk.content, "delay_ms": round((now - last) * 1000, 2)}
+            if chunk.response_metadata:
+                entry["response_metadata"] = chunk.response_metadata
+            chunks.append(entry)
+            last = now
+            yield chunk
+        # Only complete generations are saved; an abandoned stream leaves no fixture
+        _save("chat", key, {
+            "model": self.model,
+            "params": self.params,
+            "kwargs": kwargs,
+            "messages": messages,
+            "chunks": chunks,
+            "total_ms": round((last - started) * 1000, 2),
+            "recorded_at": time.time(),
+        })
+
+
+def recording_embedder(embed: Callable[[str], Sequence[float]], model: str) -> Callable[[str], Sequence[float]]:
+    """Wraps an embed function the same way; replay mode never calls `embed`"""
+
+    def embed_query(text: str) -> Sequence[float]:
+        key = fixture_key("embed", model=model, text=text)
+        fixture = _load("embed", key) if LLM_RECORD_MODE in ("replay", "auto") else None
+        if fixture is not None:
+            _count("replayed")
+            _wait(fixture["delay_ms"])
+            return fixture["vector"]
+        if LLM_RECORD_MODE == "replay":
+            _count("missing")
+            raise FixtureMissingError(f"No recorded embedding {key} in {LLM_FIXTURE_DIR}")
+        started = time.perf_counter()
+        vector = [float(v) for v in embed(text)]
+        _save("embed", key, {
+            "model": model,
+            "text": text,
+            "vector": vector,
+            "delay_ms": round((time.perf_counter() - started) * 1000, 2),
+            "recorded_at": time.time(),
+        })
+        return vector
+
+    return embed_query
+
+
+def all_stats() -> dict:
+    with _stats_lock:
+        return {
+            "mode": LLM_RECORD_MODE,
+            "speed": LLM_REPLAY_SPEED,
+            "fixture_dir": str(LLM_FIXTURE_DIR),
+            **_stats,
+        }
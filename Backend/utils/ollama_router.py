@@ -0,0 +1,238 @@
+"""
+Request routing across a pool of Ollama backends.
+
+Backends come from OLLAMA_BASE_URLS (comma-separated; falls back to
+OLLAMA_BASE_URL). A background thread probes each one's /api/version for
+health and latency. Each request goes to the healthy backend with the
+fewest in-flight requests (ties broken by latency). Requests carrying an
+affinity key (an advisor session) stick to the backend that served them
+before, so Ollama's cached prompt prefix for that session is reused. If a
+backend's load runs too far ahead of the least-loaded one, or it goes
+down, the session moves elsewhere.
+
+A request that fails with a connection-level error before producing any
+output is retried on another backend, and the failed backend is taken out
+of rotation until a probe succeeds again.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterator, List, Optional, Set
+
+OLLAMA_BASE_URLS = [
+    u.strip().rstrip("/")
+    for u in os.getenv("OLLAMA_BASE_URLS", os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")).split(",")
+    if u.strip()
+]
+OLLAMA_PROBE_INTERVAL = float(os.getenv("OLLAMA_PROBE_INTERVAL", 10))
+OLLAMA_PROBE_TIMEOUT = float(os.getenv("OLLAMA_PROBE_TIMEOUT", 2))
+# A session leaves its backend once that backend has this many more in-flight
+# requests than the least-loaded one
+OLLAMA_AFFINITY_SLACK = int(os.getenv("OLLAMA_AFFINITY_SLACK", 4))
+MAX_AFFINITY_KEYS = 4096
+
+
+def is_backend_error(exc: BaseException) -> bool:
+    """Connection-level failures that say nothing about the request itself"""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return isinstance(exc, httpx.TransportError)
+
+
+def is_timeout(exc: BaseException) -> bool:
+    if isinstance(exc, TimeoutError):
+        return True
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return isinstance(exc, httpx.TimeoutException)
+
+
+class Backend:
+    def __init__(self, url: str):
+        self.url = url
+        self.healthy = True          # Optimistic until the first probe says otherwise
+        self.outstanding = 0
+        self.latency_ms: Optional[float] = None
+        self.requests = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_probe: Optional[float] = None
+
+    def view(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "latency_ms": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            "requests": self.requests,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class OllamaRouter:
+    def __init__(self, urls: List[str], probe_interval: float = OLLAMA_PROBE_INTERVAL,
+                 affinity_slack: int = OLLAMA_AFFINITY_SLACK):
+        if not urls:
+            raise ValueError("OllamaRouter needs at least one backend URL")
+        self.backends = [Backend(url) for url in urls]
+        self.probe_interval = probe_interval
+        self.affinity_slack = affinity_slack
+        self._affinity: "OrderedDict[str, Backend]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.backend_errors = 0
+        self._prober: Optional[threading.Thread] = None
+
+    # --- Health probes ---
+
+    def start(self) -> None:
+        """Starts the probe thread (idempotent)"""
+        with self._lock:
+            if self._prober is not None:
+                return
+            self._prober = threading.Thread(target=self._probe_loop, name="ollama-probe", daemon=True)
+            self._prober.start()
+
+    def _probe_loop(self) -> None:
+        while True:
+            self.probe_all()
+            time.sleep(self.probe_interval)
+
+    def probe_all(self) -> None:
+        import httpx
+        for backend in self.backends:
+            started = time.perf_counter()
+            try:
+                httpx.get(f"{backend.url}/api/version", timeout=OLLAMA_PROBE_TIMEOUT).raise_for_status()
+            except Exception as e:
+                if backend.healthy:
+                    print(f"[OLLAMA] Backend {backend.url} unhealthy: {e}")
+                with self._lock:
+                    backend.healthy = False
+                    backend.last_error = str(e)
+                    backend.last_probe = time.time()
+                continue
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                if not backend.healthy:
+                    print(f"[OLLAMA] Backend {backend.url} healthy again")
+                backend.healthy = True
+                # EWMA so one slow probe doesn't reorder the pool
+                backend.latency_ms = (
+                    elapsed_ms if backend.latency_ms is None else 0.7 * backend.latency_ms + 0.3 * elapsed_ms
+                )
+                backend.last_probe = time.time()
+
+    # --- Selection ---
+
+    def _pick(self, affinity: Optional[str], exclude: Set[str]) -> Backend:
+        """Caller holds the lock"""
+        candidates = [b for b in self.backends if b.url not in exclude]
+        if not candidates:
+            raise ConnectionError("All Ollama backends failed for this request")
+        # If nothing looks healthy, still try: probes may simply be stale
+        candidates = [b for b in candidates if b.healthy] or candidates
+        least = min(candidates, key=lambda b: (b.outstanding, b.latency_ms or 0.0))
+
+        if affinity is not None:
+            sticky = self._affinity.get(affinity)
+            if sticky in candidates and sticky.outstanding <= least.outstanding + self.affinity_slack:
+                self._affinity.move_to_end(affinity)
+                return sticky
+            self._affinity[affinity] = least
+            self._affinity.move_to_end(affinity)
+            while len(self._affinity) > MAX_AFFINITY_KEYS:
+                self._affinity.popitem(last=False)
+        return least
+
+    def _acquire(self, affinity: Optional[str], exclude: Set[str]) -> Backend:
+        with self._lock:
+            backend = self._pick(affinity, exclude)
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def _release(self, backend: Backend, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            backend.outstanding -= 1
+            if error is not None:
+                backend.failures += 1
+                backend.healthy = False
+                backend.last_error = str(error)
+                self.backend_errors += 1
+        if error is not None:
+            print(f"[OLLAMA] Backend {backend.url} failed: {error}")
+
+    # --- Calls ---
+
+    def call(self, fn: Callable[[str], object], affinity: Optional[str] = None):
+        """fn(base_url) on the chosen backend, retried elsewhere on connection errors"""
+        self.start()
+        tried: Set[str] = set()
+        while True:
+            backend = self._acquire(affinity, tried)
+            try:
+                result = fn(backend.url)
+            except Exception as e:
+                backend_down = is_backend_error(e)
+                self._release(backend, e if backend_down else None)
+                tried.add(backend.url)
+                if not backend_down or len(tried) >= len(self.backends):
+                    raise
+                continue
+            self._release(backend)
+            return result
+
+    def stream(self, fn: Callable[[str], Iterator], affinity: Optional[str] = None) -> Iterator:
+        """
+        Like call() for streaming: fails over only while nothing has been
+        yielded yet, since a half-sent answer can't be resumed elsewhere.
+        """
+        self.start()
+        tried: Set[str] = set()
+        while True:
+            backend = self._acquire(affinity, tried)
+            started = False
+            error = None
+            try:
+                for item in fn(backend.url):
+                    started = True
+                    yield item
+                return
+            except Exception as e:
+                if is_backend_error(e):
+                    error = e
+                tried.add(backend.url)
+                if started or error is None or len(tried) >= len(self.backends):
+                    raise
+            finally:
+                self._release(backend, error)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backends": [b.view() for b in self.backends],
+                "sessions_pinned": len(self._affinity),
+                "backend_errors": self.backend_errors,
+            }
+
+
+_router: Optional[OllamaRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> OllamaRouter:
+    """Process-wide router over OLLAMA_BASE_URLS"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = OllamaRouter(OLLAMA_BASE_URLS)
+        return _router
@@ -0,0 +1,77 @@
+"""
+Per-turn prompt-evaluation accounting for Ollama chat sessions.
+
+Ollama reuses the KV cache for the longest prompt prefix it has already
+evaluated in a slot, and its `prompt_eval_count` only counts the tokens it
+actually had to evaluate. Comparing that with the (estimated) full prompt
+size shows how much of each prompt was served from the cache.
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+_REGISTRY: Dict[str, "PromptStats"] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def turn_usage(metadata: Optional[dict], prompt_tokens_est: int) -> dict:
+    """Usage of one generation from Ollama's final response metadata"""
+    metadata = metadata or {}
+    evaluated = metadata.get("prompt_eval_count")
+    usage = {
+        "prompt_tokens_est": prompt_tokens_est,
+        "prompt_eval_count": evaluated,
+        "prompt_eval_ms": round(metadata.get("prompt_eval_duration", 0) / 1e6, 1),
+        "eval_count": metadata.get("eval_count"),
+        "eval_ms": round(metadata.get("eval_duration", 0) / 1e6, 1),
+    }
+    if evaluated is not None and prompt_tokens_est:
+        # Estimate is heuristic, so clamp instead of reporting negative reuse
+        usage["reused_ratio_est"] = round(max(0.0, 1 - evaluated / prompt_tokens_est), 3)
+    return usage
+
+
+class PromptStats:
+    def __init__(self, name: str, recent: int = 50):
+        self.name = name
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=recent)
+        self.turns = 0
+        self.prompt_tokens_est = 0
+        self.prompt_eval_count = 0
+        self.prompt_eval_ms = 0.0
+        with _REGISTRY_LOCK:
+            _REGISTRY[name] = self
+
+    def record(self, metadata: Optional[dict], prompt_tokens_est: int) -> dict:
+        usage = turn_usage(metadata, prompt_tokens_est)
+        if usage["prompt_eval_count"] is None:
+            return usage  # Cached answer or backend that doesn't report counts
+        with self._lock:
+            self.turns += 1
+            self.prompt_tokens_est += prompt_tokens_est
+            self.prompt_eval_count += usage["prompt_eval_count"]
+            self.prompt_eval_ms += usage["prompt_eval_ms"]
+            self._recent.append(usage)
+        return usage
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "prompt_tokens_est": self.prompt_tokens_est,
+                "prompt_eval_count": self.prompt_eval_count,
+                "prompt_eval_ms": round(self.prompt_eval_ms, 1),
+                "reused_ratio_est": (
+                    round(max(0.0, 1 - self.prompt_eval_count / self.prompt_tokens_est), 3)
+                    if self.prompt_tokens_est else 0.0
+                ),
+                "recent": list(self._recent)[-10:],
+            }
+
+
+def all_stats() -> dict:
+    with _REGISTRY_LOCK:
+        registry = list(_REGISTRY.values())
+    return {s.name: s.stats() for s in registry}
@@ -0,0 +1,223 @@
+"""
+Per-user token buckets for the API's route groups.
+
+Each (route group, Firebase UID) pair has a bucket holding up to `capacity`
+tokens, refilled continuously at capacity/window tokens per second. A
+request takes one token, or is refused with the time until one is back.
+So a user can burst `capacity` requests and then sustains `capacity` per
+`window`, without any effect on other users.
+
+Groups and their `capacity/window seconds` defaults are in GROUP_LIMITS.
+RATE_LIMITS overrides some of them, e.g. `detect=20/60,chat=60/60`.
+
+Buckets live in process memory by default. A gunicorn role with several
+workers then allows the limit once per worker. Set RATE_LIMIT_REDIS_URL to
+keep the buckets in Redis instead (one Lua script call per check, needs the
+`redis` package), so all workers and hosts share them. If Redis fails,
+requests are let through and counted under `errors`, since the limiter
+must not take the API down.
+
+Checks are O(1). The memory store takes one short lock per check, a few
+microseconds; `check_us` in the stats is the measured average.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1").lower() not in {"0", "false"}
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+
+# group -> (capacity, window seconds)
+GROUP_LIMITS: Dict[str, Tuple[int, float]] = {
+    "detect": (10, 60),     # Disease detection: a TensorFlow inference per request
+    "analyze": (10, 60),    # Waste analyses and advisor init: a long LLM generation on a miss
+    "batch": (5, 3600),     # Batch waste analyses: up to WASTE_BATCH_MAX_CROPS generations each
+    "chat": (30, 60),       # Advisor and waste chat turns
+    "read": (120, 60),      # Index and status reads (outbreaks, chain, jobs)
+}
+
+
+def _parse_limits(value: str) -> Dict[str, Tuple[int, float]]:
+    limits = dict(GROUP_LIMITS)
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        try:
+            group, spec = item.split("=")
+            capacity, window = spec.split("/")
+            capacity, window = int(capacity), float(window)
+            # Checks divide by capacity / window, so both must be positive and finite
+            if capacity < 1 or not window > 0 or window == float("inf"):
+                raise ValueError
+            limits[group.strip()] = (capacity, window)
+        except ValueError:
+            raise ValueError(f"RATE_LIMITS entries look like 'detect=10/60' (capacity >= 1, window > 0), got '{item}'")
+    return limits
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: float        # Seconds until the bucket is full again
+    retry_after: float  # Seconds until the next request would be allowed (0 when allowed)
+    window: float
+
+
+class MemoryBucketStore:
+    """Buckets in a dict: key -> [tokens, last refill (monotonic), seconds to refill from empty]"""
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float, cost: float = 1) -> Tuple[bool, float]:
+        """(allowed, tokens left)"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._evict(now)
+                bucket = self._buckets[key] = [capacity, now, capacity / rate]
+            else:
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            allowed = bucket[0] >= cost
+            if allowed:
+                bucket[0] -= cost
+            return allowed, bucket[0]
+
+    def _evict(self, now: float) -> None:
+        # Buckets idle long enough to have refilled are the same as new ones
+        idle = [k for k, (_, stamp, refill) in self._buckets.items() if now - stamp >= refill]
+        for key in idle or list(self._buckets)[:len(self._buckets) // 2]:
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBucketStore:
+    """Buckets shared by every worker, updated atomically by a Lua script"""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.2)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+
+    def take(self, key: str, capacity: int, rate: float, cost: float = 1) -> Tuple[bool, float]:
+        # Wall-clock time, as the workers share the buckets
+        allowed, tokens = self._take(keys=[f"ratelimit:{key}"], args=[capacity, rate, time.time(), cost])
+        return bool(allowed), float(tokens)
+
+
+class RateLimiter:
+    def __init__(self, store=None, limits: Optional[Dict[str, Tuple[int, float]]] = None):
+        self.store = store if store is not None else MemoryBucketStore()
+        self.limits = limits if limits is not None else dict(GROUP_LIMITS)
+        self._lock = threading.Lock()
+        self.checks: Dict[str, int] = {group: 0 for group in self.limits}
+        self.limited: Dict[str, int] = {group: 0 for group in self.limits}
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._check_seconds = 0.0
+
+    def check(self, group: str, key: str, cost: float = 1) -> Decision:
+        capacity, window = self.limits[group]
+        rate = capacity / window
+        started = time.perf_counter()
+        try:
+            allowed, tokens = self.store.take(f"{group}:{key}", capacity, rate, cost)
+        except Exception as e:
+            # Fail open: a broken shared store must not reject every request
+            with self._lock:
+                if self.errors == 0 or str(e) != self.last_error:
+                    print(f"[RATE] {self.store.name} store failed, not limiting: {e}")
+                self.errors += 1
+                self.last_error = str(e)
+            return Decision(True, capacity, capacity, 0.0, 0.0, window)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.checks[group] += 1
+            self._check_seconds += elapsed
+            if not allowed:
+                self.limited[group] += 1
+        return Decision(
+            allowed=allowed,
+            limit=capacity,
+            remaining=int(tokens),
+            reset=(capacity - tokens) / rate,
+            retry_after=0.0 if allowed else (cost - tokens) / rate,
+            window=window,
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            checks = sum(self.checks.values())
+            return {
+                "enabled": True,
+                "store": self.store.name,
+                "groups": {
+                    group: {"limit": f"{capacity}/{window:g}s", "checks": self.checks[group],
+                            "limited": self.limited[group]}
+                    for group, (capacity, window) in self.limits.items()
+                },
+                "buckets": len(self.store) if hasattr(self.store, "__len__") else None,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "check_us": round(self._check_seconds / checks * 1e6, 2) if checks else None,
+            }
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter configured from the environment"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            store = None
+            if RATE_LIMIT_REDIS_URL:
+                try:
+                    store = RedisBucketStore(RATE_LIMIT_REDIS_URL)
+                except ImportError:
+                    print("[RATE] RATE_LIMIT_REDIS_URL is set but the redis package is missing; buckets stay per worker")
+            _limiter = RateLimiter(store, _parse_limits(os.getenv("RATE_LIMITS", "")))
+            print(f"[RATE] Rate limits ({_limiter.store.name} store): "
+                  + ", ".join(f"{g}={c}/{w:g}s" for g, (c, w) in _limiter.limits.items()))
+        return _limiter
+
+
+def all_stats() -> dict:
+    limiter = _limiter
+    return limiter.stats() if limiter is not None else {"enabled": RATE_LIMIT_ENABLED}
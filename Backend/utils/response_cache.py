@@ -0,0 +1,182 @@
+"""
+Two-tier response cache for expensive LLM generations.
+
+Tier 1 is an in-process LRU (microsecond hits, lost on restart).
+Tier 2 is a SQLite file shared by every worker on the box (millisecond hits,
+survives restarts). Entries carry a version tag so a prompt change can
+invalidate everything generated with the old prompt, and an optional TTL.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_DIR = Path(os.getenv(
+    "KRISHI_CACHE_DIR", str(Path(__file__).resolve().parent.parent / "cache")
+))
+
+_CACHES: Dict[str, "ResponseCache"] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def make_key(*parts: Any) -> str:
+    """Stable hash of the key parts (order matters)"""
+    raw = json.dumps([str(p) for p in parts], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """In-memory LRU in front of a SQLite store, namespaced by `name`"""
+
+    def __init__(
+        self,
+        name: str,
+        db_path: Optional[str] = None,
+        max_memory_entries: int = 256,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.name = name
+        self.max_memory_entries = max_memory_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+        if db_path is None:
+            DEFAULT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            db_path = str(DEFAULT_CACHE_DIR / "responses.sqlite3")
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                version TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._db.commit()
+
+        with _CACHES_LOCK:
+            _CACHES[name] = self
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a copy of the cached value, or None on miss/expiry"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._expired(created_at):
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    return copy.deepcopy(value)
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT value, created_at FROM responses WHERE namespace = ? AND key = ?",
+                (self.name, key),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if self._expired(row[1]):
+                self._db.execute(
+                    "DELETE FROM responses WHERE namespace = ? AND key = ?", (self.name, key)
+                )
+                self._db.commit()
+                self.misses += 1
+                return None
+
+            value = json.loads(row[0])
+            self._remember(key, value, row[1])
+            self.hits_disk += 1
+            return copy.deepcopy(value)
+
+    def contains(self, key: str) -> bool:
+        """Cheap existence check on the persistent tier (ignores LRU stats)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT created_at FROM responses WHERE namespace = ? AND key = ?",
+                (self.name, key),
+            ).fetchone()
+        return row is not None and not self._expired(row[0])
+
+    def set(self, key: str, value: Any, version: str = "") -> None:
+        created_at = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (namespace, key, version, value, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.name, key, version, payload, created_at),
+            )
+            self._db.commit()
+            self._remember(key, copy.deepcopy(value), created_at)
+
+    def _remember(self, key: str, value: Any, created_at: float) -> None:
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+            self._db.execute(
+                "DELETE FROM responses WHERE namespace = ? AND key = ?", (self.name, key)
+            )
+            self._db.commit()
+
+    def purge_stale(self, current_version: str) -> int:
+        """Drop every entry not generated with `current_version`; returns rows removed"""
+        with self._lock:
+            cur = self._db.execute(
+                "DELETE FROM responses WHERE namespace = ? AND version != ?",
+                (self.name, current_version),
+            )
+            if self.ttl_seconds is not None:
+                self._db.execute(
+                    "DELETE FROM responses WHERE namespace = ? AND created_at < ?",
+                    (self.name, time.time() - self.ttl_seconds),
+                )
+            self._db.commit()
+            # Memory tier only ever holds recent entries; simplest to drop it
+            self._memory.clear()
+            return cur.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            entries = self._db.execute(
+                "SELECT COUNT(*) FROM responses WHERE namespace = ?", (self.name,)
+            ).fetchone()[0]
+            return {
+                "entries": entries,
+                "memory_entries": len(self._memory),
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits_memory + self.hits_disk) / lookups, 4) if lookups else 0.0,
+            }
+
+
+def all_stats() -> dict:
+    with _CACHES_LOCK:
+        caches = list(_CACHES.values())
+    return {c.name: c.stats() for c in caches}
@@ -0,0 +1,431 @@
+"""
+Append-only log of disease scans, with hourly rollups for outbreak queries.
+
+Every detection is recorded as (time, crop, disease, confidence, severity,
+region), where the region is the farmer's district from their profile.
+Recording only appends to an in-memory queue. A background thread resolves
+regions and flushes batches every SCAN_LOG_FLUSH_SECONDS or SCAN_LOG_BATCH
+events. Regions are resolved there because it may mean a Firestore read.
+
+Storage is columnar, one directory per UTC day and writer process:
+
+    scan_log/2026-10-19/<pid>-<start>/ts.f8 crop.i4 disease.i4 region.i4 confidence.f4 severity.i1
+                                      dictionary.json  rollup.json
+
+Each column is a raw little-endian array appended batch by batch, readable
+with np.fromfile or np.memmap. crop/disease/region are ids into
+dictionary.json, and severity indexes SEVERITIES. A batch that fails to
+write is cut back off every column; if even that fails, the writer moves
+on to a fresh directory (<pid>-<start>.1, ...) for the rest of the day. So
+only a crash mid-batch can leave columns of unequal length, and only at
+their end; readers truncate to the shortest.
+
+rollup.json holds the writer's event counts per (hour, region, crop,
+disease), rewritten on every flush. Outbreak queries sum these rollups,
+with each parsed file cached until it changes, and never read the event
+columns. Their cost depends on how many regions and diseases are in the
+window, not on how many scans were made. Counts include every worker
+process's events, up to one flush interval late.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.response_cache import DEFAULT_CACHE_DIR
+
+SCAN_LOG_ENABLED = os.getenv("SCAN_LOG_ENABLED", "1").lower() not in {"0", "false"}
+SCAN_LOG_DIR = Path(os.getenv("SCAN_LOG_DIR", str(DEFAULT_CACHE_DIR / "scan_log")))
+SCAN_LOG_FLUSH_SECONDS = float(os.getenv("SCAN_LOG_FLUSH_SECONDS", 5))
+SCAN_LOG_BATCH = int(os.getenv("SCAN_LOG_BATCH", 512))
+SCAN_LOG_MAX_PENDING = int(os.getenv("SCAN_LOG_MAX_PENDING", 50000))
+
+COLUMNS = {
+    "ts": np.dtype("<f8"),
+    "crop": np.dtype("<i4"),
+    "disease": np.dtype("<i4"),
+    "region": np.dtype("<i4"),
+    "confidence": np.dtype("<f4"),
+    "severity": np.dtype("<i1"),
+}
+ENCODED = ("crop", "disease", "region")
+SEVERITIES = ("low", "medium", "high")
+BUCKETS = ("hour", "day", "week")
+UNKNOWN_REGION = "Unknown"
+
+# (ts, crop, disease, confidence, severity, uid)
+Event = Tuple[float, str, str, float, str, Optional[str]]
+
+
+def _day(hour: int) -> str:
+    return datetime.fromtimestamp(hour * 3600, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+@lru_cache(maxsize=65536)
+def _bucket_label(hour: int, bucket: str) -> str:
+    start = datetime.fromtimestamp(hour * 3600, tz=timezone.utc)
+    if bucket == "hour":
+        return start.strftime("%Y-%m-%dT%H:00Z")
+    if bucket == "week":
+        start -= timedelta(days=start.weekday())  # Weeks start on Monday
+    return start.strftime("%Y-%m-%d")
+
+
+def _replace_json(path: Path, value) -> None:
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(value, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+class _Partition:
+    """One writer's files for one day"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.ids: Dict[str, Dict[str, int]] = {column: {} for column in ENCODED}
+        self.rollup: Counter = Counter()
+
+    def encode(self, column: str, value: str) -> int:
+        ids = self.ids[column]
+        if value not in ids:
+            ids[value] = len(ids)
+        return ids[value]
+
+    def dictionary(self) -> dict:
+        return {column: list(ids) for column, ids in self.ids.items()}
+
+    def forget_ids(self, sizes: Dict[str, int]) -> None:
+        """Drops ids assigned after the dictionaries had `sizes` entries"""
+        for column, size in sizes.items():
+            self.ids[column] = dict(list(self.ids[column].items())[:size])
+
+    def load(self) -> None:
+        """Picks up where an earlier batch left this partition"""
+        try:
+            with (self.path / "dictionary.json").open(encoding="utf-8") as f:
+                dictionary = json.load(f)
+            with (self.path / "rollup.json").open(encoding="utf-8") as f:
+                rollup = json.load(f)
+        except FileNotFoundError:
+            return
+        self.ids = {column: {value: i for i, value in enumerate(dictionary[column])} for column in ENCODED}
+        self.rollup = Counter({tuple(row[:4]): row[4] for row in rollup})
+
+
+class ScanEventLog:
+    def __init__(self, root: Path = SCAN_LOG_DIR, region_resolver: Optional[Callable[[str], Optional[str]]] = None):
+        self.root = Path(root)
+        self.writer_id = f"{os.getpid()}-{int(time.time())}"
+        self._region_resolver = region_resolver
+        self._queue: "queue.Queue[Event]" = queue.Queue(maxsize=SCAN_LOG_MAX_PENDING)
+        self._partitions: Dict[str, _Partition] = {}
+        self._retired: Counter = Counter()  # Day -> partitions abandoned after a failed rollback
+        self._rollup_files: Dict[Path, Tuple[int, list, Counter]] = {}
+        self._writer: Optional[threading.Thread] = None
+        self._write_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    # --- Writing ---
+
+    def record(self, crop: str, disease: str, confidence: float, severity: str,
+               uid: Optional[str] = None, ts: Optional[float] = None) -> None:
+        """Queues one scan; never blocks"""
+        self._start()
+        try:
+            self._queue.put_nowait((time.time() if ts is None else ts, crop, disease, confidence, severity, uid))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        with self._lock:
+            self.recorded += 1
+
+    def _start(self) -> None:
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="scan-log", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + SCAN_LOG_FLUSH_SECONDS
+            while len(batch) < SCAN_LOG_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.write_batch(batch)
+
+    def flush(self) -> None:
+        """Writes whatever is queued right now"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self.write_batch(batch)
+
+    def write_batch(self, events: List[Event]) -> None:
+        """Appends events to their day's columns and rollup; also used to bulk-load"""
+        regions: Dict[Optional[str], str] = {}
+        by_day: Dict[str, list] = defaultdict(list)
+        for event in events:
+            uid = event[5]
+            if uid not in regions:
+                regions[uid] = self._resolve_region(uid)
+            by_day[_day(int(event[0] // 3600))].append((*event[:5], regions[uid]))
+
+        with self._write_lock:
+            for day, rows in by_day.items():
+                try:
+                    self._append(day, rows)
+                except OSError as e:
+                    print(f"[SCANLOG] Dropped {len(rows)} events for {day}: {e}")
+                    with self._lock:
+                        self.dropped += len(rows)
+                    continue
+                with self._lock:
+                    self.written += len(rows)
+            with self._lock:
+                self.flushes += 1
+
+    def _resolve_region(self, uid: Optional[str]) -> str:
+        if not uid or self._region_resolver is None:
+            return UNKNOWN_REGION
+        try:
+            return self._region_resolver(uid) or UNKNOWN_REGION
+        except Exception as e:
+            print(f"[SCANLOG] Region lookup failed: {e}")
+            return UNKNOWN_REGION
+
+    def _append(self, day: str, rows: list) -> None:
+        partition = self._partitions.get(day)
+        if partition is None:
+            retired = self._retired[day]
+            name = f"{self.writer_id}.{retired}" if retired else self.writer_id
+            partition = self._partitions[day] = _Partition(self.root / day / name)
+            partition.path.mkdir(parents=True, exist_ok=True)
+            partition.load()
+            # Live traffic only writes today (and yesterday around midnight)
+            for old in sorted(self._partitions)[:-2]:
+                del self._partitions[old]
+
+        files = {name: partition.path / f"{name}.{dtype.kind}{dtype.itemsize}" for name, dtype in COLUMNS.items()}
+        sizes = {name: path.stat().st_size if path.exists() else 0 for name, path in files.items()}
+        id_counts = {column: len(ids) for column, ids in partition.ids.items()}
+        added: Counter = Counter()
+        columns = {name: [] for name in COLUMNS}
+        for ts, crop, disease, confidence, severity, region in rows:
+            ids = (partition.encode("crop", crop), partition.encode("disease", disease),
+                   partition.encode("region", region))
+            columns["ts"].append(ts)
+            columns["crop"].append(ids[0])
+            columns["disease"].append(ids[1])
+            columns["region"].append(ids[2])
+            columns["confidence"].append(confidence)
+            columns["severity"].append(SEVERITIES.index(severity) if severity in SEVERITIES else 0)
+            added[(int(ts // 3600), region, crop, disease)] += 1
+
+        rollup = partition.rollup + added
+        try:
+            # Dictionary first, so every id in the columns can be decoded
+            _replace_json(partition.path / "dictionary.json", partition.dictionary())
+            for name, dtype in COLUMNS.items():
+                with open(files[name], "ab") as f:
+                    np.asarray(columns[name], dtype=dtype).tofile(f)
+            _replace_json(partition.path / "rollup.json", [[*key, n] for key, n in rollup.items()])
+        except OSError:
+            partition.forget_ids(id_counts)
+            self._rollback(day, files, sizes)
+            raise
+        # Counted only once the events are on disk; rollup.json is never ahead of the columns
+        partition.rollup = rollup
+
+    def _rollback(self, day: str, files: Dict[str, Path], sizes: Dict[str, int]) -> None:
+        """Cuts a failed batch off every column, so later batches stay aligned"""
+        try:
+            for name, path in files.items():
+                if path.exists():
+                    os.truncate(path, sizes[name])
+        except OSError as e:
+            # Misaligned columns must not be appended to; later batches go to a new directory
+            print(f"[SCANLOG] Could not roll back {files['ts'].parent}, retiring it: {e}")
+            self._partitions.pop(day, None)
+            self._retired[day] += 1
+
+    # --- Reading ---
+
+    def _day_rollups(self, day: str) -> List[Tuple[list, Counter]]:
+        """(hourly rows, whole-day counts) of every writer's rollup for `day`"""
+        rollups = []
+        day_dir = self.root / day
+        if not day_dir.is_dir():
+            return rollups
+        for writer in os.scandir(day_dir):
+            path = Path(writer.path) / "rollup.json"
+            try:
+                mtime = path.stat().st_mtime_ns
+            except FileNotFoundError:
+                continue
+            cached = self._rollup_files.get(path)
+            if cached is None or cached[0] != mtime:
+                try:
+                    with path.open(encoding="utf-8") as f:
+                        hourly = json.load(f)
+                except (OSError, ValueError):
+                    continue  # Being replaced; the next query sees it
+                daily: Counter = Counter()
+                for _, region, crop, disease, n in hourly:
+                    daily[(region, crop, disease)] += n
+                cached = (mtime, hourly, daily)
+                if len(self._rollup_files) > 4096:
+                    self._rollup_files.clear()
+                self._rollup_files[path] = cached
+            rollups.append(cached[1:])
+        return rollups
+
+    def outbreaks(self, days: float = 7, bucket: str = "day", level: str = "district",
+                  crop: Optional[str] = None, disease: Optional[str] = None, state: Optional[str] = None,
+                  include_healthy: bool = False) -> dict:
+        """
+        Scan counts per time bucket, region, crop and disease over the last
+        `days`, largest first, plus totals per region. `level="state"` folds
+        districts into their state. Days wholly inside the window are summed
+        from whole-day counts, so only the first day is read hour by hour.
+        """
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of {BUCKETS}")
+        since_hour = int((time.time() - days * 86400) // 3600)
+        now_hour = int(time.time() // 3600)
+        first_day = since_hour - since_hour % 24
+
+        # Filter and region folding, decided once per distinct (region, crop, disease)
+        keys: Dict[tuple, Optional[Tuple[str, str, str]]] = {}
+
+        def fold(region: str, row_crop: str, row_disease: str) -> Optional[Tuple[str, str, str]]:
+            region_state = region.split(" / ", 1)[0]
+            if not include_healthy and "healthy" in row_disease.lower():
+                return None
+            if crop and row_crop.lower() != crop.lower():
+                return None
+            if disease and disease.lower() not in row_disease.lower():
+                return None
+            if state and region_state.lower() != state.lower():
+                return None
+            return (region_state if level == "state" else region, row_crop, row_disease)
+
+        counts: Counter = Counter()
+        for day_start in range(first_day, now_hour + 1, 24):
+            whole_day = bucket != "hour" and day_start >= since_hour
+            label = _bucket_label(day_start, bucket)
+            for hourly, daily in self._day_rollups(_day(day_start)):
+                if whole_day:
+                    rows = ((label, *key, n) for key, n in daily.items())
+                else:
+                    rows = ((_bucket_label(hour, bucket), region, c, d, n)
+                            for hour, region, c, d, n in hourly if hour >= since_hour)
+                for row_label, region, row_crop, row_disease, n in rows:
+                    key = (region, row_crop, row_disease)
+                    if key not in keys:
+                        keys[key] = fold(*key)
+                    folded = keys[key]
+                    if folded is not None:
+                        counts[(row_label, *folded)] += n
+
+        regions: Counter = Counter()
+        for (_, region, _, _), n in counts.items():
+            regions[region] += n
+        rows = [
+            {"bucket": b, "region": r, "crop": c, "disease": d, "count": n}
+            for (b, r, c, d), n in counts.most_common()
+        ]
+        return {
+            "bucket": bucket,
+            "level": level,
+            "since": datetime.fromtimestamp(since_hour * 3600, tz=timezone.utc).isoformat(),
+            "total": sum(regions.values()),
+            "regions": [{"region": r, "count": n} for r, n in regions.most_common()],
+            "rows": rows,
+        }
+
+    def read_day(self, day: str) -> Dict[str, np.ndarray]:
+        """Every event of one day as decoded columns, for offline analysis (a full scan)"""
+        parts = []
+        day_dir = self.root / day
+        for writer in (os.scandir(day_dir) if day_dir.is_dir() else []):
+            path = Path(writer.path)
+            try:
+                with (path / "dictionary.json").open(encoding="utf-8") as f:
+                    dictionary = json.load(f)
+            except (OSError, ValueError):
+                continue
+            columns = {
+                name: np.fromfile(path / f"{name}.{dtype.kind}{dtype.itemsize}", dtype=dtype)
+                for name, dtype in COLUMNS.items()
+            }
+            length = min(len(c) for c in columns.values())
+            part = {name: column[:length] for name, column in columns.items()}
+            for name in ENCODED:
+                part[name] = np.asarray(dictionary[name], dtype=object)[part[name]]
+            part["severity"] = np.asarray(SEVERITIES, dtype=object)[part["severity"]]
+            parts.append(part)
+        if not parts:
+            return {name: np.empty(0, dtype=object if name in ENCODED or name == "severity" else dtype)
+                    for name, dtype in COLUMNS.items()}
+        return {name: np.concatenate([p[name] for p in parts]) for name in COLUMNS}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "path": str(self.root),
+                "pending": self._queue.qsize(),
+                "recorded": self.recorded,
+                "written": self.written,
+                "flushes": self.flushes,
+                "dropped": self.dropped,
+            }
+
+
+_log: Optional[ScanEventLog] = None
+_log_lock = threading.Lock()
+
+
+def get_scan_log(region_resolver: Optional[Callable[[str], Optional[str]]] = None) -> Optional[ScanEventLog]:
+    """Process-wide log, or None when SCAN_LOG_ENABLED=0; the first caller sets the resolver"""
+    global _log
+    if not SCAN_LOG_ENABLED:
+        return None
+    with _log_lock:
+        if _log is None:
+            _log = ScanEventLog(region_resolver=region_resolver)
+        return _log
+
+
+def all_stats() -> dict:
+    log = _log
+    return log.stats() if log is not None else {"enabled": SCAN_LOG_ENABLED}
@@ -0,0 +1,258 @@
+"""
+Semantic answer cache for near-duplicate chat questions.
+
+"what machine do I need" and "which machines are required" should not cost
+two full generations when they are asked about the same analysis/profile.
+Questions are embedded and matched against previously answered ones with a
+vectorized cosine-similarity scan (one matrix-vector product per lookup).
+
+Answers are only reused within the same partition (language) and the same
+context identity (e.g. the analysis or farmer profile they were generated
+for); the similarity threshold is tunable against a labelled duplicate set:
+
+    python utils/semantic_cache.py tune labelled_pairs.jsonl
+
+where each line is {"a": "...", "b": "...", "duplicate": true|false}.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+DEFAULT_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1024"))
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1").lower() not in {"0", "false"}
+
+EmbedFn = Callable[[str], Sequence[float]]
+
+_CACHES: Dict[str, "SemanticCache"] = {}
+_CACHES_LOCK = threading.Lock()
+_default_embedder = None
+
+
+def get_default_embedder() -> EmbedFn:
+    """Ollama embeddings, created on first use so importing this module stays cheap"""
+    global _default_embedder
+    if _default_embedder is None:
+        from langchain_ollama import OllamaEmbeddings
+        from utils.circuit_breaker import CircuitOpenError
+        from utils.llm_clients import client_kwargs, ollama_breaker
+        embeddings = OllamaEmbeddings(
+            model=DEFAULT_EMBED_MODEL,
+            base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+            client_kwargs=client_kwargs(),
+        )
+
+        def embed_query(text: str):
+            # Don't wait on a timeout when Ollama is known to be down
+            if ollama_breaker.is_open():
+                raise CircuitOpenError("Ollama is unavailable (circuit open)")
+            return embeddings.embed_query(text)
+
+        from utils import llm_replay
+        if llm_replay.enabled():
+            embed_query = llm_replay.recording_embedder(embed_query, DEFAULT_EMBED_MODEL)
+        _default_embedder = embed_query
+    return _default_embedder
+
+
+def context_id(*parts) -> int:
+    """Compact 63-bit identity for the context an answer was generated in"""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return int.from_bytes(hashlib.blake2b(raw.encode("utf-8"), digest_size=8).digest(), "big") >> 1
+
+
+def _normalize(vec: Sequence[float]) -> np.ndarray:
+    v = np.asarray(vec, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
+
+
+class _Partition:
+    """Fixed-capacity slab of unit vectors with parallel metadata arrays"""
+
+    def __init__(self, dim: int, capacity: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.context_ids = np.full(capacity, -1, dtype=np.int64)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.answers: List[Optional[str]] = [None] * capacity
+        self.size = 0
+
+    def best_match(self, vec: np.ndarray, ctx: int) -> Tuple[int, float]:
+        if self.size == 0:
+            return -1, 0.0
+        sims = self.vectors[:self.size] @ vec
+        sims[self.context_ids[:self.size] != ctx] = -1.0
+        idx = int(np.argmax(sims))
+        return idx, float(sims[idx])
+
+    def slot_for_insert(self) -> int:
+        capacity = len(self.answers)
+        if self.size < capacity:
+            self.size += 1
+            return self.size - 1
+        # Evict the least recently used entry
+        return int(np.argmin(self.last_used))
+
+
+class SemanticCache:
+    """Per-language nearest-neighbour cache of (question, context) -> answer"""
+
+    def __init__(
+        self,
+        name: str,
+        embed_fn: Optional[EmbedFn] = None,
+        threshold: float = DEFAULT_THRESHOLD,
+        max_entries_per_partition: int = DEFAULT_MAX_ENTRIES,
+        enabled: bool = SEMANTIC_CACHE_ENABLED,
+    ):
+        self.name = name
+        self._embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries_per_partition
+        self.enabled = enabled
+        self._partitions: Dict[str, _Partition] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        with _CACHES_LOCK:
+            _CACHES[name] = self
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        try:
+            embed_fn = self._embed_fn or get_default_embedder()
+            return _normalize(embed_fn(" ".join(text.split()).lower()))
+        except Exception as e:
+            # Missing embedding model etc. must never break chat; just skip the cache
+            self.errors += 1
+            if self.errors == 1:
+                print(f"[SEMANTIC CACHE] {self.name}: embedding failed, cache bypassed ({e})")
+            return None
+
+    def lookup(self, question: str, ctx: int, language: str = "english") -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Returns (answer, embedding). The embedding is handed back so a miss can
+        be stored later without embedding the question twice.
+        """
+        if not self.enabled:
+            return None, None
+        vec = self.embed(question)
+        if vec is None:
+            return None, None
+        with self._lock:
+            partition = self._partitions.get(language.lower())
+            if partition is not None and partition.vectors.shape[1] == vec.shape[0]:
+                idx, score = partition.best_match(vec, ctx)
+                if idx >= 0 and score >= self.threshold:
+                    partition.last_used[idx] = time.time()
+                    self.hits += 1
+                    return partition.answers[idx], vec
+            self.misses += 1
+        return None, vec
+
+    def store(self, question: str, ctx: int, answer: str, language: str = "english",
+              embedding: Optional[np.ndarray] = None) -> None:
+        if not self.enabled or not answer:
+            return
+        vec = embedding if embedding is not None else self.embed(question)
+        if vec is None:
+            return
+        with self._lock:
+            key = language.lower()
+            partition = self._partitions.get(key)
+            if partition is None or partition.vectors.shape[1] != vec.shape[0]:
+                partition = _Partition(vec.shape[0], self.max_entries)
+                self._partitions[key] = partition
+            slot = partition.slot_for_insert()
+            partition.vectors[slot] = vec
+            partition.context_ids[slot] = ctx
+            partition.answers[slot] = answer
+            partition.last_used[slot] = time.time()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._partitions.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "entries": {lang: p.size for lang, p in self._partitions.items()},
+                "hits": self.hits,
+                "misses": self.misses,
+                "embedding_errors": self.errors,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def tune_threshold(pairs: Iterable[Tuple[str, str, bool]], embed_fn: Optional[EmbedFn] = None,
+                   min_precision: float = 0.95) -> dict:
+    """
+    Picks the lowest threshold whose precision on the labelled pairs is at
+    least `min_precision` (a wrong cached answer is worse than a miss), and
+    reports precision/recall/F1 at that point.
+    """
+    embed_fn = embed_fn or get_default_embedder()
+    labels, sims = [], []
+    for a, b, duplicate in pairs:
+        va = _normalize(embed_fn(" ".join(a.split()).lower()))
+        vb = _normalize(embed_fn(" ".join(b.split()).lower()))
+        sims.append(float(va @ vb))
+        labels.append(bool(duplicate))
+    if not sims:
+        raise ValueError("No labelled pairs provided")
+
+    sims_arr = np.asarray(sims)
+    labels_arr = np.asarray(labels)
+    best = None
+    for threshold in np.unique(np.round(sims_arr, 3)):
+        predicted = sims_arr >= threshold
+        tp = int(np.sum(predicted & labels_arr))
+        fp = int(np.sum(predicted & ~labels_arr))
+        fn = int(np.sum(~predicted & labels_arr))
+        precision = tp / (tp + fp) if tp + fp else 1.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        if precision >= min_precision and (best is None or recall > best["recall"]):
+            best = {"threshold": float(threshold), "precision": precision, "recall": recall, "f1": f1}
+    if best is None:
+        best = {"threshold": float(sims_arr.max()) + 1e-3, "precision": 1.0, "recall": 0.0, "f1": 0.0}
+    best["pairs"] = len(sims)
+    return best
+
+
+def all_stats() -> dict:
+    with _CACHES_LOCK:
+        caches = list(_CACHES.values())
+    return {c.name: c.stats() for c in caches}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Semantic cache utilities.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    tune = sub.add_parser("tune", help="Pick a similarity threshold from labelled duplicate pairs")
+    tune.add_argument("pairs", help='JSONL file with {"a": ..., "b": ..., "duplicate": bool} per line')
+    tune.add_argument("--min-precision", type=float, default=0.95)
+    args = parser.parse_args()
+
+    with open(args.pairs, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    result = tune_threshold(((r["a"], r["b"], r["duplicate"]) for r in rows), min_precision=args.min_precision)
+    print(json.dumps(result, indent=2))
+    print(f"Set SEMANTIC_CACHE_THRESHOLD={result['threshold']:.3f}")
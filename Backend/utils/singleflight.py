@@ -0,0 +1,112 @@
+"""
+Request coalescing ("singleflight") for expensive, deterministic calls.
+
+When several threads ask for the same key at the same time, only the first
+one (the leader) runs the function; the others block until it finishes and
+receive a copy of the same result (or the same exception).
+"""
+
+import copy
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Every group registers itself here so /api/metrics can report all of them.
+_GROUPS: Dict[str, "SingleFlight"] = {}
+_GROUPS_LOCK = threading.Lock()
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into a single execution"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.requests = 0
+        self.executions = 0
+        self.shared = 0
+        with _GROUPS_LOCK:
+            _GROUPS[name] = self
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) once per in-flight key and share the result"""
+        leader, call = self.join(key)
+        if not leader:
+            return self.wait(call)
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.resolve(key, call, error=e)
+            raise
+        self.resolve(key, call, result)
+        return result
+
+    def join(self, key: Hashable) -> Tuple[bool, _Call]:
+        """
+        Lower-level form of do() for callers that produce the result
+        incrementally (e.g. while streaming it): (True, call) makes the caller
+        the leader, who must then resolve() the call; (False, call) means
+        another caller is already producing it, wait() for it.
+        """
+        with self._lock:
+            self.requests += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                return False, call
+            call = _Call()
+            self._calls[key] = call
+            self.executions += 1
+            return True, call
+
+    def resolve(self, key: Hashable, call: _Call, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """Publishes the leader's result (or error) to its followers"""
+        call.result = result
+        call.error = error
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.event.set()
+
+    @staticmethod
+    def wait(call: _Call) -> Any:
+        call.event.wait()
+        if call.error is not None:
+            raise call.error
+        # Followers get their own copy so callers can mutate results safely
+        return copy.deepcopy(call.result)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.requests
+            return {
+                "requests": requests,
+                "executions": self.executions,
+                "shared": self.shared,
+                "in_flight": len(self._calls),
+                # Fraction of requests that were served by someone else's generation
+                "coalescing_ratio": round(self.shared / requests, 4) if requests else 0.0,
+            }
+
+
+def all_stats() -> dict:
+    """Stats for every registered singleflight group, keyed by group name"""
+    with _GROUPS_LOCK:
+        groups = list(_GROUPS.values())
+    return {g.name: g.stats() for g in groups}
@@ -0,0 +1,279 @@
+"""
+Per-call LLM usage ledger for capacity planning.
+
+Every routed LLM call (utils/llm_clients.py) is recorded with the feature,
+language, session and user it served, Ollama's token counts and durations
+from the final response metadata, and its outcome (success, timeout,
+fallback). Callers tag their calls with `tag_usage(...)`, which sets a
+contextvar, so nothing has to be threaded through the chains. Work handed
+to a thread pool keeps its tags when submitted via `contextvars.copy_context().run`.
+
+Recording only appends to an in-memory queue; a background thread writes
+rows to SQLite in batches (every USAGE_LEDGER_FLUSH_SECONDS or
+USAGE_LEDGER_BATCH rows), so the request thread never touches the disk. If
+the writer falls more than USAGE_LEDGER_MAX_PENDING rows behind, new rows
+are dropped and counted.
+
+Aggregate from the command line:
+
+    python utils/usage_ledger.py --by hour feature language --since 24
+"""
+
+import argparse
+import atexit
+import contextvars
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+if __package__ in (None, ""):
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from utils.response_cache import DEFAULT_CACHE_DIR
+
+USAGE_LEDGER_ENABLED = os.getenv("USAGE_LEDGER_ENABLED", "1").lower() not in {"0", "false"}
+USAGE_LEDGER_PATH = os.getenv("USAGE_LEDGER_PATH", str(DEFAULT_CACHE_DIR / "usage_ledger.sqlite3"))
+USAGE_LEDGER_FLUSH_SECONDS = float(os.getenv("USAGE_LEDGER_FLUSH_SECONDS", 2))
+USAGE_LEDGER_BATCH = int(os.getenv("USAGE_LEDGER_BATCH", 256))
+USAGE_LEDGER_MAX_PENDING = int(os.getenv("USAGE_LEDGER_MAX_PENDING", 10000))
+
+OUTCOMES = ("success", "timeout", "fallback", "cancelled")
+
+_COLUMNS = (
+    "ts", "feature", "language", "session", "user", "model",
+    "prompt_tokens", "eval_tokens", "prompt_eval_ms", "eval_ms", "total_ms", "outcome",
+)
+
+_context: contextvars.ContextVar = contextvars.ContextVar("llm_usage_context", default={})
+
+
+def tag_usage(feature: str, language: Optional[str] = None, session: Optional[str] = None) -> None:
+    """
+    Tags the LLM calls that follow in this context. Replaces the previous
+    tag (so nothing leaks from an earlier request on a reused thread) but
+    keeps the user. Not a context manager on purpose: streaming generators
+    would otherwise have to hold it open across yields.
+    """
+    _context.set({"user": _context.get().get("user"), "feature": feature, "language": language, "session": session})
+
+
+def set_usage_user(user: Optional[str]) -> None:
+    """Tags the rest of this request's calls with the authenticated user"""
+    _context.set({**_context.get(), "user": user})
+
+
+def current_tags() -> dict:
+    """Tags in effect now; capture when a call starts, since it may finish in another context"""
+    return _context.get()
+
+
+class UsageLedger:
+    def __init__(self, path: str = USAGE_LEDGER_PATH):
+        self.path = path
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=USAGE_LEDGER_MAX_PENDING)
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with sqlite3.connect(path) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_calls ("
+                " ts REAL NOT NULL, feature TEXT, language TEXT, session TEXT, user TEXT, model TEXT,"
+                " prompt_tokens INTEGER, eval_tokens INTEGER, prompt_eval_ms REAL, eval_ms REAL,"
+                " total_ms REAL, outcome TEXT NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS idx_llm_calls_ts ON llm_calls (ts)")
+
+    def record(self, model: str, metadata: Optional[dict], total_ms: float, outcome: str,
+               tags: Optional[dict] = None) -> None:
+        """Queues one call; never blocks"""
+        tags = current_tags() if tags is None else tags
+        metadata = metadata or {}
+        row = (
+            time.time(), tags.get("feature") or "unknown", tags.get("language"), tags.get("session"),
+            tags.get("user"), model,
+            metadata.get("prompt_eval_count"), metadata.get("eval_count"),
+            _ns_to_ms(metadata.get("prompt_eval_duration")), _ns_to_ms(metadata.get("eval_duration")),
+            round(total_ms, 1), outcome,
+        )
+        self._start()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _start(self) -> None:
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="usage-ledger", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+
+    def _write_loop(self) -> None:
+        db = sqlite3.connect(self.path, timeout=10)
+        db.execute("PRAGMA synchronous=NORMAL")
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + USAGE_LEDGER_FLUSH_SECONDS
+            while len(batch) < USAGE_LEDGER_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(db, batch)
+
+    def _write(self, db: sqlite3.Connection, batch: List[tuple]) -> None:
+        try:
+            with db:
+                db.executemany(
+                    f"INSERT INTO llm_calls ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})", batch
+                )
+        except sqlite3.Error as e:
+            print(f"[LEDGER] Dropped {len(batch)} rows: {e}")
+            with self._lock:
+                self.dropped += len(batch)
+            return
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+
+    def flush(self) -> None:
+        """Writes whatever is queued right now (at exit; the writer may still hold a partial batch)"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            with sqlite3.connect(self.path, timeout=10) as db:
+                self._write(db, batch)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "path": self.path,
+                "pending": self._queue.qsize(),
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": self.dropped,
+            }
+
+
+def _ns_to_ms(value) -> Optional[float]:
+    return round(value / 1e6, 1) if value is not None else None
+
+
+_ledger: Optional[UsageLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger() -> Optional[UsageLedger]:
+    """Process-wide ledger, or None when USAGE_LEDGER_ENABLED=0"""
+    global _ledger
+    if not USAGE_LEDGER_ENABLED:
+        return None
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = UsageLedger()
+        return _ledger
+
+
+def record_call(model: str, metadata: Optional[dict], total_ms: float, outcome: str,
+                tags: Optional[dict] = None) -> None:
+    ledger = get_ledger()
+    if ledger is not None:
+        try:
+            ledger.record(model, metadata, total_ms, outcome, tags)
+        except Exception as e:
+            print(f"[LEDGER] Record failed: {e}")
+
+
+def all_stats() -> dict:
+    ledger = _ledger
+    return ledger.stats() if ledger is not None else {"enabled": USAGE_LEDGER_ENABLED}
+
+
+# --- Query CLI ---
+
+_GROUPS = {
+    "hour": "strftime('%Y-%m-%d %H:00', ts, 'unixepoch')",
+    "day": "strftime('%Y-%m-%d', ts, 'unixepoch')",
+    "feature": "feature",
+    "language": "language",
+    "model": "model",
+    "outcome": "outcome",
+    "user": "user",
+}
+
+
+def report(path: str, by: List[str], since_hours: Optional[float]) -> List[dict]:
+    groups = [_GROUPS[g] for g in by]
+    select = [f"{expr} AS {name}" for name, expr in zip(by, groups)]
+    select += [
+        "COUNT(*) AS calls",
+        "COALESCE(SUM(prompt_tokens), 0) AS prompt_tokens",
+        "COALESCE(SUM(eval_tokens), 0) AS eval_tokens",
+        "ROUND(COALESCE(SUM(prompt_eval_ms), 0) / 1000, 1) AS prompt_eval_s",
+        "ROUND(COALESCE(SUM(eval_ms), 0) / 1000, 1) AS eval_s",
+        "ROUND(AVG(total_ms)) AS avg_ms",
+        "ROUND(MAX(total_ms)) AS max_ms",
+    ] + [f"SUM(outcome = '{o}') AS {o}" for o in OUTCOMES]
+    sql = f"SELECT {', '.join(select)} FROM llm_calls"
+    params = []
+    if since_hours:
+        sql += " WHERE ts >= ?"
+        params.append(time.time() - since_hours * 3600)
+    if groups:
+        sql += f" GROUP BY {', '.join(groups)} ORDER BY {', '.join(groups)}"
+    with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as db:
+        db.row_factory = sqlite3.Row
+        return [dict(row) for row in db.execute(sql, params)]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Aggregate the LLM usage ledger.")
+    parser.add_argument("--by", nargs="*", default=["hour", "feature", "language"], choices=list(_GROUPS))
+    parser.add_argument("--since", type=float, help="Only the last N hours")
+    parser.add_argument("--csv", action="store_true", help="CSV instead of an aligned table")
+    parser.add_argument("--db", default=USAGE_LEDGER_PATH)
+    args = parser.parse_args(argv)
+
+    if not Path(args.db).exists():
+        print(f"No ledger at {args.db}")
+        return 1
+    rows = report(args.db, args.by, args.since)
+    if not rows:
+        print("No calls recorded in that window")
+        return 0
+    columns = list(rows[0])
+    if args.csv:
+        import csv
+        writer = csv.DictWriter(sys.stdout, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+        return 0
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print(" | ".join(c.ljust(widths[c]) for c in columns))
+    print("-+-".join("-" * widths[c] for c in columns))
+    for row in rows:
+        print(" | ".join(str(row[c]).ljust(widths[c]) for c in columns))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Worker roles: which parts of the API a process serves.
+
+KRISHI_ROLE selects them: `detector`, `advisor`, `waste`, `chain`, `all`
+(the default), or a comma-separated mix such as `advisor,waste`. app.py imports
+and registers only the blueprints (routes/*.py) of the selected roles, so a
+chat worker never imports TensorFlow and a detector worker never imports
+LangChain.
+
+SERVER_SETTINGS are the gunicorn settings per role, merged for a mix by
+gunicorn.conf.py:
+- `workers`: advisor sessions live in process memory, so the advisor runs
+  one worker; the detector holds a TensorFlow model per worker. The chain
+  role runs one worker because it is the only writer of the event index.
+- `threads`: LLM requests mostly wait on Ollama (and SSE streams stay open),
+  so the LLM roles run many threads per worker.
+- `preimport`: libraries imported once in the gunicorn master and shared
+  copy-on-write by the forked workers. Only stateless imports belong here;
+  services, models, SQLite connections and thread pools are created in each
+  worker after the fork. TensorFlow is left out as it is not fork-safe.
+- `max_requests`: 0 where recycling a worker would lose state (advisor
+  sessions) or reload an expensive model.
+
+This module is stdlib-only so gunicorn.conf.py and the benchmarks can read
+it without importing any service.
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+ROLE_BLUEPRINTS: Dict[str, Tuple[str, ...]] = {
+    "detector": ("disease",),
+    "advisor": ("advisor", "jobs"),
+    "waste": ("waste", "jobs"),
+    "chain": ("chain",),
+}
+ROLES = (*ROLE_BLUEPRINTS, "all")
+LLM_ROLES = {"advisor", "waste"}
+
+_LLM_PREIMPORT = (
+    "httpx", "pydantic", "numpy", "langchain_core.prompts", "langchain_core.runnables",
+    "langchain_core.output_parsers", "langchain_ollama",
+)
+
+SERVER_SETTINGS: Dict[str, dict] = {
+    "detector": {"workers": 2, "threads": 2, "timeout": 60, "max_requests": 0,
+                 "preimport": ("numpy", "pandas", "PIL.Image")},
+    "advisor": {"workers": 1, "threads": 32, "timeout": 300, "max_requests": 0,
+                "preimport": _LLM_PREIMPORT},
+    "waste": {"workers": 2, "threads": 16, "timeout": 300, "max_requests": 1000,
+              "preimport": _LLM_PREIMPORT},
+    "chain": {"workers": 1, "threads": 8, "timeout": 30, "max_requests": 0,
+              "preimport": ("requests",)},
+}
+
+
+def resolve_roles(value: Optional[str] = None) -> Tuple[str, ...]:
+    """Roles named by `value` (default KRISHI_ROLE), in ROLE_BLUEPRINTS order"""
+    value = value if value is not None else os.getenv("KRISHI_ROLE", "all")
+    names = {name.strip().lower() for name in value.split(",") if name.strip()} or {"all"}
+    unknown = names - set(ROLES)
+    if unknown:
+        raise ValueError(f"KRISHI_ROLE must be one or more of {ROLES}, got {sorted(unknown)}")
+    if "all" in names:
+        return tuple(ROLE_BLUEPRINTS)
+    return tuple(role for role in ROLE_BLUEPRINTS if role in names)
+
+
+def blueprints_for(roles: Tuple[str, ...]) -> List[str]:
+    """Route modules to register, each once"""
+    names: List[str] = []
+    for role in roles:
+        for name in ROLE_BLUEPRINTS[role]:
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def server_settings(roles: Tuple[str, ...]) -> dict:
+    """Gunicorn settings for a mix of roles; the most constrained role wins"""
+    settings = [SERVER_SETTINGS[role] for role in roles]
+    recycled = [s["max_requests"] for s in settings]
+    preimport: List[str] = []
+    for s in settings:
+        preimport += [m for m in s["preimport"] if m not in preimport]
+    return {
+        "workers": min(s["workers"] for s in settings),
+        "threads": max(s["threads"] for s in settings),
+        "timeout": max(s["timeout"] for s in settings),
+        "max_requests": 0 if 0 in recycled else min(recycled),
+        "preimport": preimport,
+    }
@@ -138,19 +138,27 @@ export default function WasteToValue() {
             };
             setMessages(prev => [...prev, initialAiMsg]);
 
-            const response = await fetch(`${API_BASE_URL}/waste-to-value/chat/stream`, {
+            const sendChat = (body: Record<string, unknown>) => fetch(`${API_BASE_URL}/waste-to-value/chat/stream`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                     'Authorization': `Bearer ${token}`
                 },
                 body: JSON.stringify({
-                    context: resultData,
+                    ...body,
                     question: chatInput,
                     language: language === 'hi' ? 'Hindi' : language === 'mr' ? 'Marathi' : 'English'
                 }),
             });
 
+            // The server keeps the analysis; only send it inline if it has expired there
+            let response = resultData?.analysis_id
+                ? await sendChat({ analysis_id: resultData.analysis_id })
+                : await sendChat({ context: resultData });
+            if (response.status === 410) {
+                response = await sendChat({ context: resultData });
+            }
+
             if (!response.ok) throw new Error('Failed to connect to streaming API');
 
             const reader = response.body?.getReader();